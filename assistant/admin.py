@@ -1,7 +1,8 @@
 from django.contrib import admin
 
 from assistant.models import (Channel, Conversation, GeneralChatAnalytics,
-                              Message, MessageVote, Session)
+                              Message, MessageVote, SemanticCacheEntry,
+                              Session)
 
 
 class ChannelAdmin(admin.ModelAdmin):
@@ -57,9 +58,14 @@ class MessageVoteAdmin(admin.ModelAdmin):
     get_message_uuid.short_description = 'Message UUID'
 
 
+class SemanticCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'question', 'knowledge_version', 'score', 'hits', 'created_at']
+
+
 admin.site.register(Channel, ChannelAdmin)
 admin.site.register(Conversation, ConversationAdmin)
 admin.site.register(Message, MessageAdmin)
 admin.site.register(GeneralChatAnalytics, GeneralChatAnalyticsAdmin)
 admin.site.register(MessageVote, MessageVoteAdmin)
 admin.site.register(Session, SessionAdmin)
+admin.site.register(SemanticCacheEntry, SemanticCacheEntryAdmin)
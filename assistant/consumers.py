@@ -9,11 +9,12 @@ from django.conf import settings
 
 from assistant.memory import BaseMemory
 from assistant.models import Conversation
+from assistant.semantic_cache import semantic_cache
 from assistant.tasks import save_conversation
 from assistant.utils import convert_markdown_to_html
 from chatbackend.configs.base_config import openai_client as client
 from chatbackend.configs.logging_config import configure_logger
-from knowledge.knowledge_vec import query_vec_database
+from knowledge.knowledge_vec import embed_query, query_vec_database
 from assistant.tasks import create_conversation
 
 logger = configure_logger(__name__)
@@ -39,6 +40,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         self.room_group_name = f'chat_{self.room_name}'
 
         self.conversation_memory = BaseMemory()
+        self.cached_answers = {}  # message_id -> semantic cache entry id, for answers served from the cache
 
         # Create the Conversation instance without setting the customer and channel
         # self.conversation = await database_sync_to_async(Conversation.objects.create)()
@@ -78,31 +80,49 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 user_message = text_data_json.get('message')
                 message_id = str(uuid.uuid4())
 
-                contexts = await query_vec_database(query=user_message, num_results=3)
-                context_parts = []
-
-                for idx, ctx in enumerate(contexts, start=1):
-                    context_text = ctx['metadata']['text']
-                    context_parts.append(f"Context {idx}:\n\n{context_text}")
-                context_combined = "\n\n".join(context_parts)
-
-                # Build the prompt with the retrieved contexts
-                refined_ques = (
-                    "Use the detailed information provided in the contexts to formulate a comprehensive and accurate response to the user's question. "
-                    # "Incorporate any relevant details seamlessly, as if drawing from a deep well of knowledge. "
-                    "If there is additional pertinent information not covered by the contexts that you know would enrich the answer, feel free to include it. "
-                    "In cases where a context includes a reference URL, present it as a clickable link that opens in a new tab or window, ensuring a smooth conversation flow. Here is a sample [here](https://www.link.com) (link opens in a new tab)"
-                    "Remember, your responses should be engaging and come across as if they're from a knowledgeable and informed guide, with a touch of your unique personality, without explicitly stating the use of provided contexts. "
-                    "Focus on delivering a response that is thorough, informative, and engaging. And make your response easily formatable with dangerouslySetInnerhtml\n\n"
-                    "Contexts:\n\n" + context_combined +
-                    "\n\n---\n\nQuestion: " + user_message +
-                    "\n\nAnswer:"
-                )
-
-                self.conversation_memory.add_message(role='user', content=refined_ques, message_id=message_id)
-
-                bot_response = await self.generate_bot_response(refined_ques)
-                # logger.info(bot_response)
+                # Only the raw question goes into the history; the RAG contexts are sent for this turn alone
+                self.conversation_memory.add_message(role='user', content=user_message, message_id=message_id)
+
+                # Only answers to questions that do not depend on earlier turns are shared
+                first_turn = len(self.conversation_memory.get_openai_history()) == 1
+
+                query_embedding = await embed_query(user_message)
+                cached_answer = await semantic_cache.lookup(query_embedding) if first_turn else None
+
+                if cached_answer:
+                    bot_response = cached_answer.answer_html
+                    self.cached_answers[message_id] = cached_answer.id
+                else:
+                    contexts = await query_vec_database(
+                        query=user_message, num_results=3, query_embedding=query_embedding
+                    )
+                    context_parts = []
+
+                    for idx, ctx in enumerate(contexts, start=1):
+                        context_text = ctx['metadata']['text']
+                        context_parts.append(f"Context {idx}:\n\n{context_text}")
+                    context_combined = "\n\n".join(context_parts)
+
+                    # Build the prompt with the retrieved contexts
+                    refined_ques = (
+                        "Use the detailed information provided in the contexts to formulate a comprehensive and accurate response to the user's question. "
+                        # "Incorporate any relevant details seamlessly, as if drawing from a deep well of knowledge. "
+                        "If there is additional pertinent information not covered by the contexts that you know would enrich the answer, feel free to include it. "
+                        "In cases where a context includes a reference URL, present it as a clickable link that opens in a new tab or window, ensuring a smooth conversation flow. Here is a sample [here](https://www.link.com) (link opens in a new tab)"
+                        "Remember, your responses should be engaging and come across as if they're from a knowledgeable and informed guide, with a touch of your unique personality, without explicitly stating the use of provided contexts. "
+                        "Focus on delivering a response that is thorough, informative, and engaging. And make your response easily formatable with dangerouslySetInnerhtml\n\n"
+                        "Contexts:\n\n" + context_combined +
+                        "\n\n---\n\nQuestion: " + user_message +
+                        "\n\nAnswer:"
+                    )
+
+                    bot_response = await self.generate_bot_response(refined_ques)
+                    # logger.info(bot_response)
+
+                    if first_turn:
+                        await semantic_cache.store(
+                            user_message, query_embedding, contexts, bot_response, message_id
+                        )
 
                 stop = time.time()
                 duration = stop - start
@@ -123,14 +143,20 @@ class ChatConsumer(AsyncWebsocketConsumer):
                     }
                 )
 
+                # Roll older turns into the running summary once the reply is out, so it adds no latency
+                if self.conversation_memory.needs_compaction():
+                    await self.conversation_memory.compact(self.summarize_history)
+
             elif message_type == 'upvote':
                 message_id = text_data_json.get('messageId')
                 self.conversation_memory.upvote(message_id)
+                await semantic_cache.record_vote(1, message_id=message_id, entry_id=self.cached_answers.get(message_id))
                 logger.info(f"MESSAGE {message_id} UPVOTED!")
 
             elif message_type == 'downvote':
                 message_id = text_data_json.get('messageId')
                 self.conversation_memory.downvote(message_id)
+                await semantic_cache.record_vote(-1, message_id=message_id, entry_id=self.cached_answers.get(message_id))
                 logger.info(f"MESSAGE {message_id} DOWNVOTED!")
             
             elif message_type == 'end_session':
@@ -188,8 +214,8 @@ class ChatConsumer(AsyncWebsocketConsumer):
         # logger.info(f"CONVERSATION MEMORY: ")
         # logger.info(full_history)
 
-        # Make a copy and remove the most recent message (presumably the user's latest question)
-        history_except_last = full_history[:-1]  # RECTIFY: this should be the latest context not latest question
+        # Drop the raw latest question; it is replaced below by the prompt carrying the retrieved contexts
+        history_except_last = full_history[:-1]
         
         SYSTEM_PROMPT = """You are Judy which is short for Job Buddy, an AI Licensing Guide with a fun personality, tailored for medical professionals. Your role is to facilitate the licensing process and assist those looking to work in the medical field in Canada or other countries. You are knowledgeable, approachable, and have a flair for making conversations lively and enjoyable. \
             Use conversational language and sprinkle in a touch of humor where appropriate, but always keep it professional.
@@ -208,7 +234,11 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 "role": "system",
                 "content": SYSTEM_PROMPT
             },
-            *full_history
+            *history_except_last,
+            {
+                "role": "user",
+                "content": user_message
+            }
         ]
 
         judy_response = await self.single_bot_query(messages)
@@ -234,5 +264,21 @@ class ChatConsumer(AsyncWebsocketConsumer):
             messages=messages
         )
         return response.choices[0].message.content
+
+    async def summarize_history(self, summary, messages):
+        transcript = "\n\n".join(f"{message['role'].upper()}: {message['content']}" for message in messages)
+        prompt = (
+            "Update the running summary of a conversation between a user and Judy, an AI licensing guide for medical professionals. "
+            "Keep every fact the user shared about themselves (profession, province, licensing status) and the key answers given. "
+            "Be concise and write in the third person.\n\n"
+            f"Current summary:\n{summary or 'None'}\n\n"
+            f"New messages:\n{transcript}\n\n"
+            "Updated summary:"
+        )
+        response = await client.chat.completions.create(
+            model=settings.JUDY_SUMMARY_MODEL,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.choices[0].message.content
     # ----------------------- CUSTOM ASYNC FUNCTIONS --------------------------
  
\ No newline at end of file
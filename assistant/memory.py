@@ -1,10 +1,21 @@
 from datetime import datetime
 
+from django.conf import settings
+
+from helpers.token_utils import count_tokens
+
+# Rough per-message overhead OpenAI adds for role/formatting tokens
+TOKENS_PER_MESSAGE = 4
+
 
 class BaseMemory:
-    def __init__(self):
+    def __init__(self, token_budget=None):
         self.full_conversation_history = []  # Store full details including timestamps
         self.openai_conversation_history = [] # Store only role and content
+        self.openai_token_counts = []  # Token count of each message in openai_conversation_history
+        self.summary = ""  # Running summary of the turns rolled out of openai_conversation_history
+        self.summary_tokens = 0
+        self.token_budget = token_budget or settings.JUDY_HISTORY_TOKEN_BUDGET
         self.unanswered_questions = 0  # Count number of unanswered questions
         self.votes = {}
         self.session_start_time = None  # Time when the session starts
@@ -16,9 +27,9 @@ class BaseMemory:
         duration = kwargs.get('duration', None)
         self.full_conversation_history.append(
             {
-                "role": role, 
-                "content": content, 
-                "message_id": message_id, 
+                "role": role,
+                "content": content,
+                "message_id": message_id,
                 "duration": duration,
                 "timestamp": datetime.now().isoformat()
             }
@@ -26,6 +37,7 @@ class BaseMemory:
 
         # Add to OpenAI-specific conversation history
         self.openai_conversation_history.append({"role": role, "content": content})
+        self.openai_token_counts.append(count_tokens(content) + TOKENS_PER_MESSAGE)
 
     def upvote(self, message_id):
         self.votes[message_id] = self.votes.get(message_id, 0) + 1
@@ -38,9 +50,52 @@ class BaseMemory:
 
     def get_history(self):
         return self.full_conversation_history
-    
+
     def get_openai_history(self):
-        return self.openai_conversation_history
+        if not self.summary:
+            return list(self.openai_conversation_history)
+
+        summary_message = {
+            "role": "system",
+            "content": f"Summary of the earlier part of this conversation:\n{self.summary}",
+        }
+        return [summary_message, *self.openai_conversation_history]
+
+    def get_token_count(self):
+        return sum(self.openai_token_counts) + self.summary_tokens
+
+    def needs_compaction(self, start=0):
+        # Whether the history from index start still exceeds the budget. Always keep the latest
+        # exchange verbatim, however long it is
+        return (
+            len(self.openai_conversation_history) - start > 2
+            and sum(self.openai_token_counts[start:]) + self.summary_tokens > self.token_budget
+        )
+
+    async def compact(self, summarize):
+        """
+        Rolls the oldest turns into the running summary until the history fits the token budget.
+        The turns are only dropped once the summary holds them, so a failed summary loses nothing.
+
+        :param summarize: Async callable taking (current_summary, evicted_messages) and returning the new summary.
+        """
+        history = self.openai_conversation_history
+        evicted_count = 0
+        while self.needs_compaction(evicted_count):
+            evicted_count += 1
+            # Evict whole turns so the history never starts with a dangling assistant reply
+            if evicted_count < len(history) and history[evicted_count]["role"] == "assistant":
+                evicted_count += 1
+
+        if not evicted_count:
+            return self.summary
+
+        summary = await summarize(self.summary, history[:evicted_count])
+        del self.openai_conversation_history[:evicted_count]
+        del self.openai_token_counts[:evicted_count]
+        self.summary = summary
+        self.summary_tokens = count_tokens(summary) + TOKENS_PER_MESSAGE
+        return self.summary
 
     def get_votes(self):
         return self.votes
@@ -49,8 +104,9 @@ class BaseMemory:
         return {
             'full_conversation_history': self.full_conversation_history,
             'openai_conversation_history': self.openai_conversation_history,
+            'summary': self.summary,
             'unanswered_questions': self.unanswered_questions,
             'votes': self.votes,
             'session_start_time': self.session_start_time,
             'session_end_time': self.session_end_time
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:06
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SemanticCacheEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('question', models.TextField()),
+                ('embedding', models.JSONField()),
+                ('contexts_hash', models.CharField(max_length=64)),
+                ('answer_html', models.TextField()),
+                ('message_id', models.CharField(blank=True, max_length=50, null=True, unique=True)),
+                ('knowledge_version', models.PositiveIntegerField(db_index=True)),
+                ('score', models.IntegerField(default=0)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -84,3 +84,22 @@ class MessageVote(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+
+
+class SemanticCacheEntry(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    question = models.TextField()
+    embedding = models.JSONField()
+    contexts_hash = models.CharField(max_length=64)
+    answer_html = models.TextField()
+    message_id = models.CharField(max_length=50, unique=True, null=True, blank=True)  # ID the answer was first sent with
+    knowledge_version = models.PositiveIntegerField(db_index=True)
+    score = models.IntegerField(default=0)  # Net votes on the answer, entries below zero are evicted
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Cached answer for: {self.question[:50]}"
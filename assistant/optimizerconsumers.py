@@ -1,20 +1,38 @@
 import json
+from collections import Counter
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 
 from chatbackend.configs.logging_config import configure_logger
-from optimizers.cl_opt import cl_optimize_func, customize_opt_cl
-from optimizers.resume_opt import customize_resume_optimize_func, resume_optimize_func
+from optimizers.cl_opt import customize_optimized_cover_letter, optimize_cover_letter
+from optimizers.resume_opt import customize_optimized_resume, optimize_resume
+from optimizers.task_status import (
+    FINISHED_STATES,
+    SUCCEEDED,
+    TooManyTasks,
+    aenqueue_tracked_task,
+    arelease_task,
+)
 from assistant.tasks import create_conversation
 
 logger = configure_logger(__name__)
 
+# Celery task run for each process type, and whether it takes a custom instruction
+PROCESS_TASKS = {
+    "resume_optimization": (optimize_resume, False),
+    "customize_optimized_resume": (customize_optimized_resume, True),
+    "cover_letter_optimization": (optimize_cover_letter, False),
+    "customize_optimized_cover_letter": (customize_optimized_cover_letter, True),
+}
+
 
 class OptimizationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         # Retrieve the applicant_id from the query string
         self.applicant_id = self.scope["query_string"].decode("utf-8").split("=")[1]
         self.group_name = f"user_{self.applicant_id}"
+        # Unfinished tasks requested from this socket, with the number of requests for each
+        self.task_ids = Counter()
 
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
@@ -22,31 +40,53 @@ class OptimizationConsumer(AsyncWebsocketConsumer):
     async def disconnect(self, close_code):
         logger.info("...Disconnected")
 
+        # Tasks nobody else waits for are cancelled
+        for task_id, count in self.task_ids.items():
+            await arelease_task(task_id, count)
+
         # Remove this channel from the group
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
         process_type = text_data_json.get("process_type")
-        applicant_id = text_data_json.get("applicant_id")
+        applicant_id = text_data_json.get("applicant_id") or self.applicant_id
         job_post_id = text_data_json.get("job_post_id")
         custom_instruction = text_data_json.get("custom_instruction")
 
-        if process_type == "resume_optimization":
-            return_data = await resume_optimize_func(applicant_id, job_post_id)
+        if process_type not in PROCESS_TASKS:
+            await self.send(text_data=json.dumps({"error": f"Unknown process_type: {process_type}"}))
+            return
 
-        if process_type == "customize_optimized_resume":
-            return_data = await customize_resume_optimize_func(
-                applicant_id, job_post_id, custom_instruction
+        # The optimization runs in a Celery worker; its progress and result come back through
+        # the applicant's group (optimization_message)
+        task, takes_instruction = PROCESS_TASKS[process_type]
+        args = (applicant_id, job_post_id, custom_instruction) if takes_instruction else (applicant_id, job_post_id)
+        try:
+            task_id = await aenqueue_tracked_task(
+                task,
+                args,
+                applicant_id,
+                job_post_id,
+                limited=True,
+                custom_instruction=custom_instruction if takes_instruction else None,
             )
+        except TooManyTasks as e:
+            await self.send(text_data=json.dumps({"error": str(e), "process_type": process_type}))
+            return
+        self.task_ids[task_id] += 1
 
-        if process_type == "cover_letter_optimization":
-            return_data = await cl_optimize_func(applicant_id, job_post_id)
+        await self.send(text_data=json.dumps({"task_id": task_id, "process_type": process_type}))
 
-        if process_type == "customize_optimized_cover_letter":
-            return_data = await customize_opt_cl(
-                applicant_id, job_post_id, custom_instruction
-            )
+    # Handler for messages sent to the applicant's group (task status updates, bulk tailoring results)
+    async def optimization_message(self, event):
+        await self.send(text_data=event["message"])
 
-        # Send data back through the WebSocket
-        await self.send(text_data=json.dumps({"url": return_data}))
+        message = json.loads(event["message"])
+        if message.get("type") != "task_status" or message["task_id"] not in self.task_ids:
+            return
+        if message["state"] in FINISHED_STATES:
+            del self.task_ids[message["task_id"]]
+            if message["state"] == SUCCEEDED:
+                # Send data back through the WebSocket, as when the optimization ran in the consumer
+                await self.send(text_data=json.dumps({"url": message["result"], "task_id": message["task_id"]}))
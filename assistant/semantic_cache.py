@@ -0,0 +1,142 @@
+import hashlib
+import time
+from datetime import timedelta
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from assistant.models import SemanticCacheEntry
+from chatbackend.configs.logging_config import configure_logger
+from knowledge.models import KnowledgeBaseVersion
+
+logger = configure_logger(__name__)
+
+
+def hash_contexts(contexts):
+    digest = hashlib.sha256()
+    for ctx in contexts:
+        digest.update(ctx['metadata']['text'].encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SemanticCache:
+    """
+        Answer cache keyed by query embedding. A cached answer is served when a new question is
+        close enough (cosine similarity) to one already answered against the same knowledge base version.
+
+        Embeddings of live entries and the knowledge base version are held in process and
+        reloaded every `refresh_interval` seconds; the entry itself is re-validated from the
+        database on a hit, so votes from other workers are honoured immediately and version
+        bumps within one refresh interval.
+
+        Only first turns of a conversation are looked up and stored: a follow-up means
+        something different depending on the turns before it.
+    """
+    def __init__(self, threshold=None, ttl=None, max_entries=None, refresh_interval=None):
+        self.threshold = threshold or settings.JUDY_SEMANTIC_CACHE_THRESHOLD
+        self.ttl = ttl or settings.JUDY_SEMANTIC_CACHE_TTL
+        self.max_entries = max_entries or settings.JUDY_SEMANTIC_CACHE_MAX_ENTRIES
+        self.refresh_interval = refresh_interval or settings.JUDY_SEMANTIC_CACHE_REFRESH_INTERVAL
+        self._ids = []
+        self._matrix = None
+        self._loaded_at = 0
+        self._version = None
+
+    def _current_version(self):
+        if self._version is None or time.time() - self._loaded_at > self.refresh_interval:
+            self._version = KnowledgeBaseVersion.current()
+            self._load(self._version)
+        return self._version
+
+    def _cutoff(self):
+        return timezone.now() - timedelta(seconds=self.ttl)
+
+    def _live_entries(self, version):
+        return SemanticCacheEntry.objects.filter(
+            knowledge_version=version, score__gte=0, created_at__gte=self._cutoff()
+        )
+
+    def _evict(self, version):
+        deleted, _ = SemanticCacheEntry.objects.filter(
+            Q(created_at__lt=self._cutoff()) | ~Q(knowledge_version=version) | Q(score__lt=0)
+        ).delete()
+        if deleted:
+            logger.info(f"SEMANTIC CACHE: evicted {deleted} entries")
+
+    def _load(self, version):
+        self._evict(version)
+        rows = list(
+            self._live_entries(version)
+            .order_by('-created_at')
+            .values_list('id', 'embedding')[:self.max_entries]
+        )
+        self._ids = [row[0] for row in rows]
+        if rows:
+            matrix = np.asarray([row[1] for row in rows], dtype=np.float32)
+            self._matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        else:
+            self._matrix = None
+        self._loaded_at = time.time()
+
+    def _append(self, entry):
+        vector = np.asarray(entry.embedding, dtype=np.float32)
+        vector = (vector / np.linalg.norm(vector))[np.newaxis, :]
+        self._ids.insert(0, entry.id)
+        self._matrix = vector if self._matrix is None else np.vstack([vector, self._matrix])
+
+    def _lookup(self, embedding):
+        version = self._current_version()
+        if self._matrix is None:
+            return None
+
+        query = np.asarray(embedding, dtype=np.float32)
+        similarities = self._matrix @ (query / np.linalg.norm(query))
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+
+        entry = self._live_entries(version).filter(pk=self._ids[best]).first()
+        if entry is None:
+            # Evicted elsewhere (downvoted, expired or stale version) since the last reload
+            self._loaded_at = 0
+            return None
+
+        SemanticCacheEntry.objects.filter(pk=entry.pk).update(hits=F('hits') + 1)
+        logger.info(f"SEMANTIC CACHE HIT: similarity {similarities[best]:.4f}")
+        return entry
+
+    def _store(self, question, embedding, contexts, answer_html, message_id):
+        entry = SemanticCacheEntry.objects.create(
+            question=question,
+            embedding=embedding,
+            contexts_hash=hash_contexts(contexts),
+            answer_html=answer_html,
+            message_id=message_id,
+            knowledge_version=self._current_version(),
+        )
+        self._append(entry)
+        return entry
+
+    def _record_vote(self, delta, message_id=None, entry_id=None):
+        lookup = {'pk': entry_id} if entry_id else {'message_id': message_id}
+        entries = SemanticCacheEntry.objects.filter(**lookup)
+        entries.update(score=F('score') + delta)
+        # A downvoted answer must never be served again
+        entries.filter(score__lt=0).delete()
+
+    async def lookup(self, embedding):
+        return await sync_to_async(self._lookup, thread_sensitive=True)(embedding)
+
+    async def store(self, question, embedding, contexts, answer_html, message_id):
+        return await sync_to_async(self._store, thread_sensitive=True)(
+            question, embedding, contexts, answer_html, message_id
+        )
+
+    async def record_vote(self, delta, message_id=None, entry_id=None):
+        await sync_to_async(self._record_vote, thread_sensitive=True)(delta, message_id, entry_id)
+
+
+semantic_cache = SemanticCache()
@@ -4,6 +4,7 @@ from datetime import timedelta
 from pathlib import Path
 
 import dj_database_url
+from celery.schedules import crontab
 from decouple import config
 from dotenv import find_dotenv, load_dotenv
 
@@ -216,16 +217,110 @@ CELERY_RESULT_BACKEND = f"redis://{REDIS_IP}:{REDIS_PORT}/0"
 CELERY_TIMEZONE = "UTC"
 
 # List of modules to import when the Celery worker starts.
-CELERY_IMPORTS = ("chatbackend.tasks",)
+CELERY_IMPORTS = ("chatbackend.tasks", "knowledge.scraper.orchestrator", "optimizers.job_post", "optimizers.bulk_opt")
 
 # If using JSON as the serialization format
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 
+# Crawl every province site, then embed what changed (hour in UTC)
+CELERY_BEAT_SCHEDULE = {
+    "crawl-provinces": {
+        "task": "knowledge.scraper.orchestrator.crawl_provinces_task",
+        "schedule": crontab(hour=config("KNOWLEDGE_CRAWL_HOUR", default=3, cast=int), minute=0),
+    },
+    # Optimize newly published job posts before applicants tailor to them
+    "precompute-job-posts": {
+        "task": "optimizers.job_post.precompute_job_posts",
+        "schedule": crontab(minute="*/10"),
+    },
+}
+
+# Knowledge ingestion and optimizations parse and render PDFs in process pools, which the
+# daemonic children of the default prefork pool cannot start: their queues are consumed by
+# workers on the threads pool (celery -A chatbackend worker -Q knowledge --pool=threads)
+CELERY_TASK_ROUTES = {
+    "knowledge.*": {"queue": "knowledge"},
+    "optimizers.*": {"queue": "optimizations"},
+}
+
+# ==> OBJECT STORAGE
+# S3-compatible endpoint (e.g. http://minio:9000 or a moto server); unset uses AWS. Also read by django-storages
+AWS_S3_ENDPOINT_URL = config("AWS_S3_ENDPOINT_URL", default=None)
+OBJECT_STORAGE_MAX_CONNECTIONS = config("OBJECT_STORAGE_MAX_CONNECTIONS", default=20, cast=int)  # shared S3 client pool
+OBJECT_STORAGE_MULTIPART_THRESHOLD = config("OBJECT_STORAGE_MULTIPART_THRESHOLD", default=8 * 1024 * 1024, cast=int)  # bytes, also the part size
+
+# ==> OPTIMIZER PDFS
+RESUME_RENDER_CACHE_SIZE = config("RESUME_RENDER_CACHE_SIZE", default=4096, cast=int)  # paragraphs kept per thread
+# Render pool for async callers: renders beyond workers + queue size wait for a slot (seconds), then fail
+PDF_RENDER_WORKERS = config("PDF_RENDER_WORKERS", default=2, cast=int)
+PDF_RENDER_QUEUE_SIZE = config("PDF_RENDER_QUEUE_SIZE", default=16, cast=int)
+PDF_RENDER_QUEUE_TIMEOUT = config("PDF_RENDER_QUEUE_TIMEOUT", default=10, cast=float)
+PDF_RENDER_TIMEOUT = config("PDF_RENDER_TIMEOUT", default=30, cast=float)
+
+# ==> OPTIMIZER TASK STATUS
+OPTIMIZATION_STATUS_TTL = config("OPTIMIZATION_STATUS_TTL", default=24 * 60 * 60, cast=int)  # seconds a task status is kept
+# Optimizations an applicant can have queued or running at a time from the optimization socket
+OPTIMIZATION_MAX_ACTIVE_TASKS = config("OPTIMIZATION_MAX_ACTIVE_TASKS", default=3, cast=int)
+# Seconds the result of an optimization answers identical requests (same content and instruction)
+OPTIMIZATION_DEDUPE_WINDOW = config("OPTIMIZATION_DEDUPE_WINDOW", default=10 * 60, cast=int)
+
+# ==> OPTIMIZER BULK TAILORING
+BULK_TAILORING_MAX_JOBS = config("BULK_TAILORING_MAX_JOBS", default=25, cast=int)  # job posts per request
+BULK_TAILORING_CONCURRENCY = config("BULK_TAILORING_CONCURRENCY", default=4, cast=int)  # job posts tailored at a time
+
 # ==> MONGO DB
 MONGO_DB_URL = config("MONGO_DB_URL")
 MONGO_DB_NAME = config("MONGO_DB_NAME")
+
+# ==> JUDY CHAT MEMORY
+# Token budget for the history sent to the LLM; older turns are rolled into a running summary
+JUDY_HISTORY_TOKEN_BUDGET = config("JUDY_HISTORY_TOKEN_BUDGET", default=2000, cast=int)
+JUDY_SUMMARY_MODEL = config("JUDY_SUMMARY_MODEL", default="gpt-3.5-turbo-1106")
+
+# ==> JUDY SEMANTIC ANSWER CACHE
+JUDY_SEMANTIC_CACHE_THRESHOLD = config("JUDY_SEMANTIC_CACHE_THRESHOLD", default=0.95, cast=float)
+JUDY_SEMANTIC_CACHE_TTL = config("JUDY_SEMANTIC_CACHE_TTL", default=7 * 24 * 60 * 60, cast=int)  # seconds
+JUDY_SEMANTIC_CACHE_MAX_ENTRIES = config("JUDY_SEMANTIC_CACHE_MAX_ENTRIES", default=2000, cast=int)
+JUDY_SEMANTIC_CACHE_REFRESH_INTERVAL = config("JUDY_SEMANTIC_CACHE_REFRESH_INTERVAL", default=60, cast=int)  # seconds
+
+# ==> KNOWLEDGE EMBEDDINGS
+EMBEDDING_BATCH_SIZE = config("EMBEDDING_BATCH_SIZE", default=100, cast=int)  # texts per request
+EMBEDDING_BATCH_TOKEN_LIMIT = config("EMBEDDING_BATCH_TOKEN_LIMIT", default=100000, cast=int)  # tokens per request
+EMBEDDING_CONCURRENCY = config("EMBEDDING_CONCURRENCY", default=4, cast=int)  # requests in flight
+PDF_EXTRACTION_WORKERS = config("PDF_EXTRACTION_WORKERS", default=2, cast=int)  # processes parsing PDFs
+
+# ==> KNOWLEDGE VECTOR STORE
+# "pinecone" or "local" (in-process index persisted under LOCAL_VECTOR_STORE_PATH)
+VECTOR_STORE_BACKEND = config("VECTOR_STORE_BACKEND", default="pinecone")
+LOCAL_VECTOR_STORE_PATH = config("LOCAL_VECTOR_STORE_PATH", default=str(BASE_DIR / "vector_store"))
+# Corpus size from which the local store switches from brute force to an HNSW graph (needs hnswlib)
+LOCAL_VECTOR_STORE_HNSW_THRESHOLD = config("LOCAL_VECTOR_STORE_HNSW_THRESHOLD", default=20000, cast=int)
+
+# ==> KNOWLEDGE RETRIEVAL
+# Fuse BM25 matches from the sparse index with the dense matches
+HYBRID_RETRIEVAL = config("HYBRID_RETRIEVAL", default=True, cast=bool)
+SPARSE_INDEX_PATH = config("SPARSE_INDEX_PATH", default=str(BASE_DIR / "sparse_index"))
+RETRIEVAL_CANDIDATES = config("RETRIEVAL_CANDIDATES", default=20, cast=int)  # matches per retriever before fusion
+# Cross-encoder reranking the fused candidates on CPU (e.g. cross-encoder/ms-marco-MiniLM-L-6-v2); empty disables it
+RERANKER_MODEL = config("RERANKER_MODEL", default="")
+
+# ==> KNOWLEDGE SCRAPER
+SCRAPER_CONCURRENCY = config("SCRAPER_CONCURRENCY", default=8, cast=int)  # pages fetched in parallel per site
+SCRAPER_PER_HOST_LIMIT = config("SCRAPER_PER_HOST_LIMIT", default=4, cast=int)  # requests in flight per host
+SCRAPER_REQUEST_DELAY = config("SCRAPER_REQUEST_DELAY", default=0.25, cast=float)  # seconds between requests of a slot
+SCRAPER_MAX_DEPTH = config("SCRAPER_MAX_DEPTH", default=10, cast=int)
+SCRAPER_MAX_PAGES = config("SCRAPER_MAX_PAGES", default=2000, cast=int)  # per site
+SCRAPER_HTTP_TIMEOUT = config("SCRAPER_HTTP_TIMEOUT", default=30, cast=float)  # seconds
+SCRAPER_PDF_CONCURRENCY = config("SCRAPER_PDF_CONCURRENCY", default=4, cast=int)  # pdf downloads in flight per site
+SCRAPER_PDF_RETRIES = config("SCRAPER_PDF_RETRIES", default=3, cast=int)
+SCRAPER_PDF_BACKOFF = config("SCRAPER_PDF_BACKOFF", default=1.0, cast=float)  # seconds, doubled on every retry
+SCRAPER_MAX_CONCURRENT_SITES = config("SCRAPER_MAX_CONCURRENT_SITES", default=4, cast=int)  # sites crawled at once by the orchestrator
+SCRAPER_GLOBAL_HTTP_CONNECTIONS = config("SCRAPER_GLOBAL_HTTP_CONNECTIONS", default=32, cast=int)  # shared by all sites of a run
+SCRAPER_GLOBAL_BROWSER_PAGES = config("SCRAPER_GLOBAL_BROWSER_PAGES", default=8, cast=int)  # shared by all sites of a run
+SCRAPER_SEGMENT_MAX_BYTES = config("SCRAPER_SEGMENT_MAX_BYTES", default=8 * 1024 * 1024, cast=int)  # page records per uploaded segment
+SCRAPER_MAX_REMOVED_RATIO = config("SCRAPER_MAX_REMOVED_RATIO", default=0.5, cast=float)  # share of known URLs a crawl may remove before it is aborted
 # ================================ CUSTOM CONFIGS =======================================
 
 # ================================ CUSTOM VARIABLES =======================================
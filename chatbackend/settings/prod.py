@@ -72,6 +72,13 @@ STATIC_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/{AWS_LOCATION}/"
 #         }
 #     }
 # }
+# Shared by every worker: cache locks (e.g. single-flight job post optimization) must be seen by all of them
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config("REDIS_URL"),
+    }
+}
 default_channel_layer = {
     "BACKEND": "channels_redis.core.RedisChannelLayer",
     "CONFIG": {
@@ -0,0 +1,151 @@
+import asyncio
+import io
+from functools import lru_cache
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from django.conf import settings
+from more_itertools import chunked
+
+from chatbackend.configs.logging_config import configure_logger
+
+logger = configure_logger(__name__)
+
+DELETE_BATCH_SIZE = 1000  # Max keys per DeleteObjects request
+
+
+@lru_cache(maxsize=None)
+def get_s3_client():
+    """
+    One S3 client per process: creating a session and client is far slower than a request, and
+    clients are thread-safe, so uploads offloaded to threads share it and its connection pool.
+
+    Set AWS_S3_ENDPOINT_URL to point it (and django-storages) at MinIO or a moto server; tests
+    that start a mock after the client was created call `get_s3_client.cache_clear()`.
+    """
+    session = boto3.session.Session(
+        aws_access_key_id=getattr(settings, "AWS_ACCESS_KEY_ID", None),
+        aws_secret_access_key=getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
+    )
+    return session.client(
+        "s3",
+        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+        config=Config(
+            max_pool_connections=settings.OBJECT_STORAGE_MAX_CONNECTIONS,
+            retries={"max_attempts": 5, "mode": "standard"},
+        ),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_transfer_config():
+    # Bodies above the threshold are streamed as concurrent multipart uploads
+    return TransferConfig(
+        multipart_threshold=settings.OBJECT_STORAGE_MULTIPART_THRESHOLD,
+        multipart_chunksize=settings.OBJECT_STORAGE_MULTIPART_THRESHOLD,
+        max_concurrency=4,
+    )
+
+
+def default_bucket():
+    return settings.AWS_STORAGE_BUCKET_NAME
+
+
+def object_url(key, bucket=None):
+    bucket = bucket or default_bucket()
+    if settings.AWS_S3_ENDPOINT_URL:
+        return f"{settings.AWS_S3_ENDPOINT_URL.rstrip('/')}/{bucket}/{key}"
+    return f"https://{bucket}.s3.amazonaws.com/{key}"
+
+
+def upload_fileobj(file, key, bucket=None, content_type=None, content_disposition=None):
+    """
+    Uploads a file-like object (or bytes) to `key`, streaming it in parts when it is large.
+    """
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    extra_args = {}
+    if content_type:
+        extra_args["ContentType"] = content_type
+    if content_disposition:
+        extra_args["ContentDisposition"] = content_disposition
+    get_s3_client().upload_fileobj(
+        file, bucket or default_bucket(), key, ExtraArgs=extra_args or None, Config=get_transfer_config()
+    )
+
+
+def download_bytes(key, bucket=None):
+    buffer = io.BytesIO()
+    get_s3_client().download_fileobj(bucket or default_bucket(), key, buffer, Config=get_transfer_config())
+    return buffer.getvalue()
+
+
+def list_objects(prefix, bucket=None):
+    """
+    Returns (key, etag, size) of every object under `prefix`, ETags without their quotes.
+    """
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    return [
+        (obj["Key"], obj["ETag"].strip('"'), obj["Size"])
+        for page in paginator.paginate(Bucket=bucket or default_bucket(), Prefix=prefix)
+        for obj in page.get("Contents", [])
+    ]
+
+
+def list_folders(prefix, bucket=None):
+    """
+    Returns the "folders" (common prefixes) directly under `prefix`.
+    """
+    if not prefix.endswith("/"):
+        prefix += "/"
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    return [
+        common_prefix["Prefix"]
+        for page in paginator.paginate(Bucket=bucket or default_bucket(), Prefix=prefix, Delimiter="/")
+        for common_prefix in page.get("CommonPrefixes", [])
+    ]
+
+
+def delete_objects(keys, bucket=None):
+    """
+    Deletes keys in batches of DELETE_BATCH_SIZE per request.
+
+    :return: Number of keys deleted.
+    """
+    client = get_s3_client()
+    deleted = 0
+    for batch in chunked(keys, DELETE_BATCH_SIZE):
+        response = client.delete_objects(
+            Bucket=bucket or default_bucket(),
+            Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+        )
+        for error in response.get("Errors", []):
+            logger.error(f"Error deleting {error['Key']}: {error['Message']}")
+        deleted += len(batch) - len(response.get("Errors", []))
+    return deleted
+
+
+def delete_prefix(prefix, bucket=None):
+    return delete_objects([key for key, _, _ in list_objects(prefix, bucket)], bucket)
+
+
+# Coroutine variants: boto3 is blocking, so requests run in a worker thread instead of the event loop
+async def aupload_fileobj(file, key, bucket=None, content_type=None, content_disposition=None):
+    await asyncio.to_thread(upload_fileobj, file, key, bucket, content_type, content_disposition)
+
+
+async def adownload_bytes(key, bucket=None):
+    return await asyncio.to_thread(download_bytes, key, bucket)
+
+
+async def alist_objects(prefix, bucket=None):
+    return await asyncio.to_thread(list_objects, prefix, bucket)
+
+
+async def adelete_objects(keys, bucket=None):
+    return await asyncio.to_thread(delete_objects, keys, bucket)
+
+
+async def adelete_prefix(prefix, bucket=None):
+    return await asyncio.to_thread(delete_prefix, prefix, bucket)
@@ -0,0 +1,17 @@
+from functools import lru_cache
+
+import tiktoken
+
+ENCODING_NAME = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(encoding_name=ENCODING_NAME):
+    # Loading an encoding parses the whole BPE table, so keep one per process
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(text, encoding_name=ENCODING_NAME):
+    if not text:
+        return 0
+    return len(get_tokenizer(encoding_name).encode(text, disallowed_special=()))
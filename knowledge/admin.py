@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from knowledge.models import OpenAIFile
+from knowledge.models import CrawlState, KnowledgeBaseVersion, OpenAIFile
 
 
 class OpenAIFileAdmin(admin.ModelAdmin):
@@ -9,4 +9,16 @@ class OpenAIFileAdmin(admin.ModelAdmin):
         'uploaded_at', 'updated_at',
     ]
 
-admin.site.register(OpenAIFile, OpenAIFileAdmin)
\ No newline at end of file
+
+class KnowledgeBaseVersionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'version', 'updated_at']
+
+
+class CrawlStateAdmin(admin.ModelAdmin):
+    list_display = ['id', 'site', 'url', 'etag', 'last_modified', 'last_fetched', 'last_changed']
+    list_filter = ['site']
+    search_fields = ['url']
+
+admin.site.register(OpenAIFile, OpenAIFileAdmin)
+admin.site.register(KnowledgeBaseVersion, KnowledgeBaseVersionAdmin)
+admin.site.register(CrawlState, CrawlStateAdmin)
\ No newline at end of file
@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from chatbackend.configs.base_config import openai_client as client
+from chatbackend.configs.logging_config import configure_logger
+from helpers.token_utils import count_tokens
+from knowledge.models import EmbeddingCache
+
+logger = configure_logger(__name__)
+
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+EMBEDDING_BATCH_SIZE = settings.EMBEDDING_BATCH_SIZE  # Max texts per request
+EMBEDDING_BATCH_TOKEN_LIMIT = settings.EMBEDDING_BATCH_TOKEN_LIMIT  # Max tokens per request
+EMBEDDING_CONCURRENCY = settings.EMBEDDING_CONCURRENCY  # Max requests in flight
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def pack_batches(texts, batch_size=EMBEDDING_BATCH_SIZE, token_limit=EMBEDDING_BATCH_TOKEN_LIMIT):
+    """
+    Groups texts into request-sized batches of at most `batch_size` texts and `token_limit` tokens.
+    """
+    batch, batch_tokens = [], 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if batch and (len(batch) >= batch_size or batch_tokens + tokens > token_limit):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(text)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def get_cached_embeddings(hashes, model=EMBEDDING_MODEL):
+    rows = EmbeddingCache.objects.filter(model=model, content_hash__in=hashes)
+    return {row.content_hash: row.embedding for row in rows}
+
+
+def save_cached_embeddings(embeddings_by_hash, model=EMBEDDING_MODEL):
+    EmbeddingCache.objects.bulk_create(
+        [
+            EmbeddingCache(content_hash=text_hash, model=model, embedding=embedding)
+            for text_hash, embedding in embeddings_by_hash.items()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+async def embed_batch(texts, semaphore, model=EMBEDDING_MODEL):
+    async with semaphore:
+        response = await client.embeddings.create(input=texts, model=model)
+    # The API may return items out of order, so rely on their index
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+async def create_embeddings(texts, model=EMBEDDING_MODEL, concurrency=EMBEDDING_CONCURRENCY):
+    """
+    Embeds a list of texts, serving repeats from the persistent cache and sending the rest
+    as concurrent batched requests. Returns the embeddings in the order of `texts`.
+    """
+    start_time = time.time()
+    hashes = [content_hash(text) for text in texts]
+    embeddings_by_hash = await sync_to_async(get_cached_embeddings, thread_sensitive=True)(
+        set(hashes), model
+    )
+
+    # Dedupe so identical chunks are only sent once
+    missing = {}
+    for text_hash, text in zip(hashes, texts):
+        if text_hash not in embeddings_by_hash:
+            missing.setdefault(text_hash, text)
+
+    if missing:
+        semaphore = asyncio.Semaphore(concurrency)
+        batches = list(pack_batches(list(missing.values())))
+        results = await asyncio.gather(*(embed_batch(batch, semaphore, model) for batch in batches))
+
+        new_embeddings = dict(zip(missing.keys(), (embedding for result in results for embedding in result)))
+        await sync_to_async(save_cached_embeddings, thread_sensitive=True)(new_embeddings, model)
+        embeddings_by_hash.update(new_embeddings)
+
+        logger.info(
+            f"Embedded {len(missing)} texts in {len(batches)} batches "
+            f"({len(texts) - len(missing)} served from cache) in {time.time() - start_time:.2f} seconds"
+        )
+
+    return [embeddings_by_hash[text_hash] for text_hash in hashes]
+
+
+async def create_embedding(text, model=EMBEDDING_MODEL):
+    embeddings = await create_embeddings([text], model=model)
+    return embeddings[0]
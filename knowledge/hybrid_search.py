@@ -0,0 +1,72 @@
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+
+from chatbackend.configs.logging_config import configure_logger
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:  # Optional: retrieval skips the reranking stage without it
+    CrossEncoder = None
+
+logger = configure_logger(__name__)
+
+
+RRF_K = 60  # Damps the weight of the top ranks, as in the original RRF paper
+
+
+def reciprocal_rank_fusion(result_lists, k=RRF_K):
+    """
+    Merges ranked match lists (e.g. dense and sparse) by summing 1 / (k + rank) of every
+    match over the lists it appears in. Scores of different retrievers are not comparable,
+    ranks are.
+
+    :return: Matches ordered by fused score, with "score" replaced by the fused score.
+    """
+    fused = {}
+    for matches in result_lists:
+        for rank, match in enumerate(matches, start=1):
+            entry = fused.setdefault(match["id"], {**match, "score": 0.0})
+            entry["score"] += 1 / (k + rank)
+    return sorted(fused.values(), key=lambda match: match["score"], reverse=True)
+
+
+class Reranker:
+    """
+    CPU cross-encoder scoring (question, chunk) pairs jointly, which orders a short candidate
+    list more accurately than either retriever. The model is loaded on first use.
+    """
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                logger.info(f"Loading reranker model {self.model_name}")
+                self._model = CrossEncoder(self.model_name, device="cpu")
+            return self._model
+
+    def rerank(self, question, matches, top_k):
+        if not matches:
+            return []
+        scores = self.model.predict([(question, match["metadata"]["text"]) for match in matches])
+        ranked = sorted(zip(matches, scores), key=lambda pair: pair[1], reverse=True)
+        return [{**match, "score": float(score)} for match, score in ranked[:top_k]]
+
+
+@lru_cache(maxsize=None)
+def get_reranker():
+    """
+    Returns the configured Reranker, or None when RERANKER_MODEL is empty or
+    sentence-transformers is not installed.
+    """
+    if not settings.RERANKER_MODEL:
+        return None
+    if CrossEncoder is None:
+        logger.warning("RERANKER_MODEL is set but sentence-transformers is not installed; reranking disabled")
+        return None
+    return Reranker(settings.RERANKER_MODEL)
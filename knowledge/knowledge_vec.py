@@ -1,105 +1,344 @@
 import asyncio
+import hashlib
 import time
-import uuid
 
-import pinecone
-import tiktoken
+from asgiref.sync import sync_to_async
 from celery import shared_task
-from chatbackend.configs.base_config import openai_client as client
 from chatbackend.configs.logging_config import configure_logger
-from decouple import config
 from django.conf import settings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import S3DirectoryLoader
-from langchain_community.document_loaders import S3DirectoryLoader
-from more_itertools import chunked
+from django.core.files.storage import default_storage
+
+from helpers import storage_utils
+from knowledge.embeddings import content_hash, create_embedding, create_embeddings
+from knowledge.hybrid_search import get_reranker, reciprocal_rank_fusion
+from knowledge.models import CrawlState, IndexedChunk, KnowledgeBaseVersion, PdfTextCache
+from knowledge.pdf_extraction import create_extraction_pool, extract_pdf_chunks, get_splitter
+from knowledge.provinces import detect_provinces, get_knowledge_source, province_label
+from knowledge.scraper.page_records import (
+    list_page_segments,
+    load_ingested_segments,
+    load_page_manifest,
+    read_page_segment,
+    save_ingested_segments,
+)
+from knowledge.sparse_index import get_sparse_index
+from knowledge.vector_store import get_vector_store
 
 logger = configure_logger(__name__)
 
 
-pinecone.init(
-    api_key=config("PINECONE_API_KEY"), environment=config("PINECONE_API_ENV")
-)
+UPSERT_FLUSH_SIZE = 500  # New chunks embedded and upserted together
+# Part of every chunk ID: bumping it re-upserts all chunks (from the embedding cache) when
+# the metadata stored with the vectors changes
+CHUNK_SCHEMA_VERSION = 2
 
 
-CHUNK_SIZE = 1000
-CHUNK_OVERLAP = 10
-BATCH_SIZE = 50
-PINECONE_INDEX_NAME = settings.PINECONE_INDEX_NAME
+# ------------------------ UTIL FUNCTIONS ----------------------
+async def iter_scraped_chunks(knowledge_dir, manifest, reusable_sources=()):
+    """
+    Splits the page records of a knowledge directory one segment at a time, yielding
+    (url, chunk, metadata) so every chunk keeps the page it came from.
+
+    A page of `reusable_sources` whose segment was ingested before is unchanged since: it is
+    yielded once as (url, None, None), keeping its indexed chunks, and segments holding only
+    such pages are not read at all.
+    """
+    segments = await sync_to_async(list_page_segments, thread_sensitive=False)(knowledge_dir, manifest)
+    ingested = set()
+    segment_pages = {}  # segment -> live urls
+    if manifest is not None:
+        ingested = await sync_to_async(load_ingested_segments, thread_sensitive=False)(knowledge_dir)
+        for url, (segment, _) in manifest["pages"].items():
+            segment_pages.setdefault(segment, set()).add(url)
+    logger.info(f"Working on {len(segments)} page segments of {knowledge_dir} ({len(ingested)} ingested before)")
+
+    splitter = get_splitter()
+    for segment in segments:
+        reused = set()
+        if segment in ingested:
+            reused = segment_pages.get(segment, set()) & set(reusable_sources)
+            for url in reused:
+                yield url, None, None
+            if reused == segment_pages.get(segment, set()):
+                continue
+
+        records = await sync_to_async(read_page_segment, thread_sensitive=False)(segment)
+        for record in records:
+            # Records replaced by a later crawl stay in the segment until it is compacted
+            if manifest is not None and record["url"] not in segment_pages.get(segment, ()):
+                continue
+            if record["url"] in reused:
+                continue
+            metadata = {"url": record["url"], "title": record["title"]}
+            for chunk in splitter.split_text(record["text"]):
+                yield record["url"], chunk, metadata
+
+
+def list_pdf_objects(knowledge_dir):
+    """
+    Returns (name, etag) of every PDF stored for a knowledge directory. On storage without
+    ETags the MD5 of the file stands in, as it does for single-part S3 uploads.
+    """
+    prefix = f"scraped_data/{knowledge_dir}/pdfs/"
+    if getattr(default_storage, "bucket_name", None):
+        location = f"{default_storage.location}/" if default_storage.location else ""
+        return [
+            (key[len(location):], etag)
+            for key, etag, _ in storage_utils.list_objects(f"{location}{prefix}", bucket=default_storage.bucket_name)
+        ]
+
+    if not default_storage.exists(prefix):
+        return []
+    objects = []
+    for file_name in default_storage.listdir(prefix)[1]:
+        with default_storage.open(f"{prefix}{file_name}", "rb") as f:
+            objects.append((f"{prefix}{file_name}", hashlib.md5(f.read()).hexdigest()))
+    return objects
 
 
-# ------------------------ UTIL FUNCTIONS ----------------------
-async def get_text(knowledge_dir, pdfs=False):
-    def tiktoken_len(text):
-        # Tokenize and split text
-        tokenizer = tiktoken.get_encoding("cl100k_base")
-        tokens = tokenizer.encode(text, disallowed_special=())
-        return len(tokens)
-
-    # Load data
-    if pdfs:
-        dir_name = f"media/scraped_data/{knowledge_dir}/pdfs/"
-        logger.info(f"Working on pdf: {dir_name}")
-    else:
-        dir_name = f"media/scraped_data/{knowledge_dir}/scraped_content/"
-        logger.info(f"Working on scraped content: {dir_name}")
-
-    loader = S3DirectoryLoader(
-        bucket=settings.AWS_STORAGE_BUCKET_NAME,
-        prefix=dir_name,
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+def read_stored_file(name):
+    with default_storage.open(name, "rb") as f:
+        return f.read()
+
+
+def get_pdf_urls(knowledge_dir):
+    # The crawl state of a PDF holds its file name as title
+    states = CrawlState.objects.filter(site=knowledge_dir).exclude(title="")
+    return {
+        f"scraped_data/{knowledge_dir}/pdfs/{title}": url
+        for url, title in states.values_list("url", "title")
+    }
+
+
+def get_cached_pdf_texts(etags):
+    return dict(PdfTextCache.objects.filter(etag__in=etags).values_list("etag", "text"))
+
+
+def save_pdf_text(etag, text):
+    PdfTextCache.objects.bulk_create([PdfTextCache(etag=etag, text=text)], ignore_conflicts=True)
+
+
+async def iter_pdf_chunks(knowledge_dir):
+    """
+    Extracts and splits the PDFs of a knowledge directory that the crawl state still refers to
+    in a process pool, yielding (source, chunk, metadata) as each PDF completes. A PDF that
+    fails is yielded once as (source, None, None) so its indexed chunks are kept.
+    """
+    pdf_urls = await sync_to_async(get_pdf_urls, thread_sensitive=True)(knowledge_dir)
+    stored_objects = await sync_to_async(list_pdf_objects, thread_sensitive=False)(knowledge_dir)
+    # PDFs no longer linked from the site are deleted by the crawl; skip any it failed to delete
+    objects = [(name, etag) for name, etag in stored_objects if name in pdf_urls]
+    cached_texts = await sync_to_async(get_cached_pdf_texts, thread_sensitive=True)(
+        [etag for _, etag in objects]
     )
-    data = loader.load()
-    logger.info("Done getting texts from s3 knowledge datastore")
-
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=tiktoken_len,
-        separators=["\n\n", "\n", " ", ""],
+    logger.info(
+        f"Working on {len(objects)} pdfs of {knowledge_dir} ({len(cached_texts)} extracted before, "
+        f"{len(stored_objects) - len(objects)} no longer linked skipped)"
     )
-    texts = text_splitter.split_documents(data)
-    logger.info("Done splitting data into texts")
-    return texts
 
+    loop = asyncio.get_running_loop()
+    workers = settings.PDF_EXTRACTION_WORKERS
+    # Bound the PDFs held in memory while waiting for a worker
+    downloads = asyncio.Semaphore(workers * 2)
+
+    with create_extraction_pool(workers) as pool:
+        async def extract(name, etag):
+            try:
+                async with downloads:
+                    text = cached_texts.get(etag)
+                    data = None
+                    if text is None:
+                        data = await sync_to_async(read_stored_file, thread_sensitive=False)(name)
+                    text, chunks = await loop.run_in_executor(pool, extract_pdf_chunks, data, text)
+                if etag not in cached_texts:
+                    await sync_to_async(save_pdf_text, thread_sensitive=True)(etag, text)
+            except Exception as e:
+                logger.error(f"Error extracting text from {name}: {e}")
+                return name, None
+            return name, chunks
+
+        for task in asyncio.as_completed([extract(name, etag) for name, etag in objects]):
+            source, chunks = await task
+            if chunks is None:
+                yield source, None, None
+                continue
+            metadata = {"url": pdf_urls.get(source, ""), "title": source.rsplit("/", 1)[-1]}
+            for chunk in chunks:
+                yield source, chunk, metadata
+
+
+def make_chunk_id(source, text_hash):
+    # Deterministic, so re-ingesting an unchanged chunk maps onto the vector already indexed
+    return hashlib.sha256(f"{source}:{text_hash}:{CHUNK_SCHEMA_VERSION}".encode("utf-8")).hexdigest()
+
+
+def get_indexed_chunk_ids(knowledge_dir, source_type):
+    return dict(
+        IndexedChunk.objects.filter(
+            knowledge_dir=knowledge_dir, source_type=source_type
+        ).values_list("chunk_id", "source")
+    )
 
-async def create_embedding(text):
-    response = await client.embeddings.create(input=[text], model="text-embedding-ada-002")
-    text_embedded = response.data[0].embedding
-    return text_embedded
 
+def update_manifest(knowledge_dir, source_type, added_chunks, removed_ids):
+    IndexedChunk.objects.filter(chunk_id__in=removed_ids).delete()
+    IndexedChunk.objects.bulk_create(
+        [
+            IndexedChunk(
+                chunk_id=chunk_id,
+                knowledge_dir=knowledge_dir,
+                source_type=source_type,
+                source=source,
+                content_hash=text_hash,
+            )
+            for chunk_id, (source, text_hash) in added_chunks.items()
+        ],
+        ignore_conflicts=True,
+    )
 
-async def upload_data(PINECONE_INDEX_NAME, knowledge_dir, pdf):
-    pinecone_index = pinecone.Index(index_name=PINECONE_INDEX_NAME)
-    text_chunks = await get_text(knowledge_dir, pdf)
-    embeddings = []
 
-    for i, chunk in enumerate(text_chunks):
-        id = uuid.uuid4().hex
-        content_embedded = await create_embedding(chunk.page_content)
-        embedding = (id, content_embedded, {"text": chunk.page_content})
-        embeddings.append(embedding)
-        logger.info(f"Appended embedding chunk {i}")
+async def upload_data(vector_store, sparse_index, knowledge_dir, pdf):
+    """
+    Syncs the vector index with the current content of a knowledge directory: only chunks
+    missing from the manifest are embedded and upserted, and chunks no longer present are deleted.
+    Chunks are consumed as they are produced and embedded in batches of UPSERT_FLUSH_SIZE; the
+    vector store and sparse index are written out once at the end, and the manifest only
+    records chunks after that, even when the sync fails part way.
+    Added chunks count as "changed" when their source was indexed before and as "new" otherwise.
+    Every vector is stored with the province, regulator, URL and document type of its chunk.
+    Pages unchanged since the crawl manifest last synced are not read again, and that manifest's
+    segments are recorded as ingested once the sync succeeds.
+
+    The sparse index follows the same upserts and deletes, and indexed chunks it lacks (e.g.
+    ingested before it existed) are added to it without being embedded again.
+    """
+    source_type = "pdfs" if pdf else "scraped_content"
+    province, regulator = get_knowledge_source(knowledge_dir)
+    base_metadata = {"province": province, "regulator": regulator, "doc_type": "pdf" if pdf else "page"}
+
+    indexed_ids = await sync_to_async(get_indexed_chunk_ids, thread_sensitive=True)(
+        knowledge_dir, source_type
+    )
+    indexed_sources = set(indexed_ids.values())
+    sparse_missing = await sync_to_async(sparse_index.missing_ids, thread_sensitive=False)(indexed_ids)
+    manifest = None
+    if pdf:
+        chunk_stream = iter_pdf_chunks(knowledge_dir)
+    else:
+        manifest = await sync_to_async(load_page_manifest, thread_sensitive=False)(knowledge_dir)
+        # Pages with chunks missing from the sparse index are read again to fill it
+        reusable_sources = indexed_sources - {indexed_ids[chunk_id] for chunk_id in sparse_missing}
+        chunk_stream = iter_scraped_chunks(knowledge_dir, manifest, reusable_sources)
+    seen_ids = set()
+    kept_sources = set()  # Sources yielded without chunks: unchanged, or failed to be read
+    pending = {}  # chunk_id -> (source, text_hash, text, metadata)
+    sparse_pending = []  # (chunk_id, text, metadata) of indexed chunks missing from the sparse index
+    stats = {"new": 0, "changed": 0, "removed": 0, "unchanged": 0}
+    added_chunks = {}  # chunk_id -> (source, text_hash) of the chunks upserted
+    removed_ids = []
+
+    async def embed_pending():
+        contents_embedded = await create_embeddings([text for _, _, text, _ in pending.values()])
+        embeddings = [
+            (chunk_id, content_embedded, {**base_metadata, **metadata, "text": text})
+            for (chunk_id, (_, _, text, metadata)), content_embedded
+            in zip(pending.items(), contents_embedded)
+        ]
+        await sync_to_async(vector_store.upsert, thread_sensitive=False)(embeddings)
+        await sync_to_async(sparse_index.upsert, thread_sensitive=False)(
+            [
+                (chunk_id, text, {**base_metadata, **metadata})
+                for chunk_id, (_, _, text, metadata) in pending.items()
+            ]
+        )
+        added_chunks.update(
+            {chunk_id: (source, text_hash) for chunk_id, (source, text_hash, _, _) in pending.items()}
+        )
+        for source, _, _, _ in pending.values():
+            stats["changed" if source in indexed_sources else "new"] += 1
+        pending.clear()
+
+    try:
+        async for source, text, metadata in chunk_stream:
+            if text is None:
+                kept_sources.add(source)
+                continue
+            text_hash = content_hash(text)
+            chunk_id = make_chunk_id(source, text_hash)
+            if chunk_id in seen_ids:
+                continue
+            seen_ids.add(chunk_id)
+            if chunk_id in indexed_ids:
+                stats["unchanged"] += 1
+                if chunk_id in sparse_missing:
+                    sparse_pending.append((chunk_id, text, {**base_metadata, **metadata}))
+                    if len(sparse_pending) >= UPSERT_FLUSH_SIZE:
+                        await sync_to_async(sparse_index.upsert, thread_sensitive=False)(sparse_pending)
+                        sparse_pending = []
+                continue
+            pending[chunk_id] = (source, text_hash, text, metadata)
+            if len(pending) >= UPSERT_FLUSH_SIZE:
+                await embed_pending()
+
+        if pending:
+            await embed_pending()
+        if sparse_pending:
+            await sync_to_async(sparse_index.upsert, thread_sensitive=False)(sparse_pending)
+
+        # Keep the vectors of sources that were not read this time rather than dropping them
+        removed_ids = []
+        for chunk_id, source in indexed_ids.items():
+            if chunk_id in seen_ids:
+                continue
+            if source in kept_sources:
+                stats["unchanged"] += 1
+            else:
+                removed_ids.append(chunk_id)
+        if removed_ids:
+            await sync_to_async(vector_store.delete, thread_sensitive=False)(removed_ids)
+            await sync_to_async(sparse_index.delete, thread_sensitive=False)(removed_ids)
+    finally:
+        await sync_to_async(vector_store.flush, thread_sensitive=False)()
+        await sync_to_async(sparse_index.flush, thread_sensitive=False)()
+        await sync_to_async(update_manifest, thread_sensitive=True)(
+            knowledge_dir, source_type, added_chunks, removed_ids
+        )
+    stats["removed"] = len(removed_ids)
+    if manifest is not None:
+        await sync_to_async(save_ingested_segments, thread_sensitive=False)(knowledge_dir, manifest["segments"])
 
-    # Split the embeddings into smaller chunks (e.g., 50 vectors per request)
-    for i, batch in enumerate(chunked(embeddings, BATCH_SIZE)):
-        logger.info(f"Uploaded Batch {i}")
-        pinecone_index.upsert(batch)
+    logger.info(f"Synced {knowledge_dir}/{source_type} with the vector index: {stats}")
+    return stats
 
 
 async def save_vec_to_database(knowledge_dir, first_db_opt=False):
     logger.info(f"Save-to-vec process started")
 
-    if first_db_opt and PINECONE_INDEX_NAME in pinecone.list_indexes():
-        logger.info(f"Deleting existing index: {PINECONE_INDEX_NAME}")
-        pinecone.delete_index(PINECONE_INDEX_NAME)
+    vector_store = get_vector_store()
+    sparse_index = get_sparse_index()
 
-    if PINECONE_INDEX_NAME not in pinecone.list_indexes():
-        logger.info(f"Creating new index: {PINECONE_INDEX_NAME}")
-        pinecone.create_index(PINECONE_INDEX_NAME, dimension=1536)
+    if first_db_opt:
+        await sync_to_async(vector_store.reset, thread_sensitive=False)()
+        await sync_to_async(sparse_index.reset, thread_sensitive=False)()
+        # The manifest describes the dropped index, so everything has to be re-indexed
+        await sync_to_async(IndexedChunk.objects.all().delete, thread_sensitive=True)()
 
-    await upload_data(PINECONE_INDEX_NAME, knowledge_dir, pdf=False)
+    await sync_to_async(vector_store.ensure_index, thread_sensitive=False)()
+
+    stats = {
+        "scraped_content": await upload_data(vector_store, sparse_index, knowledge_dir, pdf=False),
+        "pdfs": await upload_data(vector_store, sparse_index, knowledge_dir, pdf=True),
+    }
+
+    if any(
+        source_stats["new"] or source_stats["changed"] or source_stats["removed"]
+        for source_stats in stats.values()
+    ):
+        # Invalidate answers cached against the previous state of the index
+        version = await sync_to_async(KnowledgeBaseVersion.bump, thread_sensitive=True)()
+        logger.info(f"Knowledge base version bumped to {version}")
+
+    return stats
 
 
 @shared_task
@@ -113,26 +352,98 @@ def save_vec_to_database_task(knowledge_dir, first_db_opt=False):
     return result
 
 
-async def query_vec_database(query, num_results):
-    start_time = time.time()
-    query = f"Across all Canadian provinces, regarding healthcare job regulations and opportunities: {query}"
-    query_embedding = await create_embedding(query)
+async def embed_query(query):
+    provinces = detect_provinces(query)
+    if provinces:
+        query = f"In {province_label(provinces)}, regarding healthcare job regulations and opportunities: {query}"
+    else:
+        query = f"Across all Canadian provinces, regarding healthcare job regulations and opportunities: {query}"
+    return await create_embedding(query)
+
+
+async def dense_search(query_embedding, top_k, filter=None):
+    vector_store = get_vector_store()
+    return await sync_to_async(vector_store.query, thread_sensitive=False)(
+        query_embedding, top_k=top_k, filter=filter
+    )
+
+
+async def sparse_search(query, top_k, filter=None):
+    sparse_index = get_sparse_index()
+    return await sync_to_async(sparse_index.query, thread_sensitive=False)(query, top_k, filter)
+
 
-    pinecone_index = pinecone.Index(index_name=PINECONE_INDEX_NAME)
+async def rerank(query, matches, top_k):
+    reranker = get_reranker()
+    if reranker is None:
+        return matches[:top_k]
+    return await asyncio.to_thread(reranker.rerank, query, matches, top_k)
 
+
+async def retrieve(query, query_embedding, top_k, filter=None, timings=None):
+    """
+    Hybrid retrieval: dense and BM25 candidates are fetched concurrently, fused by reciprocal
+    rank and, when a reranker is configured, reordered by the cross-encoder.
+
+    :param timings: Optional dict collecting the duration in seconds of every stage.
+    """
+    timings = {} if timings is None else timings
+    candidates = max(settings.RETRIEVAL_CANDIDATES, top_k)
+
+    async def timed(stage, coroutine):
+        start_time = time.perf_counter()
+        result = await coroutine
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start_time
+        return result
+
+    if not settings.HYBRID_RETRIEVAL:
+        return await timed("dense", dense_search(query_embedding, top_k, filter))
+
+    dense_matches, sparse_matches = await asyncio.gather(
+        timed("dense", dense_search(query_embedding, candidates, filter)),
+        timed("sparse", sparse_search(query, candidates, filter)),
+    )
+    fused = reciprocal_rank_fusion([dense_matches, sparse_matches])
+    return await timed("rerank", rerank(query, fused[:candidates], top_k))
+
+
+async def query_vec_database(query, num_results=3, query_embedding=None, provinces=None):
+    """
+    Returns up to `num_results` matches for a question. When the question names provinces
+    (or `provinces` is given) only their chunks are searched, topped up from the whole index
+    when they do not fill `num_results`.
+    """
+    start_time = time.time()
+    if query_embedding is None:
+        query_embedding = await embed_query(query)
+    if provinces is None:
+        provinces = detect_provinces(query)
+
+    timings = {}
     try:
-        results = pinecone_index.query(
-            query_embedding, top_k=num_results, include_metadata=True
-        )
+        if provinces:
+            matches = await retrieve(
+                query, query_embedding, num_results, {"province": {"$in": provinces}}, timings
+            )
+            if len(matches) < num_results:
+                matched_ids = {match["id"] for match in matches}
+                matches += [
+                    match for match in await retrieve(query, query_embedding, num_results, timings=timings)
+                    if match["id"] not in matched_ids
+                ]
+        else:
+            matches = await retrieve(query, query_embedding, num_results, timings=timings)
     except Exception as e:
-        logger.error(f"Error querying Pinecone index: {e}")
+        logger.error(f"Error querying {settings.VECTOR_STORE_BACKEND} vector store: {e}")
         return []
 
     duration = time.time() - start_time
-    logger.info(f"QUERY VEC DURATION: {duration:.2f} seconds")
+    stages = ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in timings.items())
+    logger.info(f"QUERY VEC DURATION: {duration:.2f} seconds ({stages}; provinces: {provinces or 'all'})")
 
-    contexts = [results["matches"][0], results["matches"][1], results["matches"][2]]
-    return contexts
+    if len(matches) < num_results:
+        logger.warning(f"Only {len(matches)} of {num_results} contexts found for the query")
+    return matches[:num_results]
 
 
 # print(results["matches"][0]['metadata']['text'])
@@ -0,0 +1,98 @@
+import json
+import random
+import re
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from knowledge.hybrid_search import get_reranker, reciprocal_rank_fusion
+from knowledge.knowledge_vec import dense_search, embed_query, rerank, sparse_search
+from knowledge.sparse_index import get_sparse_index
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def known_item_query(text, rng, max_words=16):
+    # A sentence of the chunk stands in for a question whose answer is that chunk
+    sentences = [sentence.split() for sentence in SENTENCE_PATTERN.split(text) if len(sentence.split()) >= 6]
+    words = rng.choice(sentences) if sentences else text.split()
+    start = rng.randint(0, max(len(words) - max_words, 0))
+    return " ".join(words[start:start + max_words])
+
+
+class Command(BaseCommand):
+    help = "Offline evaluation of dense, BM25, fused and reranked retrieval: recall@k and latency per stage"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dataset",
+            help='JSONL file of {"question": ..., "relevant_urls": [...]} to evaluate instead of known-item queries',
+        )
+        parser.add_argument("--samples", type=int, default=50, help="Known-item queries drawn from the sparse index")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10], help="Cut-offs of recall@k")
+
+    def load_dataset(self, options):
+        if options["dataset"]:
+            with open(options["dataset"], encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+            return [
+                (row["question"], lambda match, urls=set(row["relevant_urls"]): match["metadata"].get("url") in urls)
+                for row in rows
+            ]
+
+        rng = random.Random(options["seed"])
+        samples = get_sparse_index().sample(options["samples"], seed=options["seed"])
+        if not samples:
+            raise CommandError("The sparse index is empty; run the knowledge ingestion first")
+        return [
+            (known_item_query(metadata["text"], rng), lambda match, chunk_id=chunk_id: match["id"] == chunk_id)
+            for chunk_id, metadata in samples
+        ]
+
+    def handle(self, *args, **options):
+        dataset = self.load_dataset(options)
+        cutoffs = sorted(options["k"])
+        depth = max(cutoffs)
+        candidates = max(settings.RETRIEVAL_CANDIDATES, depth)
+        stages = ["dense", "sparse", "hybrid"] + (["hybrid+rerank"] if get_reranker() else [])
+
+        hits = {stage: {k: 0 for k in cutoffs} for stage in stages}
+        latencies = {stage: [] for stage in ["embed", "dense", "sparse", "fusion", "rerank"]}
+
+        def timed(stage, function, *args):
+            start_time = time.perf_counter()
+            result = function(*args)
+            latencies[stage].append((time.perf_counter() - start_time) * 1000)
+            return result
+
+        for question, is_relevant in dataset:
+            embedding = timed("embed", async_to_sync(embed_query), question)
+            dense_matches = timed("dense", async_to_sync(dense_search), embedding, candidates)
+            sparse_matches = timed("sparse", async_to_sync(sparse_search), question, candidates)
+            fused = timed("fusion", reciprocal_rank_fusion, [dense_matches, sparse_matches])[:candidates]
+            rankings = {"dense": dense_matches, "sparse": sparse_matches, "hybrid": fused}
+            if "hybrid+rerank" in stages:
+                rankings["hybrid+rerank"] = timed("rerank", async_to_sync(rerank), question, fused, depth)
+
+            for stage, matches in rankings.items():
+                for k in cutoffs:
+                    if any(is_relevant(match) for match in matches[:k]):
+                        hits[stage][k] += 1
+
+        self.stdout.write(f"{len(dataset)} queries, {candidates} candidates per retriever")
+        for stage in stages:
+            recalls = ", ".join(f"R@{k} {hits[stage][k] / len(dataset):.2%}" for k in cutoffs)
+            self.stdout.write(self.style.SUCCESS(f"{stage}: {recalls}"))
+        for stage, values in latencies.items():
+            if not values:
+                continue
+            values.sort()
+            self.stdout.write(
+                f"{stage} latency: mean {statistics.mean(values):.2f} ms, "
+                f"p50 {values[len(values) // 2]:.2f} ms, "
+                f"p95 {values[max(int(len(values) * 0.95) - 1, 0)]:.2f} ms"
+            )
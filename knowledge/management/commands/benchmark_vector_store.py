@@ -0,0 +1,82 @@
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+
+from knowledge.knowledge_vec import embed_query
+from knowledge.models import IndexedChunk
+from knowledge.vector_store import get_vector_store
+
+SAMPLE_QUESTIONS = [
+    "How do I get my nursing license in Ontario?",
+    "What are the requirements for internationally educated nurses in British Columbia?",
+    "How long does the NCLEX registration process take?",
+    "Do I need a language test to register as a nurse in Alberta?",
+    "What documents are needed to register with the College of Nurses?",
+    "Can a licensed practical nurse work in Saskatchewan?",
+    "How much does it cost to apply for nursing registration in Manitoba?",
+    "What is a bridging program for nurses?",
+]
+
+
+class Command(BaseCommand):
+    help = "Compares query latency (and result overlap) of the Pinecone and local vector stores"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backends", nargs="+", default=["pinecone", "local"])
+        parser.add_argument("--top-k", type=int, default=3)
+        parser.add_argument("--runs", type=int, default=5, help="Repetitions of every sample question")
+        parser.add_argument(
+            "--populate-local",
+            action="store_true",
+            help="Copy every vector in the ingestion manifest from Pinecone into the local store first",
+        )
+
+    def populate_local(self):
+        chunk_ids = list(IndexedChunk.objects.values_list("chunk_id", flat=True))
+        vectors = get_vector_store("pinecone").fetch(chunk_ids)
+        local_store = get_vector_store("local")
+        local_store.reset()
+        local_store.upsert(vectors)
+        local_store.flush()
+        self.stdout.write(f"Copied {len(vectors)} vectors into the local store")
+
+    def handle(self, *args, **options):
+        if options["populate_local"]:
+            self.populate_local()
+
+        embeddings = [async_to_sync(embed_query)(question) for question in SAMPLE_QUESTIONS]
+        top_k = options["top_k"]
+
+        results = {}
+        for backend in options["backends"]:
+            store = get_vector_store(backend)
+            store.query(embeddings[0], top_k=top_k)  # Warm up (index load, connection setup)
+
+            latencies = []
+            for _ in range(options["runs"]):
+                for embedding in embeddings:
+                    start_time = time.perf_counter()
+                    store.query(embedding, top_k=top_k)
+                    latencies.append((time.perf_counter() - start_time) * 1000)
+            results[backend] = [
+                {match["id"] for match in store.query(embedding, top_k=top_k)} for embedding in embeddings
+            ]
+
+            latencies.sort()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{backend}: {len(latencies)} queries, "
+                    f"mean {statistics.mean(latencies):.2f} ms, "
+                    f"p50 {latencies[len(latencies) // 2]:.2f} ms, "
+                    f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms"
+                )
+            )
+
+        if "pinecone" in results and "local" in results:
+            overlaps = [
+                len(pinecone_ids & local_ids) / max(len(pinecone_ids), 1)
+                for pinecone_ids, local_ids in zip(results["pinecone"], results["local"])
+            ]
+            self.stdout.write(f"Top-{top_k} overlap between backends: {statistics.mean(overlaps):.2%}")
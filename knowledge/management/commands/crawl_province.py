@@ -0,0 +1,53 @@
+import asyncio
+import dataclasses
+import importlib
+
+from django.core.management.base import BaseCommand, CommandError
+
+from knowledge.scraper.crawler import CrawlAborted, crawl_site
+
+
+class Command(BaseCommand):
+    help = "Crawls one province site with the shared crawl engine and reports its throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument("province", help="Module in knowledge/scraper/scrape_scripts, e.g. manitoba_1")
+        parser.add_argument("--concurrency", type=int)
+        parser.add_argument("--per-host-limit", type=int)
+        parser.add_argument("--request-delay", type=float)
+        parser.add_argument("--max-depth", type=int)
+        parser.add_argument("--max-pages", type=int)
+        parser.add_argument(
+            "--base-url",
+            help="Crawl this URL with the province's selectors instead (e.g. a local static copy of the site)",
+        )
+        parser.add_argument("--no-upload", action="store_true", help="Do not save the scraped content")
+
+    def handle(self, *args, **options):
+        try:
+            module = importlib.import_module(f"knowledge.scraper.scrape_scripts.{options['province']}")
+            site = module.SITE
+        except (ImportError, AttributeError):
+            raise CommandError(f"Unknown province: {options['province']}")
+
+        if options["base_url"]:
+            site = dataclasses.replace(
+                site, base_url=options["base_url"], start_urls=(), allowed_prefixes=(), excluded_urls=()
+            )
+
+        crawler_options = {
+            key: options[key]
+            for key in ("concurrency", "per_host_limit", "request_delay", "max_depth", "max_pages")
+            if options[key] is not None
+        }
+        try:
+            stats = asyncio.run(crawl_site(site, upload=not options["no_upload"], **crawler_options))
+        except CrawlAborted as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{stats['site']}: {stats['pages']} pages, {stats['pdfs']} pdfs, {stats['errors']} errors "
+                f"in {stats['duration']}s ({stats['pages_per_second']} pages/sec), "
+                f"browser fallback rate {stats['fallback_rate']:.1%}"
+            )
+        )
@@ -0,0 +1,23 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from knowledge.provinces import KNOWLEDGE_SOURCES
+from knowledge.scraper.orchestrator import crawl_provinces, format_summary
+
+
+class Command(BaseCommand):
+    help = "Crawls the province sites concurrently, embeds what changed and prints the run summary"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "sites", nargs="*", help="Knowledge directories to crawl, e.g. manitoba_1 (defaults to all)"
+        )
+
+    def handle(self, *args, **options):
+        unknown = [site for site in options["sites"] if site not in KNOWLEDGE_SOURCES]
+        if unknown:
+            raise CommandError(f"Unknown province sites: {', '.join(unknown)}")
+
+        summary = asyncio.run(crawl_provinces(options["sites"] or None))
+        self.stdout.write(format_summary(summary))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knowledge', '0003_embeddingcache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexedChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chunk_id', models.CharField(max_length=64, unique=True)),
+                ('knowledge_dir', models.CharField(db_index=True, max_length=255)),
+                ('source_type', models.CharField(choices=[('scraped_content', 'Scraped Content'), ('pdfs', 'PDFs')], max_length=20)),
+                ('source', models.CharField(max_length=1024)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('indexed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -23,3 +23,98 @@ class OpenAIFile(models.Model):
             self.previous_version = previous_version
             self.pk = None  # This will create a new record
             super().save(*args, **kwargs)
+
+
+class KnowledgeBaseVersion(models.Model):
+    """
+    Single-row counter bumped whenever the vector index changes, so caches built on
+    top of the knowledge base can tell their entries are stale.
+    """
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Knowledge Base Version {self.version}"
+
+    @classmethod
+    def current(cls):
+        instance, _ = cls.objects.get_or_create(pk=1)
+        return instance.version
+
+    @classmethod
+    def bump(cls):
+        cls.objects.get_or_create(pk=1)
+        cls.objects.filter(pk=1).update(version=models.F("version") + 1)
+        return cls.current()
+
+
+class EmbeddingCache(models.Model):
+    content_hash = models.CharField(max_length=64)  # sha256 of the embedded text
+    model = models.CharField(max_length=100)  # Embeddings from different models are never mixed
+    embedding = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("content_hash", "model")
+
+    def __str__(self):
+        return f"{self.model} embedding {self.content_hash[:12]}"
+
+
+class IndexedChunk(models.Model):
+    """
+    Manifest of the chunks currently upserted to the vector index, used to diff each
+    ingestion run so only new or changed chunks are embedded and removed ones deleted.
+    """
+    SOURCE_TYPE_CHOICES = [
+        ('scraped_content', 'Scraped Content'),
+        ('pdfs', 'PDFs'),
+    ]
+
+    chunk_id = models.CharField(max_length=64, unique=True)  # Deterministic ID, also used as the vector ID
+    knowledge_dir = models.CharField(max_length=255, db_index=True)
+    source_type = models.CharField(max_length=20, choices=SOURCE_TYPE_CHOICES)
+    source = models.CharField(max_length=1024)
+    content_hash = models.CharField(max_length=64)
+    indexed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.knowledge_dir} chunk {self.chunk_id[:12]}"
+
+
+class CrawlState(models.Model):
+    """
+    Last known state of every URL crawled for a knowledge directory. Validators are sent as
+    conditional requests on the next crawl, and the extracted text and links let unchanged
+    pages be reused without being parsed again.
+    """
+    site = models.CharField(max_length=255)  # Knowledge directory of the crawl
+    url = models.URLField(max_length=2048)
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)  # Raw Last-Modified header
+    content_hash = models.CharField(max_length=64, blank=True)  # sha256 of the fetched document
+    title = models.CharField(max_length=512, blank=True)  # <title> of a page, file name of a PDF
+    content = models.TextField(blank=True)  # Extracted page text
+    links = models.JSONField(default=list)  # Links followed from the page
+    pdf_links = models.JSONField(default=list)  # [url, pdf name] of the PDFs linked from the content
+    last_fetched = models.DateTimeField(null=True, blank=True)
+    last_changed = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("site", "url")
+
+    def __str__(self):
+        return f"{self.site}: {self.url}"
+
+
+class PdfTextCache(models.Model):
+    """
+    Text extracted from a stored PDF, keyed by the object's ETag so a PDF is only parsed
+    again when its content changes.
+    """
+    etag = models.CharField(max_length=255, unique=True)
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"PDF text {self.etag}"
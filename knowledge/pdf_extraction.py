@@ -0,0 +1,65 @@
+# PDF text extraction and chunking, run in the worker processes of the extraction pool.
+# The spawned workers import this module, so it must not depend on Django being set up.
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from pdfminer.high_level import extract_text
+
+from chatbackend.configs.logging_config import configure_logger
+from helpers.token_utils import count_tokens, get_tokenizer
+
+logger = configure_logger(__name__)
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 10
+SEPARATORS = ["\n\n", "\n", " ", ""]
+
+_splitter = None
+
+
+def get_splitter():
+    # One splitter (and, through count_tokens, one tokenizer) per process
+    global _splitter
+    if _splitter is None:
+        _splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            length_function=count_tokens,
+            separators=SEPARATORS,
+        )
+    return _splitter
+
+
+def init_worker():
+    # Load the BPE table once when the worker starts rather than on its first chunk
+    get_tokenizer()
+    get_splitter()
+
+
+def extract_pdf_chunks(data=None, text=None):
+    """
+    Extracts the text of a PDF (unless already known) and splits it into chunks.
+
+    :param data: Raw bytes of the PDF.
+    :param text: Previously extracted text, in which case `data` is not parsed.
+    :return: (text, [chunk, ...])
+    """
+    if text is None:
+        text = extract_text(BytesIO(data))
+    return text, get_splitter().split_text(text)
+
+
+def create_extraction_pool(max_workers):
+    if multiprocessing.current_process().daemon:
+        # Daemonic processes (e.g. Celery prefork children) cannot start processes of their own;
+        # the knowledge queue is meant for a worker on the threads pool (see CELERY_TASK_ROUTES)
+        logger.warning("Running in a daemonic process, PDFs are extracted on a single thread")
+        return ThreadPoolExecutor(max_workers=1, initializer=init_worker)
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=init_worker,
+        # Forking a process running an event loop and DB connections is unsafe; start clean workers
+        mp_context=multiprocessing.get_context("spawn"),
+    )
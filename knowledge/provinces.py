@@ -0,0 +1,102 @@
+# Provinces and regulators of the knowledge base, and the query router that detects which
+# provinces a question is about so retrieval can be restricted to their chunks.
+import re
+
+PROVINCES = {
+    "alberta": ("Alberta", ["alberta"], ["AB"]),
+    "british_columbia": ("British Columbia", ["british columbia"], ["BC", "B.C."]),
+    "manitoba": ("Manitoba", ["manitoba"], ["MB"]),
+    "new_brunswick": ("New Brunswick", ["new brunswick"], ["NB"]),
+    "newfoundland_and_labrador": ("Newfoundland and Labrador", ["newfoundland", "labrador"], ["NL"]),
+    "nova_scotia": ("Nova Scotia", ["nova scotia"], ["NS"]),
+    "ontario": ("Ontario", ["ontario"], ["ON"]),
+    "prince_edward_island": ("Prince Edward Island", ["prince edward island"], ["PEI", "PE"]),
+    "quebec": ("Quebec", ["quebec", "québec"], ["QC"]),
+    "saskatchewan": ("Saskatchewan", ["saskatchewan"], ["SK"]),
+    "northwest_territories": ("Northwest Territories", ["northwest territories"], ["NWT", "NT"]),
+    "nunavut": ("Nunavut", ["nunavut"], ["NU"]),
+    "yukon": ("Yukon", ["yukon"], ["YT"]),
+}
+
+# Knowledge directory -> (province, regulator) of the site it was scraped from
+KNOWLEDGE_SOURCES = {
+    "alberta_1": ("alberta", "CRNA"),
+    "alberta_2": ("alberta", "CLPNA"),
+    "alberta_3": ("alberta", "CRPNA"),
+    "british": ("british_columbia", "BCCNM"),
+    "brunswick_1": ("new_brunswick", "NANB"),
+    "brunswick_2": ("new_brunswick", "ANBLPN"),
+    "manitoba_1": ("manitoba", "CRNM"),
+    "manitoba_2": ("manitoba", "CLPNM"),
+    "manitoba_3": ("manitoba", "CRPNM"),
+    "ontario": ("ontario", "CNO"),
+    "saskatchewan_1": ("saskatchewan", "CRNS"),
+    "saskatchewan_2": ("saskatchewan", "CLPNS"),
+    "saskatchewan_3": ("saskatchewan", "RPNAS"),
+}
+
+
+def _build_patterns():
+    names = {}  # lowercase name -> province
+    abbreviations = {}  # abbreviation, matched case-sensitively -> province
+    # Two-letter codes are also common words ("ON", "NS" in an all-caps question), so they are
+    # only read as a province after "in", "from", a comma or a parenthesis: "Toronto, ON", "in NS"
+    for province, (_, aliases, codes) in PROVINCES.items():
+        for alias in aliases:
+            names[alias] = province
+        for code in codes:
+            abbreviations[code] = province
+    for province, regulator in KNOWLEDGE_SOURCES.values():
+        abbreviations[regulator] = province
+
+    def alternation(words):
+        return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+    short_codes = [code for code in abbreviations if len(code) == 2]
+    return (
+        re.compile(rf"\b({alternation(names)})\b", re.IGNORECASE),
+        re.compile(rf"(?<![\w.])({alternation(set(abbreviations) - set(short_codes))})(?![\w])"),
+        re.compile(rf"(?:(?<=\b[Ii]n )|(?<=\b[Ff]rom )|(?<=, )|(?<=\())({alternation(short_codes)})(?![\w])"),
+        names,
+        abbreviations,
+    )
+
+
+_NAME_PATTERN, _ABBREVIATION_PATTERN, _SHORT_CODE_PATTERN, _NAMES, _ABBREVIATIONS = _build_patterns()
+
+
+def get_knowledge_source(knowledge_dir):
+    """
+    Returns (province, regulator) of a knowledge directory, or ("", "") when it is not a
+    province site.
+    """
+    return KNOWLEDGE_SOURCES.get(knowledge_dir, ("", ""))
+
+
+def detect_provinces(question):
+    """
+    Returns the provinces a question mentions, by name, abbreviation or regulator acronym,
+    in order of first mention.
+    """
+    provinces = []
+    abbreviation_patterns = [_ABBREVIATION_PATTERN]
+    if question != question.upper():
+        # In an all-caps question every word looks like a code
+        abbreviation_patterns.append(_SHORT_CODE_PATTERN)
+    mentions = sorted(
+        [(m.start(), _NAMES[m.group(1).lower()]) for m in _NAME_PATTERN.finditer(question)]
+        + [
+            (m.start(), _ABBREVIATIONS[m.group(1)])
+            for pattern in abbreviation_patterns
+            for m in pattern.finditer(question)
+        ]
+    )
+    for _, province in mentions:
+        if province not in provinces:
+            provinces.append(province)
+    return provinces
+
+
+def province_label(provinces):
+    names = [PROVINCES[province][0] for province in provinces]
+    return ", ".join(names[:-1]) + f" and {names[-1]}" if len(names) > 1 else "".join(names)
@@ -0,0 +1,641 @@
+import asyncio
+import hashlib
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from urllib.parse import urldefrag, urljoin, urlparse
+
+import httpx
+from asgiref.sync import sync_to_async
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.utils import timezone
+from more_itertools import chunked
+from playwright.async_api import async_playwright
+
+from chatbackend.configs.logging_config import configure_logger
+from knowledge.models import CrawlState
+from knowledge.scraper.page_records import PageRecordWriter
+from knowledge.scraper.scraper_utils import (
+    FINAL_HTTP_STATUSES,
+    PdfDownloader,
+    delete_scraped_content,
+    list_scraped_files,
+    sanitize_filename,
+)
+
+logger = configure_logger(__name__)
+
+DEFAULT_CONTENT_TAGS = ("h1", "h2", "h3", "p", "ul", "a")
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+
+class CrawlAborted(Exception):
+    """
+    The crawl found too little of the site to be trusted (an unreachable home page, a bot wall,
+    a redesigned navigation): nothing is removed and the previous crawl stays published.
+    """
+
+
+@dataclass(frozen=True)
+class SiteConfig:
+    """
+    Declarative description of a regulator site: where the crawl starts, which links are
+    followed and which part of each page is kept.
+
+    :param name: Knowledge directory the crawl is stored under (e.g. "manitoba_1").
+    :param base_url: Site root; the crawl starts here when no start_urls are given.
+    :param content_selector: CSS selector of the content containers of a page.
+    :param start_urls: Pages to start from instead of the navigation of base_url.
+    :param nav_selector: CSS selector of the navigation links on base_url to start from.
+    :param nav_link_texts: Only start from navigation links with one of these texts.
+    :param link_selector: CSS selector of the links followed from every crawled page.
+    :param content_tags: Tags read inside each container; None keeps the container's whole text.
+    :param direct_children_only: Only read tags that are direct children of the containers.
+    :param text_separator: Separator used when joining the text of nested elements.
+    :param extract_content: Custom callable turning the list of containers into text.
+    :param allowed_prefixes: URL prefixes the crawl may visit (defaults to base_url).
+    :param excluded_urls: URLs never crawled.
+    :param strip_query: Drop query strings from discovered URLs.
+    :param wait_for_content: When a page has to be rendered, wait for content_selector to appear.
+    :param max_depth: Link depth limit for this site (defaults to SCRAPER_MAX_DEPTH).
+    """
+    name: str
+    base_url: str
+    content_selector: str
+    start_urls: tuple = ()
+    nav_selector: Optional[str] = None
+    nav_link_texts: tuple = ()
+    link_selector: str = "a"
+    content_tags: Optional[tuple] = DEFAULT_CONTENT_TAGS
+    direct_children_only: bool = False
+    text_separator: str = ""
+    extract_content: Optional[Callable] = None
+    allowed_prefixes: tuple = ()
+    excluded_urls: tuple = ()
+    strip_query: bool = False
+    wait_for_content: bool = False
+    max_depth: Optional[int] = None
+
+    def pdf_path(self, pdf_name):
+        return f"{self.name}/pdfs/{pdf_name}"
+
+
+@dataclass
+class CrawlStats:
+    site: str
+    pages: int = 0
+    pdfs: int = 0
+    errors: int = 0
+    http_pages: int = 0  # pages read from the static HTML
+    browser_pages: int = 0  # pages that had to be rendered by the browser
+    changed: int = 0  # new or modified pages
+    unchanged: int = 0  # pages and pdfs reused from the previous crawl
+    removed: int = 0  # pages of the previous crawl no longer found
+    bytes: int = 0  # downloaded, pages and pdfs
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    @property
+    def duration(self):
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def pages_per_second(self):
+        return self.pages / self.duration if self.duration else 0.0
+
+    @property
+    def fallback_rate(self):
+        fetched = self.http_pages + self.browser_pages
+        return self.browser_pages / fetched if fetched else 0.0
+
+    def to_dict(self):
+        return {
+            "site": self.site,
+            "pages": self.pages,
+            "pdfs": self.pdfs,
+            "errors": self.errors,
+            "http_pages": self.http_pages,
+            "browser_pages": self.browser_pages,
+            "changed": self.changed,
+            "unchanged": self.unchanged,
+            "removed": self.removed,
+            "bytes": self.bytes,
+            "fallback_rate": round(self.fallback_rate, 3),
+            "duration": round(self.duration, 2),
+            "pages_per_second": round(self.pages_per_second, 2),
+        }
+
+
+@dataclass
+class FetchResult:
+    soup: Optional[BeautifulSoup] = None  # None when the page is unchanged
+    unchanged: bool = False
+    etag: str = ""
+    last_modified: str = ""
+    content_hash: str = ""
+
+
+def is_pdf_url(url):
+    return urlparse(url).path.lower().endswith(".pdf")
+
+
+def conditional_headers(state):
+    headers = {}
+    if state is not None:
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+    return headers
+
+
+def load_crawl_states(site_name):
+    return {state.url: state for state in CrawlState.objects.filter(site=site_name)}
+
+
+def save_crawl_states(site_name, states, removed_urls):
+    CrawlState.objects.bulk_create(
+        states,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["site", "url"],
+        update_fields=[
+            "etag", "last_modified", "content_hash", "title", "content", "links", "pdf_links",
+            "last_fetched", "last_changed",
+        ],
+    )
+    for batch in chunked(removed_urls, 500):
+        CrawlState.objects.filter(site=site_name, url__in=batch).delete()
+
+
+class HttpFetcher:
+    """
+    Pooled keep-alive HTTP client (with compressed transfers) used for the first attempt at every page.
+    Requests beyond `max_connections` wait for a free connection, so one fetcher shared by
+    several crawls caps their HTTP concurrency as a whole.
+    """
+    def __init__(self, max_connections, timeout=None):
+        self.max_connections = max_connections
+        self.timeout = timeout or settings.SCRAPER_HTTP_TIMEOUT
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+            timeout=httpx.Timeout(self.timeout, pool=None),
+            limits=httpx.Limits(
+                max_connections=self.max_connections, max_keepalive_connections=self.max_connections
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
+
+    async def fetch(self, url, headers=None):
+        response = await self.client.get(url, headers=headers)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+
+class PlaywrightFetcher:
+    """
+    Pool of browser pages sharing one Chromium instance; each fetch borrows a page from the pool.
+    The browser is only launched when the first page needs rendering. Shared by several crawls,
+    the pool size is their common rendering budget.
+    """
+    def __init__(self, pool_size, timeout=60000):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pages = asyncio.Queue()
+        self._browser = None
+        self._start_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._browser is not None:
+            await self._browser.close()
+            await self._playwright.stop()
+
+    async def _start(self):
+        async with self._start_lock:
+            if self._browser is not None:
+                return
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch()
+            self._context = await self._browser.new_context()
+            for _ in range(self.pool_size):
+                self._pages.put_nowait(await self._context.new_page())
+
+    async def fetch(self, url, wait_selector=None):
+        await self._start()
+        page = await self._pages.get()
+        try:
+            await page.goto(url, timeout=self.timeout)
+            if wait_selector:
+                await page.wait_for_selector(wait_selector, timeout=self.timeout)
+            return await page.content()
+        finally:
+            self._pages.put_nowait(page)
+
+
+class Crawler:
+    """
+    Breadth-first crawl of one site. URLs wait in a frontier queue drained by a fixed number
+    of workers, so pages are fetched concurrently while every host is limited to
+    `per_host_limit` requests in flight.
+
+    Pages are fetched over plain HTTP first; only those whose static HTML lacks the selector
+    the crawl needs are rendered with the browser. Requests are conditional on the state of
+    the previous crawl, and pages that did not change are reused from it without parsing.
+
+    Every page with content is handed to `page_writer` as soon as it is processed, rather than
+    being held until the end of the crawl.
+    """
+    def __init__(self, site, http_fetcher, browser_fetcher, page_writer=None, concurrency=None,
+                 per_host_limit=None, request_delay=None, max_depth=None, max_pages=None):
+        self.site = site
+        self.http_fetcher = http_fetcher
+        self.browser_fetcher = browser_fetcher
+        self.page_writer = page_writer
+        # PDFs are downloaded by their own bounded pool over the same connection pool and host slots
+        self.pdf_downloader = PdfDownloader(http_fetcher.client, host_slot=self.host_slot)
+        self.concurrency = concurrency or settings.SCRAPER_CONCURRENCY
+        self.request_delay = settings.SCRAPER_REQUEST_DELAY if request_delay is None else request_delay
+        self.max_depth = max_depth or site.max_depth or settings.SCRAPER_MAX_DEPTH
+        self.max_pages = max_pages or settings.SCRAPER_MAX_PAGES
+        self.allowed_prefixes = site.allowed_prefixes or (site.base_url,)
+
+        per_host_limit = per_host_limit or settings.SCRAPER_PER_HOST_LIMIT
+        self.host_slots = defaultdict(lambda: asyncio.Semaphore(per_host_limit))
+        self.frontier = asyncio.Queue()
+        self.seen = set()
+        self.gone = set()  # URLs answered with one of FINAL_HTTP_STATUSES
+        self.states = {}  # url -> CrawlState of the previous crawl
+        self.stored_pdfs = set()  # names of the PDFs in storage when the crawl started
+        self.updated_states = {}  # url -> CrawlState of this crawl
+        self.stats = CrawlStats(site=site.name)
+
+    def normalize(self, url, parent_url=None):
+        url = urldefrag(urljoin(parent_url or self.site.base_url, url.strip()))[0]
+        if self.site.strip_query:
+            url = urlparse(url)._replace(query="").geturl()
+        return url
+
+    def is_allowed(self, url):
+        return url.startswith(self.allowed_prefixes) and url not in self.site.excluded_urls
+
+    def enqueue(self, url, depth, pdf_name=None, check_allowed=True):
+        if url in self.seen or depth > self.max_depth:
+            return
+        if check_allowed and not self.is_allowed(url):
+            return
+        if pdf_name is None and not is_pdf_url(url) and len(self.seen) >= self.max_pages:
+            return
+        self.seen.add(url)
+        self.frontier.put_nowait((url, depth, pdf_name))
+
+    @asynccontextmanager
+    async def host_slot(self, url):
+        """
+        Holds one of the `per_host_limit` request slots of the URL's host, and keeps it for
+        `request_delay` after the request.
+        """
+        async with self.host_slots[urlparse(url).netloc]:
+            try:
+                yield
+            finally:
+                if self.request_delay:
+                    await asyncio.sleep(self.request_delay)
+
+    async def fetch(self, url, required_selector=None, state=None):
+        """
+        Returns a FetchResult, or None when the URL does not point to an HTML document.
+        """
+        async with self.host_slot(url):
+            return await self._fetch(url, required_selector, state)
+
+    async def _fetch(self, url, required_selector, state):
+        try:
+            response = await self.http_fetcher.fetch(url, conditional_headers(state))
+            if response.status_code == 304:
+                self.stats.http_pages += 1
+                return FetchResult(
+                    unchanged=True,
+                    etag=state.etag,
+                    last_modified=state.last_modified,
+                    content_hash=state.content_hash,
+                )
+            self.stats.bytes += len(response.content)
+            if "html" not in response.headers.get("content-type", "text/html"):
+                return None
+
+            result = FetchResult(
+                etag=response.headers.get("etag", ""),
+                last_modified=response.headers.get("last-modified", ""),
+                content_hash=hashlib.sha256(response.content).hexdigest(),
+            )
+            if state is not None and result.content_hash == state.content_hash:
+                self.stats.http_pages += 1
+                result.unchanged = True
+                return result
+
+            soup = BeautifulSoup(response.text, "html.parser")
+            if required_selector is None or soup.select_one(required_selector):
+                self.stats.http_pages += 1
+                result.soup = soup
+                return result
+            logger.info(f"{required_selector} not in the static HTML of {url}, rendering it")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in FINAL_HTTP_STATUSES:
+                raise
+            logger.info(f"HTTP fetch of {url} failed ({e.response.status_code}), rendering it")
+        except httpx.HTTPError as e:
+            logger.info(f"HTTP fetch of {url} failed ({e}), rendering it")
+
+        self.stats.browser_pages += 1
+        wait_selector = required_selector if self.site.wait_for_content else None
+        html = await self.browser_fetcher.fetch(url, wait_selector)
+        rendered = html.encode("utf-8")
+        self.stats.bytes += len(rendered)
+        # Rendered pages are compared by their rendered HTML
+        result = FetchResult(content_hash=hashlib.sha256(rendered).hexdigest())
+        if state is not None and result.content_hash == state.content_hash:
+            result.unchanged = True
+        else:
+            result.soup = BeautifulSoup(html, "html.parser")
+        return result
+
+    async def seed(self):
+        if self.site.start_urls:
+            for url in self.site.start_urls:
+                self.enqueue(self.normalize(url), 0)
+            return
+
+        result = await self.fetch(self.site.base_url, self.site.nav_selector)
+        if result is None or result.soup is None:
+            # Unreachable, or not an HTML document: there is no navigation to start from
+            raise CrawlAborted(f"No navigation found on {self.site.base_url}, nothing to crawl for {self.site.name}")
+        for a in result.soup.select(self.site.nav_selector or "a"):
+            if not a.get("href"):
+                continue
+            if self.site.nav_link_texts and a.get_text(strip=True) not in self.site.nav_link_texts:
+                continue
+            self.enqueue(self.normalize(a["href"], self.site.base_url), 0)
+        if not self.seen:
+            raise CrawlAborted(f"No navigation links found on {self.site.base_url} for {self.site.name}")
+
+    def extract(self, soup):
+        """
+        Returns the text of the page's content containers and the PDF links found inside them,
+        as (text, [(url, link_text), ...]).
+        """
+        containers = soup.select(self.site.content_selector)
+        pdf_links = []
+        for container in containers:
+            for a in container.find_all("a", href=True):
+                if is_pdf_url(a["href"]):
+                    pdf_links.append((a["href"], a.get_text(strip=True)))
+                    a.extract()  # PDFs are downloaded, not inlined as link text
+
+        if self.site.extract_content:
+            return self.site.extract_content(containers), pdf_links
+
+        content_text = ""
+        for container in containers:
+            if self.site.content_tags is None and not self.site.direct_children_only:
+                elements = [container]
+            else:
+                elements = container.find_all(
+                    self.site.content_tags or True, recursive=not self.site.direct_children_only
+                )
+            for element in elements:
+                element_text = element.get_text(self.site.text_separator, strip=True)
+                if element_text:
+                    content_text += f"{element_text}\n\n"
+        return content_text, pdf_links
+
+    def record(self, url, result, title="", content="", links=(), pdf_links=()):
+        now = timezone.now()
+        previous = self.states.get(url)
+        self.updated_states[url] = CrawlState(
+            site=self.site.name,
+            url=url,
+            etag=result.etag,
+            last_modified=result.last_modified,
+            content_hash=result.content_hash,
+            title=title,
+            content=content,
+            links=list(links),
+            pdf_links=[list(pdf_link) for pdf_link in pdf_links],
+            last_fetched=now,
+            last_changed=previous.last_changed if result.unchanged and previous else now,
+        )
+
+    def drop(self, url, status_code):
+        # Deleted from the site: forgotten by the crawl state, so ingestion deletes its chunks
+        logger.warning(f"{url} is gone (HTTP {status_code}), removing it from the knowledge base")
+        self.gone.add(url)
+
+    async def process_pdf(self, url, pdf_name):
+        logger.info(f"Processing pdf: {url}")
+        state = self.states.get(url)
+        if state is not None and pdf_name not in self.stored_pdfs:
+            # Not in storage, e.g. a copy earlier crawls did not store under its own name:
+            # downloaded and stored again whatever its validators
+            state = None
+        try:
+            download = await self.pdf_downloader.download(
+                url,
+                self.site.pdf_path(pdf_name),
+                etag=state.etag if state else "",
+                last_modified=state.last_modified if state else "",
+                content_hash=state.content_hash if state else "",
+            )
+        except httpx.HTTPStatusError as e:
+            self.drop(url, e.response.status_code)
+            return
+        if download is None:
+            self.stats.errors += 1
+            return
+
+        self.stats.bytes += download.pop("size")
+        if download.pop("changed"):
+            self.stats.pdfs += 1
+            self.record(url, FetchResult(**download), title=pdf_name)
+        else:
+            self.stats.unchanged += 1
+            self.record(url, FetchResult(unchanged=True, **download), title=pdf_name)
+
+    async def process_page(self, url, depth):
+        logger.info(f"Processing page: {url}")
+        state = self.states.get(url)
+        try:
+            result = await self.fetch(url, self.site.content_selector, state)
+        except httpx.HTTPStatusError as e:
+            # Only FINAL_HTTP_STATUSES get here, the other errors are retried with the browser
+            self.drop(url, e.response.status_code)
+            return
+        except Exception as e:
+            if state is None:
+                raise
+            # A transient error: keep the previous copy rather than dropping the page from the knowledge base
+            self.stats.errors += 1
+            logger.error(f"Error scraping content from {url}, keeping the previous crawl: {str(e)}")
+            result = None
+            title, links, pdf_links, content_text = state.title, state.links, state.pdf_links, state.content
+        else:
+            if result is None:
+                return
+
+            if result.unchanged:
+                self.stats.unchanged += 1
+                title, links, pdf_links, content_text = state.title, state.links, state.pdf_links, state.content
+            else:
+                self.stats.changed += 1
+                title = result.soup.title.get_text(strip=True)[:512] if result.soup.title else ""
+                # Links are collected before extraction, which removes PDF anchors from the content
+                links = [
+                    self.normalize(a["href"], url)
+                    for a in result.soup.select(self.site.link_selector) if a.get("href")
+                ]
+                content_text, content_pdfs = self.extract(result.soup)
+                pdf_links = []
+                for pdf_url, link_text in content_pdfs:
+                    pdf_url = self.normalize(pdf_url, url)
+                    pdf_name = sanitize_filename(link_text or pdf_url.rsplit("/", 1)[-1])
+                    if not pdf_name.lower().endswith(".pdf"):
+                        pdf_name += ".pdf"
+                    pdf_links.append((pdf_url, pdf_name))
+            self.record(url, result, title, content_text, links, pdf_links)
+
+        if content_text.strip():
+            if self.page_writer is not None:
+                await self.page_writer.write(url, title, content_text)
+            self.stats.pages += 1
+
+        for pdf_url, pdf_name in pdf_links:
+            # Documents linked from the content are often hosted outside the site itself
+            self.enqueue(pdf_url, depth, pdf_name=pdf_name, check_allowed=False)
+
+        for link in links:
+            if is_pdf_url(link):
+                self.enqueue(link, depth + 1, pdf_name=sanitize_filename(link.rsplit("/", 1)[-1]))
+            else:
+                self.enqueue(link, depth + 1)
+
+    async def worker(self):
+        while True:
+            url, depth, pdf_name = await self.frontier.get()
+            try:
+                if pdf_name is not None:
+                    await self.process_pdf(url, pdf_name)
+                else:
+                    await self.process_page(url, depth)
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"Error scraping content from {url}: {str(e)}")
+            finally:
+                self.frontier.task_done()
+
+    async def delete_removed_pdfs(self, removed_urls):
+        # The crawl state of a PDF holds its file name as title; several URLs may share a file
+        removed = set(removed_urls)
+        remaining_states = {
+            **{url: state for url, state in self.states.items() if url not in removed},
+            **self.updated_states,
+        }
+        kept_names = {state.title for url, state in remaining_states.items() if is_pdf_url(url)}
+        removed_names = {self.states[url].title for url in removed if is_pdf_url(url)} - kept_names
+        for pdf_name in removed_names:
+            s3_pdf_name = f"scraped_data/{self.site.pdf_path(pdf_name)}"
+            try:
+                await asyncio.to_thread(delete_scraped_content, s3_pdf_name)
+                logger.info(f"Deleted removed PDF {s3_pdf_name}")
+            except Exception as e:
+                logger.error(f"Error deleting removed PDF {s3_pdf_name}: {str(e)}")
+
+    def check_plausible(self, removed_urls):
+        # A crawl that lost most of the site is more likely broken than the site emptied
+        if not self.stats.pages:
+            raise CrawlAborted(f"No pages crawled for {self.site.name}")
+        if self.states and len(removed_urls) > len(self.states) * settings.SCRAPER_MAX_REMOVED_RATIO:
+            raise CrawlAborted(
+                f"The crawl of {self.site.name} would remove {len(removed_urls)} of {len(self.states)} "
+                f"known URLs (more than SCRAPER_MAX_REMOVED_RATIO)"
+            )
+
+    async def run(self):
+        """
+        Crawls the site, then removes the URLs of the previous crawl no longer found.
+
+        :raises CrawlAborted: When seeding found nothing to crawl, no page was crawled or the crawl
+            would remove more than SCRAPER_MAX_REMOVED_RATIO of the known URLs. The crawl state
+            is left untouched.
+        """
+        self.states = await sync_to_async(load_crawl_states, thread_sensitive=True)(self.site.name)
+        self.stored_pdfs = await asyncio.to_thread(list_scraped_files, f"scraped_data/{self.site.pdf_path('')}")
+        await self.seed()
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.concurrency)]
+        try:
+            await self.frontier.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        removed_urls = [url for url in self.states if url not in self.seen or url in self.gone]
+        self.check_plausible(removed_urls)
+        self.stats.removed = sum(1 for url in removed_urls if self.states[url].content.strip())
+        await sync_to_async(save_crawl_states, thread_sensitive=True)(
+            self.site.name, list(self.updated_states.values()), removed_urls
+        )
+        await self.delete_removed_pdfs(removed_urls)
+        self.stats.finished_at = time.perf_counter()
+        return self.stats
+
+
+async def crawl_site(site, upload=True, http_fetcher=None, browser_fetcher=None, **options):
+    """
+    Crawls a site and streams its pages to the page records of its knowledge directory.
+
+    :param upload: Save the page records; without it the crawl only updates the crawl state.
+    :param http_fetcher: HttpFetcher shared with other crawls; one is opened for this crawl otherwise.
+    :param browser_fetcher: PlaywrightFetcher shared with other crawls; one is opened for this crawl otherwise.
+    :param options: Crawler overrides (concurrency, per_host_limit, request_delay, max_depth, max_pages).
+    :return: Crawl statistics as a dict.
+    """
+    concurrency = options.get("concurrency") or settings.SCRAPER_CONCURRENCY
+    page_writer = PageRecordWriter(site.name) if upload else None
+    async with AsyncExitStack() as stack:
+        if http_fetcher is None:
+            http_fetcher = await stack.enter_async_context(HttpFetcher(max_connections=concurrency))
+        if browser_fetcher is None:
+            browser_fetcher = await stack.enter_async_context(PlaywrightFetcher(pool_size=concurrency))
+        crawler = Crawler(site, http_fetcher, browser_fetcher, page_writer, **options)
+        if page_writer is None:
+            stats = await crawler.run()
+        else:
+            async with page_writer:
+                stats = await crawler.run()
+
+    logger.info(
+        f"Scraping {site.name} completed: {stats.pages} pages ({stats.changed} changed, "
+        f"{stats.unchanged} unchanged, {stats.removed} removed), {stats.pdfs} pdfs, {stats.errors} errors "
+        f"in {stats.duration:.2f} seconds ({stats.pages_per_second:.2f} pages/sec), "
+        f"{stats.browser_pages} of {stats.http_pages + stats.browser_pages} pages rendered "
+        f"by the browser ({stats.fallback_rate:.1%} fallback rate)"
+    )
+    if page_writer is not None:
+        logger.info(
+            f"Scraped pages of {site.name}: {page_writer.records} written to {len(page_writer.segments)} "
+            f"segments, {page_writer.unchanged} unchanged, under {page_writer.directory}"
+        )
+
+    return stats.to_dict()
@@ -0,0 +1,109 @@
+import asyncio
+import importlib
+import time
+
+from celery import shared_task
+from django.conf import settings
+
+from chatbackend.configs.logging_config import configure_logger
+from knowledge.knowledge_vec import save_vec_to_database
+from knowledge.provinces import KNOWLEDGE_SOURCES, get_knowledge_source
+from knowledge.scraper.crawler import CrawlAborted, HttpFetcher, PlaywrightFetcher, crawl_site
+
+logger = configure_logger(__name__)
+
+
+def get_site(name):
+    # Every knowledge directory is scraped by the module of the same name
+    if name not in KNOWLEDGE_SOURCES:
+        raise ValueError(f"Unknown province site: {name}")
+    return importlib.import_module(f"knowledge.scraper.scrape_scripts.{name}").SITE
+
+
+def format_summary(summary):
+    lines = [
+        f"{'site':<16}{'province':<18}{'pages':>7}{'bytes':>12}{'new':>7}{'changed':>9}"
+        f"{'removed':>9}{'crawl s':>9}{'embed s':>9}{'wall s':>9}"
+    ]
+    for row in summary["sites"]:
+        if row["error"]:
+            lines.append(f"{row['site']:<16}{row['province']:<18}failed: {row['error']}")
+            continue
+        lines.append(
+            f"{row['site']:<16}{row['province']:<18}{row['pages']:>7}{row['bytes']:>12}"
+            f"{row['chunks_new']:>7}{row['chunks_changed']:>9}{row['chunks_removed']:>9}"
+            f"{row['crawl_seconds']:>9.1f}{row['embed_seconds']:>9.1f}{row['wall_seconds']:>9.1f}"
+        )
+    lines.append(f"Total wall time: {summary['wall_seconds']:.1f} seconds")
+    return "\n".join(lines)
+
+
+async def crawl_provinces(sites=None):
+    """
+    Crawls the province sites concurrently and chains each finished crawl straight into
+    incremental embedding of its knowledge directory.
+
+    All crawls share one HTTP client and one browser, so SCRAPER_GLOBAL_HTTP_CONNECTIONS and
+    SCRAPER_GLOBAL_BROWSER_PAGES cap the whole run, and at most SCRAPER_MAX_CONCURRENT_SITES
+    sites are crawled at once. Embedding runs one directory at a time while the other crawls go on.
+
+    :param sites: Knowledge directories to crawl (defaults to every registered site).
+    :return: Run summary with a row of pages, bytes, chunk changes and durations per site.
+    """
+    started_at = time.perf_counter()
+    site_slots = asyncio.Semaphore(settings.SCRAPER_MAX_CONCURRENT_SITES)
+    embedding_lock = asyncio.Lock()
+
+    async with HttpFetcher(max_connections=settings.SCRAPER_GLOBAL_HTTP_CONNECTIONS) as http_fetcher, \
+            PlaywrightFetcher(pool_size=settings.SCRAPER_GLOBAL_BROWSER_PAGES) as browser_fetcher:
+
+        async def run_site(name):
+            site_started_at = time.perf_counter()
+            row = {
+                "site": name,
+                "province": get_knowledge_source(name)[0],
+                "pages": 0,
+                "bytes": 0,
+                "chunks_new": 0,
+                "chunks_changed": 0,
+                "chunks_removed": 0,
+                "crawl_seconds": 0.0,
+                "embed_seconds": 0.0,
+                "error": "",
+            }
+            try:
+                async with site_slots:
+                    stats = await crawl_site(
+                        get_site(name), http_fetcher=http_fetcher, browser_fetcher=browser_fetcher
+                    )
+                row.update(pages=stats["pages"], bytes=stats["bytes"], crawl_seconds=stats["duration"])
+                if not stats["pages"]:
+                    # Ingesting an empty crawl would delete every chunk of the site
+                    raise CrawlAborted(f"No pages crawled for {name}")
+
+                async with embedding_lock:
+                    embed_started_at = time.perf_counter()
+                    ingestion = await save_vec_to_database(name)
+                    row["embed_seconds"] = time.perf_counter() - embed_started_at
+                for key in ("new", "changed", "removed"):
+                    row[f"chunks_{key}"] = sum(source_stats[key] for source_stats in ingestion.values())
+            except CrawlAborted as e:
+                # Unattended runs keep the knowledge base of the site as it was
+                logger.error(f"Crawl of {name} aborted, ingestion skipped: {e}")
+                row["error"] = f"aborted, ingestion skipped: {e}"
+            except Exception as e:
+                logger.error(f"Crawl of {name} failed: {e}")
+                row["error"] = str(e)
+            row["wall_seconds"] = time.perf_counter() - site_started_at
+            return row
+
+        rows = await asyncio.gather(*(run_site(name) for name in sites or KNOWLEDGE_SOURCES))
+
+    summary = {"sites": list(rows), "wall_seconds": time.perf_counter() - started_at}
+    logger.info(f"Province crawl run completed:\n{format_summary(summary)}")
+    return summary
+
+
+@shared_task
+def crawl_provinces_task(sites=None):
+    return asyncio.run(crawl_provinces(sites))
@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import json
+import tempfile
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from chatbackend.configs.logging_config import configure_logger
+from knowledge.scraper.scraper_utils import save_scraped_content
+
+logger = configure_logger(__name__)
+
+SEGMENT_NAME = "part-{}-{:05d}.jsonl"  # crawl run, segment number
+MANIFEST_NAME = "manifest-{}.json"  # crawl run
+INGESTED_NAME = "ingested.json"
+# Segments of the previous crawl whose live records fall below this share are rewritten
+COMPACTION_RATIO = 0.5
+
+
+def pages_dir(knowledge_dir):
+    return f"scraped_data/{knowledge_dir}/pages/"
+
+
+def page_record(url, title, text):
+    return {
+        "url": url,
+        "title": title,
+        "text": text,
+        "hash": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+    }
+
+
+def list_page_files(knowledge_dir):
+    directory = pages_dir(knowledge_dir)
+    if not default_storage.exists(directory):
+        return []
+    return sorted(default_storage.listdir(directory)[1])
+
+
+def read_json(name):
+    with default_storage.open(name, "rb") as f:
+        return json.load(f)
+
+
+def load_page_manifest(knowledge_dir):
+    """
+    Returns the manifest published by the last crawl, which maps every page to the segment
+    holding its current record:
+    {"name", "segments": {segment: record count}, "pages": {url: [segment, record hash]}}.
+
+    :return: The manifest, or None when no crawl published one.
+    """
+    manifests = [name for name in list_page_files(knowledge_dir) if name.startswith("manifest-")]
+    if not manifests:
+        return None
+    name = f"{pages_dir(knowledge_dir)}{manifests[-1]}"
+    return {"name": name, **read_json(name)}
+
+
+def list_page_segments(knowledge_dir, manifest=None):
+    # Segments written before manifests were published hold every page of their crawl
+    if manifest is not None:
+        return sorted(manifest["segments"])
+    directory = pages_dir(knowledge_dir)
+    return [f"{directory}{name}" for name in list_page_files(knowledge_dir) if name.endswith(".jsonl")]
+
+
+def read_page_segment(name):
+    with default_storage.open(name, "rb") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_ingested_segments(knowledge_dir):
+    name = f"{pages_dir(knowledge_dir)}{INGESTED_NAME}"
+    if not default_storage.exists(name):
+        return set()
+    return set(read_json(name)["segments"])
+
+
+def save_ingested_segments(knowledge_dir, segments):
+    # Records that the pages of these segments are in the vector index
+    name = f"{pages_dir(knowledge_dir)}{INGESTED_NAME}"
+    save_scraped_content(name, ContentFile(json.dumps({"segments": sorted(segments)}).encode("utf-8")))
+
+
+class PageRecordWriter:
+    """
+    Append-only store of the pages of a crawl, one JSON record (url, title, text, hash) per line.
+
+    Only new and changed pages are written: a page whose record matches the one in the manifest
+    of the previous crawl stays in its segment. Records are buffered into a segment of at most
+    SCRAPER_SEGMENT_MAX_BYTES, and every full segment is uploaded under a name of its own while
+    the crawl goes on, so memory stays bounded by the segment size whatever the size of the site.
+
+    Closing the writer rewrites the live records of mostly stale segments, uploads the last
+    segment and publishes the manifest of this crawl; readers only ever see the segments of a
+    published manifest. Files referenced by neither this manifest nor the previous one are then
+    deleted. A crawl that fails publishes nothing and deletes the segments it wrote.
+    """
+    def __init__(self, knowledge_dir, segment_size=None):
+        self.knowledge_dir = knowledge_dir
+        self.directory = pages_dir(knowledge_dir)
+        self.segment_size = segment_size or settings.SCRAPER_SEGMENT_MAX_BYTES
+        self.run = timezone.now().strftime("%Y%m%dT%H%M%S%f")
+        self.segments = {}  # segment -> record count, written in this crawl
+        self.pages = {}  # url -> [segment, record hash]
+        self.records = 0
+        self.unchanged = 0
+        self.previous = None  # Manifest of the previous crawl
+        self._segment = None
+        self._segment_name = None
+        self._upload = None  # Upload of the previous segment, at most one in flight
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        self.previous = await asyncio.to_thread(load_page_manifest, self.knowledge_dir)
+        return self
+
+    async def __aexit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            await self.close()
+        else:
+            # The previous manifest stays the current one
+            await self._wait_for_upload()
+            if self._segment is not None:
+                self._segment.close()
+            for name in self.segments:
+                await asyncio.to_thread(default_storage.delete, name)
+
+    async def write(self, url, title, text):
+        line = json.dumps(page_record(url, title, text), ensure_ascii=False).encode("utf-8") + b"\n"
+        record_hash = hashlib.sha256(line).hexdigest()
+        async with self._lock:
+            previous = self.previous["pages"].get(url) if self.previous else None
+            if previous is not None and previous[1] == record_hash:
+                self.pages[url] = previous
+                self.unchanged += 1
+                return
+            await self._append(url, line, record_hash)
+
+    async def _append(self, url, line, record_hash):
+        if self._segment is None:
+            self._segment = tempfile.SpooledTemporaryFile(max_size=self.segment_size * 2)
+            self._segment_name = f"{self.directory}{SEGMENT_NAME.format(self.run, len(self.segments))}"
+            self.segments[self._segment_name] = 0
+        self._segment.write(line)
+        self.segments[self._segment_name] += 1
+        self.pages[url] = [self._segment_name, record_hash]
+        self.records += 1
+        if self._segment.tell() >= self.segment_size:
+            await self._flush()
+
+    async def _wait_for_upload(self):
+        if self._upload is not None:
+            upload, self._upload = self._upload, None
+            await upload
+
+    async def _flush(self):
+        segment, name = self._segment, self._segment_name
+        self._segment = self._segment_name = None
+        await self._wait_for_upload()
+        segment.seek(0)
+        self._upload = asyncio.create_task(self._save(name, segment))
+
+    async def _save(self, name, segment):
+        with segment:
+            await asyncio.to_thread(save_scraped_content, name, File(segment, name=name.rsplit("/", 1)[-1]))
+        logger.info(f"Scraped pages saved to S3 as {name}")
+
+    async def _compact(self):
+        # Rewrite the live records of previous segments that are mostly stale, so their stale
+        # records are not kept (and read by ingestion) indefinitely
+        live = Counter(segment for segment, _ in self.pages.values())
+        for segment, count in self.previous["segments"].items():
+            if not live[segment] or live[segment] >= count * COMPACTION_RATIO:
+                continue
+            for record in await asyncio.to_thread(read_page_segment, segment):
+                if self.pages.get(record["url"], [None])[0] == segment:
+                    line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+                    await self._append(record["url"], line, self.pages[record["url"]][1])
+
+    async def close(self):
+        async with self._lock:
+            if self.previous:
+                await self._compact()
+            if self._segment is not None:
+                await self._flush()
+            await self._wait_for_upload()
+
+            segments = {}
+            for segment, _ in self.pages.values():
+                segments[segment] = self.segments.get(segment) or self.previous["segments"][segment]
+            manifest = {"segments": segments, "pages": self.pages}
+            manifest_name = f"{self.directory}{MANIFEST_NAME.format(self.run)}"
+            await asyncio.to_thread(
+                save_scraped_content, manifest_name, ContentFile(json.dumps(manifest).encode("utf-8"))
+            )
+            logger.info(
+                f"Published {manifest_name}: {len(self.pages)} pages, {self.records} written "
+                f"and {self.unchanged} unchanged"
+            )
+
+        # Readers may still be on the previous manifest
+        keep = {manifest_name, f"{self.directory}{INGESTED_NAME}", *segments}
+        if self.previous:
+            keep.update([self.previous["name"], *self.previous["segments"]])
+        for name in await asyncio.to_thread(list_page_files, self.knowledge_dir):
+            if f"{self.directory}{name}" not in keep:
+                await asyncio.to_thread(default_storage.delete, f"{self.directory}{name}")
+                logger.info(f"Deleted stale page file {self.directory}{name}")
@@ -1,75 +1,173 @@
+import asyncio
+import hashlib
+import random
 import re
-from io import BytesIO
+import tempfile
+from contextlib import nullcontext
 
-import boto3
-import requests
-from botocore.exceptions import NoCredentialsError
+import httpx
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.files.base import File
 from django.core.files.storage import default_storage
 
 from chatbackend.configs.logging_config import configure_logger
 
 logger = configure_logger(__name__)
 
+# Responses that a browser would not get past either: the document was deleted
+FINAL_HTTP_STATUSES = (404, 410)
+
+
 # Function to sanitize file names
 def sanitize_filename(name):
     return re.sub(r'[\\/*?:"<>|]', '-', name)
 
 
-# Function to download PDF using Playwright and save to s3
-async def download_pdf(url, pdf_name):
-    # if settings.DEBUG:
-    #     headers = {
-    #         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
-    #     }
-    # else:
-    #     headers = {
-    #         'User-Agent': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:52.0) Gecko/20100101 Firefox/52.0'
-    #     }
-    try:
-        # Send a GET request to the URL
-        response = requests.get(url)  # , headers)
-
-        # Check if the request was successful
-        if response.status_code == 200:
-            # Prepend 'scraped_data/' to the pdf_name for S3
-            s3_pdf_name = f"scraped_data/{pdf_name}"
-
-            # Check if the file exists in S3 and get an available name
-            if default_storage.exists(s3_pdf_name):
-                # s3_pdf_name = default_storage.get_available_name(s3_pdf_name)
-                logger.info(f"PDF {s3_pdf_name} already exists in S3. Skipping download.")
-                return False
-
-            # Save the response content to S3
-            default_storage.save(s3_pdf_name, ContentFile(BytesIO(response.content).read()))
+class RetryableStatusError(Exception):
+    pass
+
+
+class PdfDownloader:
+    """
+    Bounded pool of concurrent PDF downloads sharing one HTTP client.
+
+    Responses are streamed into a spooled temporary file (kept in memory only up to
+    PDF_SPOOL_MAX_SIZE) while being hashed, then streamed to S3, which the storage backend
+    uploads in multipart chunks. Transient failures are retried with exponential backoff, and
+    a PDF unchanged since the last crawl, or already uploaded under the same name in this run
+    (linked under another URL), is not uploaded again. A copy linked under another name is
+    stored under that name too, so it outlives the removal of the original.
+
+    Every request is made inside `host_slot(url)`, so a crawler can hold PDF downloads to the
+    same per-host limit and delay as its pages.
+    """
+    CHUNK_SIZE = 64 * 1024
+    PDF_SPOOL_MAX_SIZE = 5 * 1024 * 1024
+
+    def __init__(self, client, concurrency=None, retries=None, backoff=None, host_slot=None):
+        self.client = client
+        self.host_slot = host_slot or (lambda url: nullcontext())
+        self.retries = settings.SCRAPER_PDF_RETRIES if retries is None else retries
+        self.backoff = backoff or settings.SCRAPER_PDF_BACKOFF
+        self._slots = asyncio.Semaphore(concurrency or settings.SCRAPER_PDF_CONCURRENCY)
+        self._uploaded = set()  # (content hash, S3 name) of the PDFs uploaded in this run
+
+    async def _fetch_to_file(self, url, headers):
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304:
+                return response, None, None, 0
+            if response.status_code == 429 or response.status_code >= 500:
+                raise RetryableStatusError(f"HTTP Status Code {response.status_code}")
+            response.raise_for_status()
+
+            spool = tempfile.SpooledTemporaryFile(max_size=self.PDF_SPOOL_MAX_SIZE)
+            digest = hashlib.sha256()
+            try:
+                async for chunk in response.aiter_bytes(self.CHUNK_SIZE):
+                    digest.update(chunk)
+                    spool.write(chunk)
+            except BaseException:
+                spool.close()
+                raise
+            size = spool.tell()
+            spool.seek(0)
+            return response, spool, digest.hexdigest(), size
+
+    async def _fetch_with_retries(self, url, headers):
+        for attempt in range(self.retries + 1):
+            try:
+                async with self.host_slot(url):
+                    return await self._fetch_to_file(url, headers)
+            except (httpx.TransportError, RetryableStatusError) as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt + random.uniform(0, self.backoff)
+                logger.warning(f"Retrying PDF {url} in {delay:.1f} seconds after error: {str(e)}")
+                await asyncio.sleep(delay)
+
+    async def download(self, url, pdf_name, etag="", last_modified="", content_hash=""):
+        """
+        Downloads a PDF to S3 unless it is unchanged since the last crawl. The validators of the
+        previous download are sent as a conditional request, and a full response whose content
+        hash matches the previous one is not uploaded again.
+
+        :return: Dict with "changed", the new "etag", "last_modified" and "content_hash" and the "size"
+            downloaded, or None on failure.
+        :raise httpx.HTTPStatusError: The PDF is gone (one of FINAL_HTTP_STATUSES).
+        """
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        async with self._slots:
+            try:
+                response, spool, new_hash, size = await self._fetch_with_retries(url, headers)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code in FINAL_HTTP_STATUSES:
+                    raise
+                logger.error(f"Failed to download PDF from {url}: {str(e)}")
+                return None
+            except Exception as e:
+                logger.error(f"Failed to download PDF from {url}: {str(e)}")
+                return None
+
+            if spool is None:
+                logger.info(f"PDF {url} not modified. Skipping download.")
+                return {
+                    "changed": False,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "content_hash": content_hash,
+                    "size": 0,
+                }
+
+            result = {
+                "changed": False,
+                "etag": response.headers.get("ETag", ""),
+                "last_modified": response.headers.get("Last-Modified", ""),
+                "content_hash": new_hash,
+                "size": size,
+            }
+            with spool:
+                if new_hash == content_hash:
+                    logger.info(f"PDF {url} unchanged. Skipping upload.")
+                    return result
+                # Prepend 'scraped_data/' to the pdf_name for S3
+                s3_pdf_name = f"scraped_data/{pdf_name}"
+                if (new_hash, s3_pdf_name) in self._uploaded:
+                    logger.info(f"PDF {url} already saved to S3 as {s3_pdf_name}. Skipping upload.")
+                    return result
+
+                self._uploaded.add((new_hash, s3_pdf_name))
+                try:
+                    await asyncio.to_thread(save_scraped_content, s3_pdf_name, File(spool, name=pdf_name))
+                except Exception as e:
+                    self._uploaded.discard((new_hash, s3_pdf_name))
+                    logger.error(f"Error saving PDF to S3 from {url}: {str(e)}")
+                    return None
+
             logger.info(f"PDF saved to S3 as {s3_pdf_name}")
-            return True
-        else:
-            logger.error(f"Failed to download PDF from {url}: HTTP Status Code {response.status_code}")
-            return False
-    except Exception as e:
-        logger.error(f"Error saving PDF to S3 from {url}: {str(e)}")
-        return False
-
-
-def clear_s3_directory(bucket_name, directory_name):
-    s3 = boto3.resource('s3')
-    bucket = s3.Bucket(bucket_name)
-    directory_name = directory_name.rstrip('/') + '/'  
-    try:
-        objects_to_delete = []
-        for obj in bucket.objects.filter(Prefix=directory_name):
-            objects_to_delete.append({'Key': obj.key})
-
-        if objects_to_delete:
-            bucket.delete_objects(Delete={'Objects': objects_to_delete})
-            for obj in objects_to_delete:
-                logger.info(f"Deleted {obj['Key']}...")
-        else:
-            logger.info("No files found to delete.")
-
-        logger.info(f"Done with Delete operation on {directory_name} in the S3 bucket with bucket name {bucket_name}.")
-    except Exception as e:
-        logger.error(f"Error during deletion: {e}")
+            result["changed"] = True
+            return result
+
+
+def save_scraped_content(s3_file_name, content_file):
+    # Overwrite in place: the storage backend would otherwise save a suffixed copy next to
+    # the previous crawl, and both would be ingested
+    if default_storage.exists(s3_file_name):
+        default_storage.delete(s3_file_name)
+    return default_storage.save(s3_file_name, content_file)
+
+
+
+def list_scraped_files(directory):
+    # Names of the files stored directly under a scraped_data/ directory
+    if not default_storage.exists(directory):
+        return set()
+    return set(default_storage.listdir(directory)[1])
+
+
+def delete_scraped_content(s3_file_name):
+    default_storage.delete(s3_file_name)
@@ -0,0 +1,191 @@
+import heapq
+import json
+import math
+import os
+import random
+import re
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+from chatbackend.configs.logging_config import configure_logger
+from knowledge.vector_store import matches_filter
+
+logger = configure_logger(__name__)
+
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its me my of on or "
+    "so that the their them there these this to was what when where which who will with you your".split()
+)
+
+
+def tokenize(text):
+    # Acronyms such as NCLEX or CRNM survive as single lowercase terms
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class SparseIndex:
+    """
+    BM25 inverted index over the same chunks as the vector store, persisted to disk and kept
+    in sync by ingestion. It catches exact terms (exam names, regulator acronyms, credentials)
+    that dense retrieval tends to miss. Queries return matches in the vector store format and
+    accept the same metadata filters.
+
+    Upserts and deletes change the index in memory; `flush()` writes it out, once per sync.
+    """
+    INDEX_FILE = "bm25.json"
+
+    def __init__(self, path, k1=1.5, b=0.75):
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._clear()
+        self._loaded_mtime = None
+        self._dirty = False
+
+    def _clear(self):
+        self.docs = {}  # chunk id -> {"tf": {term: count}, "length": int, "metadata": dict}
+        self.postings = defaultdict(dict)  # term -> {chunk id: count}
+        self.total_length = 0
+
+    def _index_path(self):
+        return self.path / self.INDEX_FILE
+
+    def _add(self, chunk_id, doc):
+        self.docs[chunk_id] = doc
+        self.total_length += doc["length"]
+        for term, count in doc["tf"].items():
+            self.postings[term][chunk_id] = count
+
+    def _remove(self, chunk_id):
+        doc = self.docs.pop(chunk_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc["length"]
+        for term in doc["tf"]:
+            postings = self.postings[term]
+            postings.pop(chunk_id, None)
+            if not postings:
+                del self.postings[term]
+
+    def _maybe_reload(self):
+        if self._dirty:
+            # Changes not flushed yet would be lost; they are written over the stored index
+            return
+        index_path = self._index_path()
+        if not index_path.exists():
+            return
+        mtime = index_path.stat().st_mtime
+        if mtime == self._loaded_mtime:
+            return
+
+        with open(index_path, encoding="utf-8") as f:
+            docs = json.load(f)["docs"]
+        self._clear()
+        for chunk_id, doc in docs.items():
+            self._add(chunk_id, doc)
+        self._loaded_mtime = mtime
+        logger.info(f"Loaded sparse index with {len(self.docs)} chunks from {self.path}")
+
+    def flush(self):
+        """
+        Writes the changes made since the last flush.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            self._save()
+            self._dirty = False
+
+    def _save(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so readers never load a half-written index
+        index_tmp = self.path / f"{self.INDEX_FILE}.tmp"
+        with open(index_tmp, "w", encoding="utf-8") as f:
+            json.dump({"docs": self.docs}, f)
+        os.replace(index_tmp, self._index_path())
+        self._loaded_mtime = self._index_path().stat().st_mtime
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+            self._index_path().unlink(missing_ok=True)
+            self._loaded_mtime = None
+            self._dirty = False
+
+    def missing_ids(self, ids):
+        with self._lock:
+            self._maybe_reload()
+            return {chunk_id for chunk_id in ids if chunk_id not in self.docs}
+
+    def upsert(self, chunks):
+        """
+        :param chunks: [(chunk id, text, metadata), ...]; the text is kept in the metadata.
+        """
+        with self._lock:
+            self._maybe_reload()
+            for chunk_id, text, metadata in chunks:
+                self._remove(chunk_id)
+                tokens = tokenize(text)
+                self._add(
+                    chunk_id,
+                    {"tf": dict(Counter(tokens)), "length": len(tokens), "metadata": {**metadata, "text": text}},
+                )
+            self._dirty = True
+
+    def delete(self, ids):
+        with self._lock:
+            self._maybe_reload()
+            if not any(chunk_id in self.docs for chunk_id in ids):
+                return
+            for chunk_id in ids:
+                self._remove(chunk_id)
+            self._dirty = True
+
+    def query(self, text, top_k, filter=None):
+        with self._lock:
+            self._maybe_reload()
+            if not self.docs:
+                return []
+
+            doc_count = len(self.docs)
+            average_length = self.total_length / doc_count or 1
+            scores = defaultdict(float)
+            for term in set(tokenize(text)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, count in postings.items():
+                    length_norm = 1 - self.b + self.b * self.docs[chunk_id]["length"] / average_length
+                    scores[chunk_id] += idf * count * (self.k1 + 1) / (count + self.k1 * length_norm)
+
+            if filter:
+                scores = {
+                    chunk_id: score for chunk_id, score in scores.items()
+                    if matches_filter(self.docs[chunk_id]["metadata"], filter)
+                }
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+            return [
+                {"id": chunk_id, "score": score, "metadata": self.docs[chunk_id]["metadata"]}
+                for chunk_id, score in best
+            ]
+
+    def sample(self, count, seed=None):
+        # Chunks drawn at random, for building offline evaluation queries
+        with self._lock:
+            self._maybe_reload()
+            ids = sorted(self.docs)
+            chosen = random.Random(seed).sample(ids, min(count, len(ids)))
+            return [(chunk_id, self.docs[chunk_id]["metadata"]) for chunk_id in chosen]
+
+
+@lru_cache(maxsize=None)
+def get_sparse_index():
+    return SparseIndex(settings.SPARSE_INDEX_PATH)
@@ -1,3 +1,195 @@
-from django.test import TestCase
+import functools
+import shutil
+import tempfile
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from knowledge.models import CrawlState
+from knowledge.provinces import detect_provinces
+from knowledge.scraper.crawler import CrawlAborted, Crawler, HttpFetcher, SiteConfig, crawl_site
+from knowledge.scraper.page_records import load_page_manifest
+
+STATIC_SITE = Path(__file__).resolve().parent / "testdata" / "static_site"
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class NoBrowserFetcher:
+    # Every page of the fixture site has its content in the static HTML
+    async def fetch(self, url, wait_selector=None):
+        raise AssertionError(f"{url} should not need the browser")
+
+
+class PageCollector:
+    def __init__(self):
+        self.pages = {}
+
+    async def write(self, url, title, text):
+        self.pages[url] = (title, text)
+
+
+class CrawlerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.storage_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.storage_settings.enable()
+        # Served from a copy, which tests may change
+        cls.site_dir = Path(tempfile.mkdtemp()) / "static_site"
+        shutil.copytree(STATIC_SITE, cls.site_dir)
+        handler = functools.partial(QuietHandler, directory=str(cls.site_dir))
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}/"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.site_dir.parent)
+        cls.storage_settings.disable()
+        shutil.rmtree(cls.media_root)
+        super().tearDownClass()
+
+    def site(self, **overrides):
+        options = {
+            "name": "test_site",
+            "base_url": self.base_url,
+            "content_selector": "div.content",
+            "nav_selector": "nav a",
+        }
+        options.update(overrides)
+        return SiteConfig(**options)
+
+    def crawl(self, site):
+        page_writer = PageCollector()
+
+        async def run():
+            async with HttpFetcher(max_connections=4) as http_fetcher:
+                crawler = Crawler(site, http_fetcher, NoBrowserFetcher(), page_writer, request_delay=0)
+                return await crawler.run()
+
+        return async_to_sync(run)(), page_writer.pages
+
+    def crawl_and_publish(self, site):
+        # Through crawl_site, which stores the page records and publishes their manifest
+        async def run():
+            async with HttpFetcher(max_connections=4) as http_fetcher:
+                return await crawl_site(
+                    site, http_fetcher=http_fetcher, browser_fetcher=NoBrowserFetcher(), request_delay=0
+                )
+
+        return async_to_sync(run)()
+
+    def delete_from_site(self, path):
+        page = self.site_dir / path
+        content = page.read_bytes()
+        page.unlink()
+        self.addCleanup(page.write_bytes, content)
+
+    def test_crawl_follows_navigation_and_links(self):
+        stats, pages = self.crawl(self.site())
+
+        self.assertEqual(
+            set(pages), {f"{self.base_url}registration.html", f"{self.base_url}guides/practice.html"}
+        )
+        title, text = pages[f"{self.base_url}registration.html"]
+        self.assertEqual(title, "Registration")
+        self.assertIn("submit their credentials", text)
+        self.assertEqual((stats.pages, stats.pdfs, stats.changed, stats.errors, stats.browser_pages), (2, 1, 2, 0, 0))
+        self.assertEqual(CrawlState.objects.filter(site="test_site").count(), 3)
+        self.assertTrue(default_storage.exists("scraped_data/test_site/pdfs/Registration guide.pdf"))
+
+    def test_recrawl_reuses_unchanged_pages(self):
+        self.crawl(self.site())
+        stats, pages = self.crawl(self.site())
+
+        self.assertEqual(len(pages), 2)
+        self.assertEqual((stats.changed, stats.unchanged, stats.pdfs), (0, 3, 0))
+
+    def test_non_html_base_url_aborts_without_removing_anything(self):
+        self.crawl_and_publish(self.site())
+        manifest = load_page_manifest("test_site")
+        self.assertIsNotNone(manifest)
+
+        with self.assertRaises(CrawlAborted):
+            self.crawl_and_publish(self.site(base_url=f"{self.base_url}notes.txt"))
+
+        self.assertEqual(CrawlState.objects.filter(site="test_site").count(), 3)
+        self.assertTrue(default_storage.exists("scraped_data/test_site/pdfs/Registration guide.pdf"))
+        self.assertEqual(load_page_manifest("test_site"), manifest)
+
+    def test_crawl_losing_most_of_the_site_aborts(self):
+        self.crawl(self.site())
+        # The PDF is only linked from this page, so two of the three known URLs would go
+        self.delete_from_site("registration.html")
+
+        with self.assertRaises(CrawlAborted):
+            self.crawl(self.site())
+
+        self.assertEqual(CrawlState.objects.filter(site="test_site").count(), 3)
+        self.assertTrue(default_storage.exists("scraped_data/test_site/pdfs/Registration guide.pdf"))
+
+    @override_settings(SCRAPER_MAX_REMOVED_RATIO=1.0)  # A single page is a large share of the fixture site
+    def test_deleted_page_is_removed(self):
+        self.crawl(self.site())
+        self.delete_from_site("registration.html")
+
+        stats, pages = self.crawl(self.site())
+
+        self.assertEqual(set(pages), {f"{self.base_url}guides/practice.html"})
+        self.assertEqual((stats.removed, stats.errors), (1, 0))
+        self.assertFalse(
+            CrawlState.objects.filter(site="test_site", url=f"{self.base_url}registration.html").exists()
+        )
+
+    @override_settings(SCRAPER_MAX_REMOVED_RATIO=1.0)
+    def test_pdf_copy_outlives_the_original(self):
+        # The same document linked under another name from another page
+        (self.site_dir / "docs" / "copy.pdf").write_bytes((self.site_dir / "docs" / "guide.pdf").read_bytes())
+        self.addCleanup((self.site_dir / "docs" / "copy.pdf").unlink)
+        practice = self.site_dir / "guides" / "practice.html"
+        content = practice.read_text()
+        self.addCleanup(practice.write_text, content)
+        practice.write_text(content.replace("</div>", '<a href="/docs/copy.pdf">Practice guide</a></div>'))
+
+        self.crawl(self.site())
+        self.assertTrue(default_storage.exists("scraped_data/test_site/pdfs/Practice guide.pdf"))
+
+        self.delete_from_site("registration.html")
+        self.crawl(self.site())
+
+        self.assertFalse(default_storage.exists("scraped_data/test_site/pdfs/Registration guide.pdf"))
+        self.assertTrue(default_storage.exists("scraped_data/test_site/pdfs/Practice guide.pdf"))
+
+    def test_deleted_pdf_is_removed_from_storage(self):
+        self.crawl(self.site())
+        self.delete_from_site("docs/guide.pdf")
+
+        stats, pages = self.crawl(self.site())
+
+        self.assertEqual((len(pages), stats.errors), (2, 0))
+        self.assertFalse(
+            CrawlState.objects.filter(site="test_site", url=f"{self.base_url}docs/guide.pdf").exists()
+        )
+        self.assertFalse(default_storage.exists("scraped_data/test_site/pdfs/Registration guide.pdf"))
+
+
+class DetectProvincesTests(SimpleTestCase):
+    def test_names_codes_and_regulators(self):
+        self.assertEqual(detect_provinces("How does CNO compare to the BCCNM?"), ["ontario", "british_columbia"])
+        self.assertEqual(detect_provinces("I live in Toronto, ON"), ["ontario"])
+        self.assertEqual(detect_provinces("Moving to Nova Scotia from AB"), ["nova_scotia", "alberta"])
+
+    def test_two_letter_words_are_not_provinces(self):
+        self.assertEqual(detect_provinces("ON the exam day, what should I bring?"), [])
+        self.assertEqual(detect_provinces("WHAT FEES APPLY IN ON?"), [])
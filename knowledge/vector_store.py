@@ -0,0 +1,373 @@
+import json
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from more_itertools import chunked
+
+from chatbackend.configs.logging_config import configure_logger
+
+try:
+    import hnswlib
+except ImportError:  # Optional: the local store falls back to brute force without it
+    hnswlib = None
+
+logger = configure_logger(__name__)
+
+
+EMBEDDING_DIMENSION = 1536
+BATCH_SIZE = 50
+
+
+def matches_filter(metadata, filter):
+    for field, condition in filter.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict) and "$in" in condition:
+            if value not in condition["$in"]:
+                return False
+        elif value != (condition["$eq"] if isinstance(condition, dict) else condition):
+            return False
+    return True
+
+
+class VectorStore(ABC):
+    """
+    Minimal interface shared by the vector index backends. Vectors are passed as
+    (id, values, metadata) tuples and matches are returned as plain dicts with
+    "id", "score" and "metadata" keys.
+
+    Queries take an optional metadata filter in the Pinecone syntax, limited to equality
+    and membership: {"field": value}, {"field": {"$eq": value}} or {"field": {"$in": [...]}}.
+
+    Writers call `flush()` once they are done with a series of upserts and deletes; backends
+    that buffer changes only make them visible to other processes then.
+    """
+    def ensure_index(self):
+        pass
+
+    def flush(self):
+        pass
+
+    @abstractmethod
+    def reset(self):
+        pass
+
+    @abstractmethod
+    def upsert(self, vectors):
+        pass
+
+    @abstractmethod
+    def delete(self, ids):
+        pass
+
+    @abstractmethod
+    def query(self, vector, top_k, filter=None):
+        pass
+
+
+class PineconeVectorStore(VectorStore):
+    _initialized = False
+
+    def __init__(self, index_name, dimension=EMBEDDING_DIMENSION):
+        self.index_name = index_name
+        self.dimension = dimension
+        self._index = None
+
+    @classmethod
+    def _pinecone(cls):
+        # Imported and initialized lazily so the knowledge app can be loaded offline
+        import pinecone
+
+        if not cls._initialized:
+            pinecone.init(api_key=settings.PINECONE_API_KEY, environment=settings.PINECONE_API_ENV)
+            cls._initialized = True
+        return pinecone
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self._pinecone().Index(index_name=self.index_name)
+        return self._index
+
+    def ensure_index(self):
+        pinecone = self._pinecone()
+        if self.index_name not in pinecone.list_indexes():
+            logger.info(f"Creating new index: {self.index_name}")
+            pinecone.create_index(self.index_name, dimension=self.dimension)
+
+    def reset(self):
+        pinecone = self._pinecone()
+        if self.index_name in pinecone.list_indexes():
+            logger.info(f"Deleting existing index: {self.index_name}")
+            pinecone.delete_index(self.index_name)
+        self._index = None
+
+    def upsert(self, vectors):
+        # Split the vectors into smaller chunks (e.g., 50 vectors per request)
+        for i, batch in enumerate(chunked(vectors, BATCH_SIZE)):
+            self.index.upsert(batch)
+            logger.info(f"Uploaded Batch {i}")
+
+    def delete(self, ids):
+        for batch in chunked(ids, BATCH_SIZE):
+            self.index.delete(ids=batch)
+
+    def fetch(self, ids):
+        vectors = []
+        for batch in chunked(ids, BATCH_SIZE):
+            response = self.index.fetch(ids=batch)
+            for vector_id, vector in response["vectors"].items():
+                vectors.append((vector_id, vector["values"], vector.get("metadata", {})))
+        return vectors
+
+    def query(self, vector, top_k, filter=None):
+        results = self.index.query(vector, top_k=top_k, filter=filter, include_metadata=True)
+        return [
+            {"id": match["id"], "score": match["score"], "metadata": match["metadata"]}
+            for match in results["matches"]
+        ]
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process index persisted to disk. Queries are brute-force cosine similarity over a
+    normalized numpy matrix, switching to an HNSW graph (hnswlib) once the corpus reaches
+    `hnsw_threshold` vectors.
+
+    Upserts and deletes change the in-memory index (new vectors are added to the HNSW graph
+    as they come) and are written out by `flush()`. Every flush writes a new version
+    directory and then points the CURRENT file at it, so other processes, which reload when
+    CURRENT changes, always load vectors, metadata and graph of the same version.
+    """
+    VECTORS_FILE = "vectors.npy"
+    METADATA_FILE = "metadata.json"
+    HNSW_FILE = "hnsw.bin"
+    CURRENT_FILE = "CURRENT"
+
+    def __init__(self, path, dimension=EMBEDDING_DIMENSION, hnsw_threshold=20000):
+        self.path = Path(path)
+        self.dimension = dimension
+        self.hnsw_threshold = hnsw_threshold
+        self._lock = threading.RLock()
+        self._clear()
+        self._loaded_version = None
+
+    def _clear(self):
+        self.ids = []
+        self.metadata = []
+        self.vectors = np.empty((0, self.dimension), dtype=np.float32)
+        self.positions = {}
+        self._hnsw = None
+        self._hnsw_stale = False  # Rows were removed, so the graph labels no longer match
+        self._dirty = False
+        self._field_values = {}  # metadata field -> values of every row, for filtering
+
+    def _current_path(self):
+        return self.path / self.CURRENT_FILE
+
+    def _stored_version(self):
+        try:
+            return self._current_path().read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return None
+
+    def _use_hnsw(self):
+        return hnswlib is not None and len(self.ids) >= self.hnsw_threshold
+
+    def _maybe_reload(self):
+        if self._dirty:
+            # Changes not flushed yet would be lost; they are written over the stored version
+            return
+        version = self._stored_version()
+        if version is None and (self.path / self.METADATA_FILE).exists():
+            # Store saved before versions were introduced, with its files at the top level
+            version = "."
+        if version is None or version == self._loaded_version:
+            return
+
+        version_path = self.path / version
+        with open(version_path / self.METADATA_FILE, encoding="utf-8") as f:
+            stored = json.load(f)
+        self._clear()
+        self.ids = stored["ids"]
+        self.metadata = stored["metadata"]
+        self.vectors = np.load(version_path / self.VECTORS_FILE)
+        self.positions = {vector_id: i for i, vector_id in enumerate(self.ids)}
+
+        hnsw_path = version_path / self.HNSW_FILE
+        if self._use_hnsw() and hnsw_path.exists():
+            self._hnsw = hnswlib.Index(space="ip", dim=self.dimension)
+            self._hnsw.load_index(str(hnsw_path), max_elements=len(self.ids))
+            self._hnsw.set_ef(64)
+        self._loaded_version = version
+        logger.info(f"Loaded local vector store version {version} with {len(self.ids)} vectors from {self.path}")
+
+    def _candidates(self, filter):
+        mask = np.ones(len(self.ids), dtype=bool)
+        for field, condition in filter.items():
+            if field not in self._field_values:
+                self._field_values[field] = np.array(
+                    [metadata.get(field) for metadata in self.metadata], dtype=object
+                )
+            values = self._field_values[field]
+            if isinstance(condition, dict) and "$in" in condition:
+                mask &= np.isin(values, list(condition["$in"]))
+            else:
+                mask &= values == (condition["$eq"] if isinstance(condition, dict) else condition)
+        return np.flatnonzero(mask)
+
+    def _build_hnsw(self):
+        index = hnswlib.Index(space="ip", dim=self.dimension)
+        index.init_index(max_elements=len(self.ids), ef_construction=200, M=16)
+        index.add_items(self.vectors, np.arange(len(self.ids)))
+        index.set_ef(64)
+        return index
+
+    def _add_to_hnsw(self, rows, labels):
+        # Labels are row positions; adding an existing label replaces its vector
+        if self._hnsw is None or self._hnsw_stale:
+            return
+        if self._hnsw.get_max_elements() < len(self.ids):
+            self._hnsw.resize_index(max(len(self.ids), 2 * self._hnsw.get_max_elements()))
+        self._hnsw.add_items(np.asarray(rows), np.asarray(labels))
+
+    def flush(self):
+        """
+        Writes the changes made since the last flush as a new version.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            if self._use_hnsw() and (self._hnsw is None or self._hnsw_stale):
+                # Built from scratch only when the corpus reaches the threshold or rows were removed
+                self._hnsw = self._build_hnsw()
+                self._hnsw_stale = False
+            elif not self._use_hnsw():
+                self._hnsw = None
+
+            previous_version = self._stored_version()
+            version = f"v{int(previous_version[1:]) + 1 if previous_version else 1:06d}"
+            while (self.path / version).exists():
+                # Left over by a flush that failed before switching CURRENT
+                version = f"v{int(version[1:]) + 1:06d}"
+            version_path = self.path / version
+            version_path.mkdir(parents=True, exist_ok=True)
+            with open(version_path / self.VECTORS_FILE, "wb") as f:
+                np.save(f, self.vectors)
+            with open(version_path / self.METADATA_FILE, "w", encoding="utf-8") as f:
+                json.dump({"ids": self.ids, "metadata": self.metadata}, f)
+            if self._hnsw is not None:
+                self._hnsw.save_index(str(version_path / self.HNSW_FILE))
+
+            # Switching CURRENT is atomic: readers see either the previous version or this one
+            current_tmp = self.path / f"{self.CURRENT_FILE}.tmp"
+            current_tmp.write_text(version, encoding="utf-8")
+            os.replace(current_tmp, self._current_path())
+            self._loaded_version = version
+            self._dirty = False
+
+            # The previous version is kept for readers still loading it
+            for old_path in self.path.glob("v*"):
+                if old_path.is_dir() and old_path.name not in (version, previous_version):
+                    shutil.rmtree(old_path, ignore_errors=True)
+            logger.info(f"Saved local vector store version {version} with {len(self.ids)} vectors")
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+            self._current_path().unlink(missing_ok=True)
+            for old_path in self.path.glob("v*"):
+                if old_path.is_dir():
+                    shutil.rmtree(old_path, ignore_errors=True)
+            self._loaded_version = None
+
+    def upsert(self, vectors):
+        with self._lock:
+            self._maybe_reload()
+            new_rows, replaced_rows, replaced_labels = [], [], []
+            for vector_id, values, metadata in vectors:
+                row = np.asarray(values, dtype=np.float32)
+                row = row / np.linalg.norm(row)
+                if vector_id in self.positions:
+                    position = self.positions[vector_id]
+                    self.vectors[position] = row
+                    self.metadata[position] = metadata
+                    replaced_rows.append(row)
+                    replaced_labels.append(position)
+                else:
+                    self.positions[vector_id] = len(self.ids)
+                    self.ids.append(vector_id)
+                    self.metadata.append(metadata)
+                    new_rows.append(row)
+            if new_rows:
+                first_label = len(self.vectors)
+                self.vectors = np.vstack([self.vectors, np.asarray(new_rows)])
+                self._add_to_hnsw(new_rows, range(first_label, len(self.vectors)))
+            if replaced_rows:
+                self._add_to_hnsw(replaced_rows, replaced_labels)
+            self._field_values = {}
+            self._dirty = True
+
+    def delete(self, ids):
+        with self._lock:
+            self._maybe_reload()
+            removed = {self.positions[vector_id] for vector_id in ids if vector_id in self.positions}
+            if not removed:
+                return
+            keep = [i for i in range(len(self.ids)) if i not in removed]
+            self.ids = [self.ids[i] for i in keep]
+            self.metadata = [self.metadata[i] for i in keep]
+            self.vectors = self.vectors[keep]
+            self.positions = {vector_id: i for i, vector_id in enumerate(self.ids)}
+            # Positions moved: queries scan the matrix until flush rebuilds the graph
+            self._hnsw_stale = self._hnsw is not None
+            self._field_values = {}
+            self._dirty = True
+
+    def query(self, vector, top_k, filter=None):
+        with self._lock:
+            self._maybe_reload()
+            # A filter narrows the search to the matching rows, which are then scanned directly
+            candidates = self._candidates(filter) if filter else None
+            size = len(self.ids) if candidates is None else len(candidates)
+            if not size:
+                return []
+
+            query = np.asarray(vector, dtype=np.float32)
+            query = query / np.linalg.norm(query)
+            top_k = min(top_k, size)
+
+            if self._hnsw is not None and not self._hnsw_stale and candidates is None:
+                labels, distances = self._hnsw.knn_query(query, k=top_k)
+                # With the "ip" space hnswlib returns 1 - inner product
+                ranked = zip(labels[0], 1 - distances[0])
+            else:
+                vectors = self.vectors if candidates is None else self.vectors[candidates]
+                scores = vectors @ query
+                best = np.argpartition(-scores, top_k - 1)[:top_k]
+                best = best[np.argsort(-scores[best])]
+                rows = best if candidates is None else candidates[best]
+                ranked = zip(rows, scores[best])
+
+            return [
+                {"id": self.ids[i], "score": float(score), "metadata": self.metadata[i]}
+                for i, score in ranked
+            ]
+
+
+@lru_cache(maxsize=None)
+def get_vector_store(backend=None):
+    backend = backend or settings.VECTOR_STORE_BACKEND
+    if backend == "pinecone":
+        return PineconeVectorStore(settings.PINECONE_INDEX_NAME)
+    if backend == "local":
+        return LocalVectorStore(
+            settings.LOCAL_VECTOR_STORE_PATH,
+            hnsw_threshold=settings.LOCAL_VECTOR_STORE_HNSW_THRESHOLD,
+        )
+    raise ValueError(f"Unknown vector store backend: {backend}")
@@ -1,7 +1,7 @@
-from django.conf import settings
 from django.contrib import admin
 from django.utils.html import format_html
 
+from helpers import storage_utils
 from optimizers.models import (
     CoverLetter,
     CoverLetterAnalysis,
@@ -57,7 +57,7 @@ class CoverLetterAdmin(admin.ModelAdmin):
 
     def original_pdf_link(self, obj):
         if obj.original_pdf_s3_key:
-            url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{obj.original_pdf_s3_key}"
+            url = storage_utils.object_url(obj.original_pdf_s3_key)
             return format_html(
                 "<a href='{url}' target='_blank'>View Original PDF</a>", url=url
             )
@@ -67,7 +67,7 @@ class CoverLetterAdmin(admin.ModelAdmin):
 
     def general_improved_pdf_link(self, obj):
         if obj.general_improved_pdf_s3_key:
-            url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{obj.general_improved_pdf_s3_key}"
+            url = storage_utils.object_url(obj.general_improved_pdf_s3_key)
             return format_html(
                 "<a href='{url}' target='_blank'>View Improved PDF</a>", url=url
             )
@@ -86,7 +86,7 @@ class ResumeAdmin(admin.ModelAdmin):
 
     def original_pdf_link(self, obj):
         if obj.original_pdf_s3_key:
-            url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{obj.original_pdf_s3_key}"
+            url = storage_utils.object_url(obj.original_pdf_s3_key)
             return format_html(
                 "<a href='{url}' target='_blank'>View Original PDF</a>", url=url
             )
@@ -96,7 +96,7 @@ class ResumeAdmin(admin.ModelAdmin):
 
     def general_improved_pdf_link(self, obj):
         if obj.general_improved_pdf_s3_key:
-            url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{obj.general_improved_pdf_s3_key}"
+            url = storage_utils.object_url(obj.general_improved_pdf_s3_key)
             return format_html(
                 "<a href='{url}' target='_blank'>View Improved PDF</a>", url=url
             )
@@ -112,7 +112,7 @@ class OptimizedCoverLetterContentAdmin(admin.ModelAdmin):
 
     def optimized_pdf_link(self, obj):
         if obj.optimized_pdf_s3_key:
-            url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{obj.optimized_pdf_s3_key}"
+            url = storage_utils.object_url(obj.optimized_pdf_s3_key)
             return format_html(
                 "<a href='{url}' target='_blank'>View Optimized PDF</a>", url=url
             )
@@ -128,7 +128,7 @@ class OptimizedResumeContentAdmin(admin.ModelAdmin):
 
     def optimized_pdf_link(self, obj):
         if obj.optimized_pdf_s3_key:
-            url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{obj.optimized_pdf_s3_key}"
+            url = storage_utils.object_url(obj.optimized_pdf_s3_key)
             return format_html(
                 "<a href='{url}' target='_blank'>View Optimized PDF</a>", url=url
             )
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from celery import shared_task
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from chatbackend.configs.logging_config import configure_logger
+from optimizers.cl_opt import tailor_cover_letter
+from optimizers.job_post import get_optimized_job_post
+from optimizers.mg_database import get_job_posts_content, get_job_versions
+from optimizers.models import CoverLetter, Resume
+from optimizers.resume_opt import tailor_resume
+from optimizers.task_status import aset_stage, current_task_id, tracked_task
+
+logger = configure_logger(__name__)
+
+DOC_TYPES = ("R", "CL")  # Resume, cover letter
+
+
+async def send_optimization_message(applicant_id, payload):
+    # Delivered by the OptimizationConsumer sockets of the applicant
+    await get_channel_layer().group_send(
+        f"user_{applicant_id}",
+        {"type": "optimization.message", "message": json.dumps(payload)},
+    )
+
+
+async def bulk_tailor_func(applicant_id, job_post_ids, doc_types=DOC_TYPES):
+    """
+    Tailors an applicant's resume and/or cover letter to many job posts in one run.
+
+    The applicant's documents are loaded once, the jobs are read in one query, and every job
+    post is optimized at most once (shared with other applicants). At most BULK_TAILORING_CONCURRENCY jobs are tailored at a
+    time, and the PDF URL of each (job, document) is sent over the optimization WebSocket as
+    soon as it is ready.
+
+    :return: One result per (job, document), with "url" or "error".
+    """
+    await aset_stage("fetch")
+    tailors = {}
+    if "R" in doc_types:
+        resume_instance = await sync_to_async(Resume.objects.get)(resume_id=applicant_id)
+        tailors["R"] = lambda job_post_instance: tailor_resume(resume_instance, job_post_instance)
+    if "CL" in doc_types:
+        cover_letter_instance = await sync_to_async(CoverLetter.objects.get)(cover_letter_id=applicant_id)
+        tailors["CL"] = lambda job_post_instance: tailor_cover_letter(cover_letter_instance, job_post_instance)
+
+    # Every job in one Mongo query, for the job posts that have to be optimized; versions first,
+    # so a job edited in between is optimized again rather than missed
+    job_versions = await sync_to_async(get_job_versions, thread_sensitive=False)(job_post_ids)
+    job_contents = await get_job_posts_content(job_post_ids)
+    slots = asyncio.Semaphore(settings.BULK_TAILORING_CONCURRENCY)
+
+    async def tailor_job(job_post_id):
+        # Jobs run side by side, so their stages are not reported on the task status: each
+        # result is sent as a bulk_tailoring message instead
+        current_task_id.set(None)
+        async with slots:
+            job_post_instance, job_error = None, None
+            try:
+                job_post_instance = await get_optimized_job_post(
+                    job_post_id, job_contents.get(job_post_id), job_versions.get(job_post_id, "")
+                )
+            except Exception as e:
+                logger.error(f"Optimization of job post {job_post_id} failed: {e}")
+                job_error = str(e)
+
+            results = []
+            for doc_type, tailor in tailors.items():
+                result = {"type": "bulk_tailoring", "job_post_id": job_post_id, "doc_type": doc_type}
+                if job_post_instance is None:
+                    result["error"] = job_error
+                else:
+                    try:
+                        result["url"] = await tailor(job_post_instance)
+                    except Exception as e:
+                        logger.error(f"Tailoring {doc_type} of {applicant_id} to job post {job_post_id} failed: {e}")
+                        result["error"] = str(e)
+                await send_optimization_message(applicant_id, result)
+                results.append(result)
+            return results
+
+    job_results = await asyncio.gather(*(tailor_job(job_post_id) for job_post_id in job_post_ids))
+    results = [result for job_result in job_results for result in job_result]
+
+    failed = sum(1 for result in results if "error" in result)
+    await send_optimization_message(
+        applicant_id,
+        {"type": "bulk_tailoring_completed", "completed": len(results) - failed, "failed": failed},
+    )
+    return results
+
+
+@shared_task
+@tracked_task
+def bulk_tailor(applicant_id, job_post_ids, doc_types=DOC_TYPES):
+    start_time = time.time()
+
+    results = async_to_sync(bulk_tailor_func)(applicant_id, job_post_ids, doc_types)
+
+    total = time.time() - start_time
+    logger.info(f"Tailored {len(results)} documents for {len(job_post_ids)} job posts in {total} seconds")
+    return results
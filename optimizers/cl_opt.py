@@ -8,7 +8,7 @@ from django.conf import settings
 
 from chatbackend.configs.logging_config import configure_logger
 from helpers.optimizer_utils import cover_letter
-from optimizers.job_post import optimize_job
+from optimizers.job_post import get_optimized_job_post
 from optimizers.mg_database import get_doc_content, get_job_post_content
 from optimizers.models import (
     CoverLetter,
@@ -16,18 +16,20 @@ from optimizers.models import (
     JobPost,
     OptimizedCoverLetterContent,
 )
-from optimizers.pdf_gen import generate_formatted_pdf
+from optimizers.pdf_rendering import agenerate_formatted_pdf
 from optimizers.samples import default_cover_letter
+from optimizers.task_status import aset_stage, tracked_task
 from optimizers.utils import (
     Polarity,
     Readablity,
+    aupload_directly_to_s3,
     check_grammar_and_spelling,
     create_doc,
     customize_doc,
+    get_full_url,
     improve_doc,
     optimize_doc,
     review_tone,
-    upload_directly_to_s3,
 )
 
 logger = configure_logger(__name__)
@@ -37,16 +39,20 @@ USER_ROLE = "user"
 
 
 @shared_task
+@tracked_task
 def get_default_cover_letter(candidate_id):
     start_time = time.time()
 
     async def get_default_cl():
+        await aset_stage("fetch")
         resume_content = await get_doc_content(candidate_id, doc_type="R")
+        await aset_stage("improve")
         created_cl = await create_doc(
             "cover letter", "resume", resume_content, default_cover_letter
         )
 
-        pdf = await generate_formatted_pdf(
+        await aset_stage("render")
+        pdf = await agenerate_formatted_pdf(
             created_cl, filename="Base Cover Letter.pdf", doc_type="CL"
         )
 
@@ -54,8 +60,10 @@ def get_default_cover_letter(candidate_id):
         s3_key = f"media/cover_letters/original/{uuid4()}.pdf"
 
         # Upload the PDF directly to S3
-        upload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
+        await aset_stage("upload")
+        await aupload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
 
+        await aset_stage("persist")
         cover_letter_instance, cover_letter_created = await sync_to_async(
             CoverLetter.objects.update_or_create, thread_sensitive=True
         )(
@@ -66,9 +74,7 @@ def get_default_cover_letter(candidate_id):
             },
         )
         # Construct the URL to the PDF stored in S3
-        pdf_url = (
-            f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
-        )
+        pdf_url = get_full_url(s3_key)
         return pdf_url
 
     url = async_to_sync(get_default_cl)()
@@ -78,6 +84,7 @@ def get_default_cover_letter(candidate_id):
 
 
 @shared_task
+@tracked_task
 def improve_cover_letter(candidate_id):
     start_time = time.time()
 
@@ -86,6 +93,7 @@ def improve_cover_letter(candidate_id):
             default_cover_letter  # Assuming this is fetched or defined earlier
         )
 
+        await aset_stage("feedback")
         readability = Readablity(cover_letter_content)
         readability_feedback = await readability.get_readability_text(
             doc_type="cover letter"
@@ -101,13 +109,15 @@ def improve_cover_letter(candidate_id):
         feedbacks = [readability_feedback, polarity_feedback, tone_feedback]
         cover_letter_feedback = "\n\n".join(feedbacks)
 
+        await aset_stage("improve")
         improved_content = await improve_doc(
             doc_type="cover letter",
             doc_content=cover_letter_content,
             doc_feedback=cover_letter_feedback,
         )
 
-        pdf = await generate_formatted_pdf(
+        await aset_stage("render")
+        pdf = await agenerate_formatted_pdf(
             improved_content, filename="Improved Cover Letter.pdf", doc_type="CL"
         )
 
@@ -115,8 +125,10 @@ def improve_cover_letter(candidate_id):
         s3_key = f"media/cover_letters/general_improved/{uuid4()}.pdf"
 
         # Upload the PDF directly to S3
-        upload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
+        await aset_stage("upload")
+        await aupload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
 
+        await aset_stage("persist")
         cover_letter_instance, cover_letter_created = await sync_to_async(
             CoverLetter.objects.update_or_create, thread_sensitive=True
         )(
@@ -127,9 +139,7 @@ def improve_cover_letter(candidate_id):
             },
         )
         # Construct the URL to the PDF stored in S3
-        pdf_url = (
-            f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
-        )
+        pdf_url = get_full_url(s3_key)
         return pdf_url
 
     url = async_to_sync(improve_cl)()
@@ -139,21 +149,25 @@ def improve_cover_letter(candidate_id):
 
 
 @shared_task
+@tracked_task
 def customize_improved_cover_letter(candidate_id, custom_instruction):
     start_time = time.time()
 
     async def customize_cl():
+        await aset_stage("fetch")
         cover_letter_instance = await sync_to_async(CoverLetter.objects.get)(
             cover_letter_id=candidate_id
         )
         improved_content = cover_letter_instance.general_improved_content
+        await aset_stage("improve")
         customized_content = await customize_doc(
             doc_type="cover letter",
             doc_content=improved_content,
             custom_instruction=custom_instruction,
         )
 
-        pdf = await generate_formatted_pdf(
+        await aset_stage("render")
+        pdf = await agenerate_formatted_pdf(
             customized_content,
             filename="Customized Improved Cover Letter.pdf",
             doc_type="CL",
@@ -163,8 +177,10 @@ def customize_improved_cover_letter(candidate_id, custom_instruction):
         s3_key = f"media/cover_letters/general_improved/{uuid4()}.pdf"
 
         # Upload the PDF directly to S3
-        upload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
+        await aset_stage("upload")
+        await aupload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
 
+        await aset_stage("persist")
         cover_letter_instance, cover_letter_created = await sync_to_async(
             CoverLetter.objects.update_or_create, thread_sensitive=True
         )(
@@ -176,9 +192,7 @@ def customize_improved_cover_letter(candidate_id, custom_instruction):
         )
 
         # Construct the URL to the PDF stored in S3
-        pdf_url = (
-            f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
-        )
+        pdf_url = get_full_url(s3_key)
         return pdf_url
 
     url = async_to_sync(customize_cl)()
@@ -188,25 +202,25 @@ def customize_improved_cover_letter(candidate_id, custom_instruction):
 
 
 async def cl_optimize_func(applicant_id, job_post_id):
+    await aset_stage("fetch")
     cover_letter_instance = await sync_to_async(CoverLetter.objects.get)(
         cover_letter_id=applicant_id
     )
 
-    try:
-        job_post_instance = await sync_to_async(JobPost.objects.get)(
-            job_post_id=job_post_id
-        )
+    # Optimized once per job post, however many applicants tailor to it at the same time
+    job_post_instance = await get_optimized_job_post(job_post_id)
+    return await tailor_cover_letter(cover_letter_instance, job_post_instance)
+
 
-        if job_post_instance.optimized_content:
-            logger.info(
-                f"JobPost {job_post_id} already optimized. Skipping optimization."
-            )
-            optimized_content_for_job_post = job_post_instance.optimized_content
+async def tailor_cover_letter(cover_letter_instance, job_post_instance):
+    """
+    Tailors an applicant's improved cover letter to an optimized job post, renders and stores it.
 
-    except JobPost.DoesNotExist:
-        logger.info(f"JobPost {job_post_id} not optimized. Starting optimization.")
-        optimized_content_for_job_post = await optimize_job(job_post_id)
+    :return: URL of the tailored cover letter PDF.
+    """
+    optimized_content_for_job_post = job_post_instance.optimized_content
 
+    await aset_stage("improve")
     optimized_content = await optimize_doc(
         doc_type="cover letter",
         doc_text=cover_letter_instance.general_improved_content,
@@ -214,7 +228,8 @@ async def cl_optimize_func(applicant_id, job_post_id):
         job_description=optimized_content_for_job_post,
     )
 
-    pdf = await generate_formatted_pdf(
+    await aset_stage("render")
+    pdf = await agenerate_formatted_pdf(
         optimized_content, filename="Optimized Cover Letter.pdf", doc_type="CL"
     )
 
@@ -222,25 +237,28 @@ async def cl_optimize_func(applicant_id, job_post_id):
     s3_key = f"media/cover_letters/optimized/{uuid4()}.pdf"
 
     # Upload the PDF directly to S3
-    upload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
+    await aset_stage("upload")
+    await aupload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
 
+    await aset_stage("persist")
     optimized_content_instance, created = await sync_to_async(
         OptimizedCoverLetterContent.objects.update_or_create, thread_sensitive=True
     )(
         cover_letter=cover_letter_instance,
+        job_post=job_post_instance,
         defaults={
             "optimized_content": optimized_content,
             "optimized_pdf_s3_key": s3_key,
             "is_tailored": True,
-            "job_post": job_post_instance,
         },
     )
     # Construct the URL to the PDF stored in S3
-    pdf_url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
+    pdf_url = get_full_url(s3_key)
     return pdf_url
 
 
 @shared_task
+@tracked_task
 def optimize_cover_letter(applicant_id, job_post_id):
     start_time = time.time()
 
@@ -253,24 +271,27 @@ def optimize_cover_letter(applicant_id, job_post_id):
 
 
 async def customize_opt_cl(applicant_id, job_post_id, custom_instruction):
+    await aset_stage("fetch")
     cover_letter_instance = await sync_to_async(CoverLetter.objects.get)(
         cover_letter_id=applicant_id
     )
-    optimized_cover_letter_instance = await sync_to_async(
-        OptimizedCoverLetterContent.objects.get
-    )(cover_letter=cover_letter_instance)
     job_post_instance = await sync_to_async(JobPost.objects.get)(
         job_post_id=job_post_id
     )
+    optimized_cover_letter_instance = await sync_to_async(
+        OptimizedCoverLetterContent.objects.get
+    )(cover_letter=cover_letter_instance, job_post=job_post_instance)
 
     optimized_content = optimized_cover_letter_instance.optimized_content
+    await aset_stage("improve")
     customized_content = await customize_doc(
         doc_type="cover letter",
         doc_content=optimized_content,
         custom_instruction=custom_instruction,
     )
 
-    pdf = await generate_formatted_pdf(
+    await aset_stage("render")
+    pdf = await agenerate_formatted_pdf(
         customized_content,
         filename="Customized Optimized Cover Letter.pdf",
         doc_type="CL",
@@ -280,29 +301,32 @@ async def customize_opt_cl(applicant_id, job_post_id, custom_instruction):
     s3_key = f"media/cover_letters/optimized/{uuid4()}.pdf"
 
     # Upload the PDF directly to S3
-    upload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
+    await aset_stage("upload")
+    await aupload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
 
+    await aset_stage("persist")
     optimized_content_instance, created = await sync_to_async(
         OptimizedCoverLetterContent.objects.update_or_create, thread_sensitive=True
     )(
         cover_letter=cover_letter_instance,
+        job_post=job_post_instance,
         defaults={
             "optimized_content": customized_content,
             "optimized_pdf_s3_key": s3_key,
             "is_tailored": True,
-            "job_post": job_post_instance,
         },
     )
     # Construct the URL to the PDF stored in S3
-    pdf_url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
+    pdf_url = get_full_url(s3_key)
     return pdf_url
 
 
 @shared_task
+@tracked_task
 def customize_optimized_cover_letter(applicant_id, job_post_id, custom_instruction):
     start_time = time.time()
 
-    sync_optimize = async_to_sync(cl_optimize_func)
+    sync_optimize = async_to_sync(customize_opt_cl)
     url = sync_optimize(applicant_id, job_post_id, custom_instruction)
 
     total = time.time() - start_time
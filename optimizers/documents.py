@@ -0,0 +1,112 @@
+# Applicant documents (resume and cover letter PDFs) parsed once per version of the file:
+# text and sections are kept in ParsedDocument, keyed by URL plus ETag or content hash.
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import defaultdict
+
+import httpx
+from langchain_community.document_loaders import UnstructuredPDFLoader
+
+from chatbackend.configs.logging_config import configure_logger
+from optimizers.models import ParsedDocument
+
+logger = configure_logger(__name__)
+
+DOWNLOAD_TIMEOUT = 30  # seconds
+
+# Resume headings per section, keys as in the resume dicts the optimizers produce
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective", "career objective", "about me"),
+    "experiences": ("experience", "experiences", "work experience", "professional experience", "employment history", "work history", "clinical experience"),
+    "education": ("education", "education and training", "academic background", "academic qualifications"),
+    "skills": ("skills", "key skills", "core competencies", "technical skills", "competencies"),
+    "certifications": ("certifications", "certificates", "licenses", "licences", "licenses and certifications", "certifications and licenses", "licensure"),
+    "projects": ("projects",),
+    "references": ("references",),
+}
+HEADING_SECTIONS = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+HEADING_PATTERN = re.compile(r"[^a-z ]+")
+
+# One parse per document at a time in this process; others wait and read the stored result.
+# url -> [lock, callers holding or waiting for it], dropped when the last caller is done
+_parse_locks = {}
+_parse_locks_lock = threading.Lock()
+
+
+def extract_sections(text):
+    """
+    Splits document text on known resume headings (a line of its own, any case, optional colon).
+    Text before the first heading (name and contact details) goes to "contact".
+
+    :return: Dict of section name to text, in document order.
+    """
+    sections = defaultdict(list)
+    current = "contact"
+    for line in text.splitlines():
+        heading = HEADING_PATTERN.sub("", line.lower()).strip()
+        if heading in HEADING_SECTIONS and len(line) < 60:
+            current = HEADING_SECTIONS[heading]
+            continue
+        sections[current].append(line)
+    return {name: "\n".join(lines).strip() for name, lines in sections.items() if "".join(lines).strip()}
+
+
+def parse_pdf(data):
+    # Same parser (and OCR fallback) as OnlinePDFLoader, on bytes already downloaded
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
+        temp_file.write(data)
+    try:
+        documents = UnstructuredPDFLoader(temp_file.name).load()
+    finally:
+        os.unlink(temp_file.name)
+    return "\n\n".join(document.page_content for document in documents)
+
+
+def get_parsed_document(url):
+    """
+    Returns the ParsedDocument of the current version of the PDF at `url`, downloading and
+    parsing it only when no stored version matches its ETag (or, without one, its content hash).
+    """
+    with _parse_locks_lock:
+        entry = _parse_locks.setdefault(url, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            return _get_parsed_document(url)
+    finally:
+        with _parse_locks_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _parse_locks[url]
+
+
+def _get_parsed_document(url):
+    with httpx.Client(timeout=DOWNLOAD_TIMEOUT, follow_redirects=True) as client:
+        etag = client.head(url).headers.get("etag", "")
+        if etag:
+            document = ParsedDocument.objects.filter(url=url, etag=etag).first()
+            if document is not None:
+                return document
+
+        response = client.get(url)
+        response.raise_for_status()
+        content_hash = hashlib.sha256(response.content).hexdigest()
+
+        # The same file under another URL (e.g. uploaded again) is not parsed twice either
+        known = ParsedDocument.objects.filter(content_hash=content_hash).first()
+        if known is not None:
+            text, sections = known.text, known.sections
+        else:
+            logger.info(f"Parsing {url}")
+            text = parse_pdf(response.content)
+            sections = extract_sections(text)
+
+        document, _ = ParsedDocument.objects.update_or_create(
+            url=url,
+            content_hash=content_hash,
+            defaults={"etag": response.headers.get("etag", etag), "text": text, "sections": sections},
+        )
+        return document
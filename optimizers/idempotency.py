@@ -0,0 +1,96 @@
+# Identity of optimization requests: the same operation for the same applicant, job post and
+# custom instruction, starting from the same version of the content, gives the same result. A
+# repeated request (double click, reconnect) is answered by the task already run for it.
+import hashlib
+
+from asgiref.sync import sync_to_async
+
+from optimizers.mg_database import get_doc_url, get_job_version
+from optimizers.models import CoverLetter, OptimizedCoverLetterContent, OptimizedResumeContent, Resume
+from optimizers.samples import default_cover_letter, default_resume
+
+
+def content_hash(*contents):
+    return hashlib.sha256("\0".join(content or "" for content in contents).encode("utf-8")).hexdigest()
+
+
+def improved_resume(applicant_id):
+    return Resume.objects.filter(resume_id=applicant_id).values_list("general_improved_content", flat=True).first()
+
+
+def improved_cover_letter(applicant_id):
+    return (
+        CoverLetter.objects.filter(cover_letter_id=applicant_id)
+        .values_list("general_improved_content", flat=True)
+        .first()
+    )
+
+
+def optimized_resume(applicant_id, job_post_id):
+    return (
+        OptimizedResumeContent.objects.filter(
+            resume__resume_id=applicant_id, job_post__job_post_id=job_post_id
+        )
+        .values_list("optimized_content", flat=True)
+        .first()
+    )
+
+
+def optimized_cover_letter(applicant_id, job_post_id):
+    return (
+        OptimizedCoverLetterContent.objects.filter(
+            cover_letter__cover_letter_id=applicant_id, job_post__job_post_id=job_post_id
+        )
+        .values_list("optimized_content", flat=True)
+        .first()
+    )
+
+
+# Content each operation starts from, by (applicant_id, job_post_id)
+SOURCE_CONTENTS = {
+    # A new upload of the resume gets a new URL
+    "improve_resume": lambda applicant_id, job_post_id: (get_doc_url(applicant_id, "R"), default_resume),
+    # Improved from the sample until the applicant cover letter is read from the database
+    "improve_cover_letter": lambda applicant_id, job_post_id: (default_cover_letter,),
+    "get_default_cover_letter": lambda applicant_id, job_post_id: (get_doc_url(applicant_id, "R"),),
+    "customize_improved_resume": lambda applicant_id, job_post_id: (improved_resume(applicant_id),),
+    "customize_improved_cover_letter": lambda applicant_id, job_post_id: (improved_cover_letter(applicant_id),),
+    "optimize_resume": lambda applicant_id, job_post_id: (
+        improved_resume(applicant_id),
+        # The job as posted: its optimized version is what the task itself produces
+        get_job_version(job_post_id),
+    ),
+    "optimize_cover_letter": lambda applicant_id, job_post_id: (
+        improved_cover_letter(applicant_id),
+        get_job_version(job_post_id),
+    ),
+    "customize_optimized_resume": lambda applicant_id, job_post_id: (optimized_resume(applicant_id, job_post_id),),
+    "customize_optimized_cover_letter": lambda applicant_id, job_post_id: (
+        optimized_cover_letter(applicant_id, job_post_id),
+    ),
+}
+
+
+def request_key(operation, applicant_id, job_post_id=None, custom_instruction=None):
+    """
+    Key of an optimization request: operation, applicant, job post, hash of the custom
+    instruction and hash of the content the operation starts from.
+
+    :return: The key, or None for operations that are not deduplicated.
+    """
+    source_contents = SOURCE_CONTENTS.get(operation)
+    if source_contents is None:
+        return None
+    return content_hash(
+        operation,
+        applicant_id,
+        job_post_id,
+        content_hash(custom_instruction),
+        content_hash(*source_contents(applicant_id, job_post_id)),
+    )
+
+
+async def arequest_key(operation, applicant_id, job_post_id=None, custom_instruction=None):
+    return await sync_to_async(request_key, thread_sensitive=True)(
+        operation, applicant_id, job_post_id, custom_instruction
+    )
@@ -1,10 +1,14 @@
+import asyncio
 import time
+from datetime import datetime, timedelta
+from uuid import uuid4
 
 from asgiref.sync import async_to_sync, sync_to_async
 from celery import shared_task
+from django.core.cache import cache
 
 from chatbackend.configs.logging_config import configure_logger
-from optimizers.mg_database import get_job_post_content
+from optimizers.mg_database import db, get_job_post_content, get_job_version
 from optimizers.models import JobPost
 from optimizers.utils import get_job_post_feedback, improve_doc
 
@@ -14,11 +18,59 @@ logger = configure_logger(__name__)
 SYSTEM_ROLE = "system"
 USER_ROLE = "user"
 
+# The owner refreshes its lock while the optimization runs, so only the lock of a worker
+# that died expires
+JOB_POST_LOCK_TIMEOUT = 60  # seconds
+JOB_POST_LOCK_REFRESH_INTERVAL = 20  # seconds
+JOB_POST_POLL_INTERVAL = 1  # seconds between checks of a waiter
+# Seconds a waiter waits for the owner of the lock: longer than the slowest optimization,
+# LLM retries included
+JOB_POST_WAIT_TIMEOUT = 15 * 60
+# A failed optimization is not retried for this long: callers in the meantime get its error
+JOB_POST_FAILURE_TTL = 10 * 60  # seconds
+# Jobs created this recently are optimized ahead of the first applicant tailoring to them
+JOB_POST_PRECOMPUTE_WINDOW = timedelta(days=1)
+
+
+class JobPostOptimizationError(Exception):
+    pass
+
+
+def lock_key(job_post_id):
+    return f"job_post_optimization:{job_post_id}"
+
+
+def failure_key(job_post_id):
+    return f"job_post_optimization_failed:{job_post_id}"
+
+
+async def keep_lock(job_post_id, token):
+    key = lock_key(job_post_id)
+    while True:
+        await asyncio.sleep(JOB_POST_LOCK_REFRESH_INTERVAL)
+        if await cache.aget(key) != token:
+            return
+        await cache.atouch(key, JOB_POST_LOCK_TIMEOUT)
+
+
+async def release_lock(job_post_id, token):
+    # Only while it is still ours: a lock that expired may have been taken over since
+    key = lock_key(job_post_id)
+    if await cache.aget(key) == token:
+        await cache.adelete(key)
+
 
 # Wrap the entire asynchronous logic in a function to be called synchronously
-async def optimize_job(job_post_id):
-    # Use sync_to_async for database operations that are originally synchronous
-    job_post_content = await get_job_post_content(job_post_id)
+async def optimize_job(job_post_id, job_post_content=None, job_version=None):
+    """
+    :param job_post_content: Job text already fetched (e.g. by a batch run); read from Mongo otherwise.
+    :param job_version: Version of the job the text was read at (see get_job_version), read
+        before the text so an edit in between is optimized again rather than missed.
+    """
+    if job_post_content is None:
+        job_post_content = await get_job_post_content(job_post_id)
+    if job_post_content is None:
+        raise JobPostOptimizationError(f"Job post {job_post_id} could not be read")
     job_post_feedback = await get_job_post_feedback(job_post_content)
 
     optimized_content = await improve_doc(
@@ -32,20 +84,126 @@ async def optimize_job(job_post_id):
         defaults={
             "original_content": job_post_content,
             "optimized_content": optimized_content,
+            "job_version": job_version or "",
         },
     )
     return job_post_instance.optimized_content
 
 
+def optimized_job_posts():
+    return JobPost.objects.exclude(optimized_content__isnull=True).exclude(optimized_content="")
+
+
+def get_optimized_job_post_instance(job_post_id, job_version=None):
+    # Optimized from the current version of the job; any version when it is unknown
+    job_posts = optimized_job_posts().filter(job_post_id=job_post_id)
+    if job_version:
+        job_posts = job_posts.filter(job_version=job_version)
+    return job_posts.first()
+
+
+async def get_optimized_job_post(job_post_id, job_post_content=None, job_version=None):
+    """
+    Returns the JobPost with its optimized content, optimizing the job post if needed
+    (from `job_post_content` when the caller already fetched it). A job post optimized from an
+    earlier version of the job is optimized again.
+
+    Single-flight across workers: the caller that adds the lock key to the shared cache runs
+    the optimization, every concurrent caller for the same job post waits for it (at most
+    JOB_POST_WAIT_TIMEOUT seconds) and gets the stored result. A failure is remembered for
+    JOB_POST_FAILURE_TTL seconds: the waiters and later callers raise it rather than run the
+    optimization again. The lock holds a token of its owner, which refreshes it while it runs,
+    so a waiter only takes the lock over from an owner that died.
+
+    :param job_version: Current version of the job, when the caller already read it.
+    :raise JobPostOptimizationError: The optimization failed or the wait timed out.
+    """
+    if job_version is None:
+        job_version = await sync_to_async(get_job_version, thread_sensitive=False)(job_post_id)
+    deadline = time.monotonic() + JOB_POST_WAIT_TIMEOUT
+    while True:
+        job_post_instance = await sync_to_async(get_optimized_job_post_instance, thread_sensitive=True)(
+            job_post_id, job_version
+        )
+        if job_post_instance is not None:
+            return job_post_instance
+
+        error = await cache.aget(failure_key(job_post_id))
+        if error is not None:
+            raise JobPostOptimizationError(f"Optimization of job post {job_post_id} failed recently: {error}")
+
+        token = str(uuid4())
+        if await cache.aadd(lock_key(job_post_id), token, JOB_POST_LOCK_TIMEOUT):
+            refresh = asyncio.create_task(keep_lock(job_post_id, token))
+            try:
+                # The previous owner may have finished between the check and the lock
+                job_post_instance = await sync_to_async(get_optimized_job_post_instance, thread_sensitive=True)(
+                    job_post_id, job_version
+                )
+                if job_post_instance is not None:
+                    return job_post_instance
+
+                logger.info(f"JobPost {job_post_id} not optimized. Starting optimization.")
+                try:
+                    await optimize_job(job_post_id, job_post_content, job_version)
+                except Exception as e:
+                    await cache.aset(failure_key(job_post_id), str(e) or type(e).__name__, JOB_POST_FAILURE_TTL)
+                    raise
+                return await sync_to_async(JobPost.objects.get, thread_sensitive=True)(job_post_id=job_post_id)
+            finally:
+                refresh.cancel()
+                await release_lock(job_post_id, token)
+
+        if time.monotonic() >= deadline:
+            raise JobPostOptimizationError(
+                f"Timed out after {JOB_POST_WAIT_TIMEOUT} seconds waiting for the optimization of job post {job_post_id}"
+            )
+        logger.info(f"JobPost {job_post_id} is being optimized by another worker. Waiting for it.")
+        await asyncio.sleep(JOB_POST_POLL_INTERVAL)
+
+
 @shared_task
 def optimize_job_post(job_post_id):
     start_time = time.time()
 
-    # Correctly pass job_post_id to the async function
-    optimized_content = async_to_sync(optimize_job)(job_post_id)
+    job_post_instance = async_to_sync(get_optimized_job_post)(job_post_id)
     total_time = time.time() - start_time
     logger.info(
         f"Total time taken: {total_time} seconds for job post ID {job_post_id}."
     )
 
-    return optimized_content
+    return job_post_instance.optimized_content
+
+
+@shared_task
+def precompute_job_posts():
+    """
+    Queues the optimization of recently published jobs not optimized yet, so applicants
+    tailoring to a new job find its optimized post ready.
+    """
+    since = datetime.utcnow() - JOB_POST_PRECOMPUTE_WINDOW
+    job_versions = {
+        str(job["_id"]): job["updatedAt"].isoformat() if job.get("updatedAt") else ""
+        for job in db.jobs.find({"createdAt": {"$gte": since}}, {"_id": 1, "updatedAt": 1})
+    }
+    job_ids = list(job_versions)
+    # Optimized from the current version of the job
+    optimized_ids = {
+        job_post_id
+        for job_post_id, job_version in optimized_job_posts()
+        .filter(job_post_id__in=job_ids)
+        .values_list("job_post_id", "job_version")
+        if not job_versions[job_post_id] or job_version == job_versions[job_post_id]
+    }
+
+    # Jobs being optimized already, or whose optimization failed recently, are left alone
+    # rather than queued to wait on (or repeat) it
+    busy = cache.get_many([key for job_id in job_ids for key in (lock_key(job_id), failure_key(job_id))])
+    pending_ids = [
+        job_id for job_id in job_ids
+        if job_id not in optimized_ids and lock_key(job_id) not in busy and failure_key(job_id) not in busy
+    ]
+    for job_id in pending_ids:
+        optimize_job_post.delay(job_id)
+    logger.info(f"Queued the optimization of {len(pending_ids)} new job posts")
+    return pending_ids
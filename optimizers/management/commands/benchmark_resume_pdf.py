@@ -0,0 +1,51 @@
+import copy
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from optimizers.pdf_gen import get_resume_template, render_cache
+from optimizers.samples import improved_resume_dict
+
+
+class Command(BaseCommand):
+    help = "Measures resume PDF throughput with a cold render cache (the previous rebuild-everything behaviour) and a warm one"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--renders", type=int, default=200, help="PDFs rendered per scenario")
+
+    def run(self, label, renders, resume_for, clear_cache):
+        template = get_resume_template()
+        template.render(resume_for(0))  # Warm up (imports, font resolution)
+
+        latencies = []
+        for i in range(renders):
+            resume = resume_for(i)
+            if clear_cache:
+                render_cache.clear()
+            start_time = time.perf_counter()
+            template.render(resume)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+
+        latencies.sort()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{label}: {1000 * len(latencies) / sum(latencies):.1f} PDFs/sec, "
+                f"mean {statistics.mean(latencies):.2f} ms, "
+                f"p50 {latencies[len(latencies) // 2]:.2f} ms, "
+                f"p95 {latencies[max(int(len(latencies) * 0.95) - 1, 0)]:.2f} ms"
+            )
+        )
+
+    def handle(self, *args, **options):
+        renders = options["renders"]
+
+        def tailored(i):
+            # A resume tailored to another job post: new summary, every other section unchanged
+            resume = copy.deepcopy(improved_resume_dict)
+            resume["summary"] = f"{resume['summary']} ({i})"
+            return resume
+
+        self.run("rebuild (cold cache)", renders, lambda i: improved_resume_dict, clear_cache=True)
+        self.run("same resume (warm cache)", renders, lambda i: improved_resume_dict, clear_cache=False)
+        self.run("tailored summary (warm cache)", renders, tailored, clear_cache=False)
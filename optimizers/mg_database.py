@@ -1,14 +1,14 @@
 import os
-import tempfile
 
 import pymongo
+from asgiref.sync import sync_to_async
 from bs4 import BeautifulSoup
 from bson import ObjectId
 from django.conf import settings
-from langchain_community.document_loaders import OnlinePDFLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from django.core.cache import cache
 
 from chatbackend.configs.logging_config import configure_logger
+from optimizers.documents import get_parsed_document
 
 # Append TESSERACT_PATH to the system PATH, if it's set
 if "TESSERACT_PATH" in os.environ:
@@ -56,90 +56,148 @@ db = client[settings.MONGO_DB_NAME]
 # print(relationships)
 
 
+def get_doc_url(owner_id, doc_type):
+    applicant = db.applications.find_one(
+        {
+            "_id": ObjectId(owner_id),
+            # "owner": ObjectId(owner_id)
+        },
+        {"coverLetterDocument": 1, "resumeDocument": 1},
+    )
+    if applicant is None:
+        return None
+    if doc_type == "CL":
+        return applicant.get("coverLetterDocument")
+    elif doc_type == "R":
+        return applicant.get("resumeDocument")
+
+
+async def get_parsed_doc(owner_id, doc_type=None):
+    """
+    Returns the ParsedDocument of an applicant's resume (doc_type "R") or cover letter ("CL").
+    The PDF is parsed once per version; every later call reads the stored text and sections.
+    """
+    public_url = await sync_to_async(get_doc_url, thread_sensitive=False)(owner_id, doc_type)
+    if not public_url:
+        return None
+    return await sync_to_async(get_parsed_document, thread_sensitive=False)(public_url)
+
+
 async def get_doc_content(owner_id, doc_type=None):
     try:
-        applicant = db.applications.find_one(
-            {
-                "_id": ObjectId(owner_id),
-                # "owner": ObjectId(owner_id)
-            }
-        )
-        if doc_type == "CL":
-            public_url = applicant["coverLetterDocument"] if applicant else None
-        elif doc_type == "R":
-            public_url = applicant["resumeDocument"] if applicant else None
-
-        # Load PDF data
-        loader = OnlinePDFLoader(public_url)
-        data = loader.load()
-
-        # Split the text for analysis
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-        texts = text_splitter.split_documents(data)
-
-        doc_list = [t.page_content for t in texts]
-        doc_content = "   ".join(doc_list)
-
-        return doc_content
+        document = await get_parsed_doc(owner_id, doc_type)
+        return document.text if document else None
     except pymongo.errors.PyMongoError as e:
         logger.error(f"MongoDB error: {e}")
     except Exception as e:
         logger.error(f"An error occurred: {e}")
 
 
-async def get_job_post_content(job_id):
+async def get_doc_text_and_sections(owner_id, doc_type=None):
+    """
+    :return: (text, sections) of the stored parse of the document, or (None, None).
+    """
     try:
-        job = db.jobs.find_one(
-            {
-                "_id": ObjectId(job_id),
-                # "owner_id": ObjectId(owner_id)
-            }
-        )
+        document = await get_parsed_doc(owner_id, doc_type)
+        if document is not None:
+            return document.text, document.sections
+    except pymongo.errors.PyMongoError as e:
+        logger.error(f"MongoDB error: {e}")
+    except Exception as e:
+        logger.error(f"An error occurred: {e}")
+    return None, None
+
+
+JOB_FIELDS = {"title": 1, "location": 1, "jobType": 1, "overview": 1, "updatedAt": 1}
+JOB_TEXT_CACHE_TTL = 7 * 24 * 60 * 60  # seconds; an edit of the job changes updatedAt, hence the key
+
+
+def build_job_text(job):
+    """
+    Renders a Mongo job into the text the optimizers work on. The HTML overview is converted
+    once per version of the job: the text is cached under its _id and updatedAt.
+    """
+    updated_at = job.get("updatedAt")
+    cache_key = f"job_text:{job['_id']}:{updated_at.timestamp() if updated_at else ''}"
+    if updated_at is not None:
+        job_text = cache.get(cache_key)
+        if job_text is not None:
+            return job_text
+
+    description_html = job.get("overview")
+    description = (
+        BeautifulSoup(description_html, "html.parser").get_text()
+        if description_html
+        else None
+    )
+    job_text = (
+        f"Title: {job.get('title')}\n"
+        f"Location: {job.get('location')}\n"
+        f"Job Type: {job.get('jobType')}\n"
+        f"Description: {description}\n"
+    )
+
+    if updated_at is not None:
+        cache.set(cache_key, job_text, JOB_TEXT_CACHE_TTL)
+    return job_text
+
+
+def find_jobs(job_ids):
+    # One query for all jobs, only the fields the job text is built from
+    return list(db.jobs.find({"_id": {"$in": [ObjectId(job_id) for job_id in job_ids]}}, JOB_FIELDS))
+
+
+def get_job_versions(job_ids):
+    """
+    Returns the version of each job: its updatedAt, which an edit of the job changes. Jobs
+    that are unknown, or whose version could not be read, are left out.
+    """
+    object_ids = [ObjectId(job_id) for job_id in job_ids if ObjectId.is_valid(job_id)]
+    if not object_ids:
+        return {}
+    try:
+        jobs = db.jobs.find({"_id": {"$in": object_ids}}, {"updatedAt": 1})
+        return {str(job["_id"]): job["updatedAt"].isoformat() for job in jobs if job.get("updatedAt")}
+    except pymongo.errors.PyMongoError as e:
+        logger.error(f"MongoDB error: {e}")
+        return {}
 
-        # Create a temporary file and get its path
-        temp_file_path = create_temporary_job_file(job)
 
-        # Load PDF data
-        loader = TextLoader(temp_file_path)
-        data = loader.load()
+def get_job_version(job_id):
+    return get_job_versions([job_id]).get(job_id)
 
-        os.unlink(temp_file_path)
 
-        # Split the text for analysis
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-        texts = text_splitter.split_documents(data)
+def get_job_texts(job_ids):
+    # Blocking (Mongo, cache, HTML parsing); async callers run it in a thread
+    return {str(job["_id"]): build_job_text(job) for job in find_jobs(job_ids)}
 
-        doc_list = [t.page_content for t in texts]
-        doc_content = "   ".join(doc_list)
 
-        return doc_content
+async def get_job_post_content(job_id):
+    try:
+        job_texts = await sync_to_async(get_job_texts, thread_sensitive=False)([job_id])
+        if job_id not in job_texts:
+            logger.error(f"Job {job_id} not found")
+            return None
+        return job_texts[job_id]
     except pymongo.errors.PyMongoError as e:
         logger.error(f"MongoDB error: {e}")
     except Exception as e:
         logger.error(f"An error occurred: {e}")
 
 
-# Function to create a temporary file with job details
-def create_temporary_job_file(job_data):
-    with tempfile.NamedTemporaryFile(mode="w+t", delete=False) as temp_file:
-        title = job_data["title"] if job_data else None
-        location = job_data["location"] if job_data else None
-        job_type = job_data["jobType"] if job_data else None
-        description_html = job_data["overview"] if job_data else None
-        description = (
-            BeautifulSoup(description_html, "html.parser").get_text()
-            if description_html
-            else None
-        )
-
-        # Write the data to the temp file
-        temp_file.write(f"Title: {title}\n")
-        temp_file.write(f"Location: {location}\n")
-        temp_file.write(f"Job Type: {job_type}\n")
-        temp_file.write(f"Description: {description}\n")
-
-        # Return the name of the temp file
-        return temp_file.name
+async def get_job_posts_content(job_ids):
+    """
+    Bulk variant of get_job_post_content for batch runs: fetches every job in one query.
+
+    :return: Dict of job ID to job text; jobs not found are left out.
+    """
+    try:
+        return await sync_to_async(get_job_texts, thread_sensitive=False)(job_ids)
+    except pymongo.errors.PyMongoError as e:
+        logger.error(f"MongoDB error: {e}")
+    except Exception as e:
+        logger.error(f"An error occurred: {e}")
+    return {}
 
 
 def run_test():
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizers', '0006_remove_coverletter_general_improved_pdf_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParsedDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=1024)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('text', models.TextField()),
+                ('sections', models.JSONField(default=dict)),
+                ('parsed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['url', 'etag'], name='optimizers__url_28b99c_idx')],
+                'unique_together': {('url', 'content_hash')},
+            },
+        ),
+    ]
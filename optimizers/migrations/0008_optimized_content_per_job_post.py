@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:17
+
+from django.db import migrations
+
+
+def delete_duplicate_contents(apps, schema_editor):
+    # Keep the latest row of each document and job post
+    for model_name, document_field in (
+        ("OptimizedResumeContent", "resume_id"),
+        ("OptimizedCoverLetterContent", "cover_letter_id"),
+    ):
+        model = apps.get_model("optimizers", model_name)
+        seen = set()
+        for row in model.objects.exclude(job_post=None).order_by("-optimized_at", "-id"):
+            key = (getattr(row, document_field), row.job_post_id)
+            if key in seen:
+                row.delete()
+            else:
+                seen.add(key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizers', '0007_parseddocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_contents, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='optimizedcoverlettercontent',
+            unique_together={('cover_letter', 'job_post')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='optimizedresumecontent',
+            unique_together={('resume', 'job_post')},
+        ),
+    ]
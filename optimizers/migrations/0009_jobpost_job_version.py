@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizers', '0008_optimized_content_per_job_post'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobpost',
+            name='job_version',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -30,6 +30,8 @@ class JobPost(models.Model):
     )  # ID from the Recruiting Platform
     original_content = models.TextField(null=True, blank=True)
     optimized_content = models.TextField(null=True, blank=True)
+    # updatedAt of the job on the Recruiting Platform the content was optimized from
+    job_version = models.CharField(max_length=64, blank=True)
     posted_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -108,6 +110,10 @@ class OptimizedCoverLetterContent(models.Model):
     )
     optimized_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # One tailored cover letter per job post
+        unique_together = ("cover_letter", "job_post")
+
     def __str__(self):
         tailored_str = "Tailored" if self.is_tailored else "General Improved"
         return f"{tailored_str} Content for Cover Letter ID {self.cover_letter.cover_letter_id}"
@@ -184,6 +190,10 @@ class OptimizedResumeContent(models.Model):
     )
     optimized_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # One tailored resume per job post
+        unique_together = ("resume", "job_post")
+
     def __str__(self):
         tailored_str = "Tailored" if self.is_tailored else "General Improved"
         return f"{tailored_str} Content for Resume ID {self.resume.resume_id}"  # Fixed reference to cover letter
@@ -192,3 +202,20 @@ class OptimizedResumeContent(models.Model):
         s3_key = f"resumes/optimized/{uuid4()}.pdf"
         upload_directly_to_s3(file, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
         self.optimized_pdf_s3_key = s3_key
+
+
+class ParsedDocument(models.Model):
+    # Text of an applicant document (resume or cover letter PDF), parsed once per version of the file
+    url = models.URLField(max_length=1024)
+    etag = models.CharField(max_length=255, blank=True)
+    content_hash = models.CharField(max_length=64, db_index=True)  # SHA-256 of the PDF bytes
+    text = models.TextField()
+    sections = models.JSONField(default=dict)
+    parsed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("url", "content_hash")
+        indexes = [models.Index(fields=["url", "etag"])]
+
+    def __str__(self):
+        return f"Parsed document {self.url}"
@@ -1,11 +1,17 @@
+import hashlib
+import threading
 import time
+from collections import OrderedDict
+from functools import lru_cache
 from io import BytesIO
 
+from django.conf import settings
 from django.core.files.base import ContentFile
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_JUSTIFY, TA_LEFT, TA_RIGHT
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
@@ -47,6 +53,71 @@ class HRFlowable(Flowable):
         self.canv.line(0, 0, self.width, 0)
 
 
+class RenderCache:
+    """
+    Per-thread LRU of parsed paragraph markup and line breaks, keyed by a hash of the paragraph
+    text and style. Per thread because flowables built from an entry are laid out in place.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def entries(self):
+        if not hasattr(self._local, "entries"):
+            self._local.entries = OrderedDict()
+        return self._local.entries
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        if len(self.entries) > settings.RESUME_RENDER_CACHE_SIZE:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+render_cache = RenderCache()
+
+
+class CachedParagraph(Paragraph):
+    """
+    Paragraph served from the render cache: text repeated across renders (contact details,
+    education, unchanged bullets, ...) is neither parsed nor measured again. Every render
+    still gets fresh flowables, since platypus consumes them while building.
+    """
+
+    def __init__(self, text, style, **kwargs):
+        if kwargs.get("frags") is not None:
+            # The parts of a paragraph split across pages, built from its already parsed frags
+            super().__init__(text, style, **kwargs)
+            self._line_breaks = {}
+            return
+
+        key = hashlib.sha256(f"{style.name}\0{text}".encode("utf-8")).hexdigest()
+        entry = render_cache.get(key)
+        if entry is None:
+            super().__init__(text, style, **kwargs)
+            self._line_breaks = {}
+            render_cache.put(key, (self.style, self.frags, self.bulletText, self._line_breaks))
+            return
+
+        style, frags, bullet_text, self._line_breaks = entry
+        super().__init__(text, style, bulletText=bullet_text, frags=frags)
+
+    def breakLines(self, width):
+        key = tuple(width) if isinstance(width, (list, tuple)) else width
+        if key not in self._line_breaks:
+            self._line_breaks[key] = super().breakLines(width)
+        return self._line_breaks[key]
+
+
 # Base style for common properties
 base_paragraph_style = ParagraphStyle(
     "BaseParagraph",
@@ -160,39 +231,38 @@ doc_style_l = ParagraphStyle(
 
 # Function to create and style a header with an HRFlowable and Spacer
 def add_header_with_line(doc=None, story=None, header_text=None, style=header_style):
-    story.append(Paragraph(header_text, style))
+    story.append(CachedParagraph(header_text, style))
     story.append(HRFlowable(width=doc.width))
     story.append(Spacer(1, 6))
 
 
+company_table_style = TableStyle(
+    [
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("ALIGN", (0, 0), (0, -1), "LEFT"),
+        ("ALIGN", (1, 0), (1, -1), "RIGHT"),
+        ("TOPPADDING", (0, 0), (-1, -1), 0),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+    ]
+)
+
+
 # Function to create a table for company details and job description
 def create_company_table(data, col_widths):
-    return Table(
-        data,
-        colWidths=col_widths,
-        style=TableStyle(
-            [
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                ("ALIGN", (0, 0), (0, -1), "LEFT"),
-                ("ALIGN", (1, 0), (1, -1), "RIGHT"),
-                ("TOPPADDING", (0, 0), (-1, -1), 0),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
-            ]
-        ),
-    )
+    return Table(data, colWidths=col_widths, style=company_table_style)
 
 
 # Function to create a styled Paragraph with an optional hyperlink
 def create_styled_paragraph(text, style, hyperlink=None):
     if hyperlink:
         text = f'<link href="{hyperlink}" color="blue">{text}</link>'
-    return Paragraph(text, style)
+    return CachedParagraph(text, style)
 
 
 # Function to create a list of bullet points
 def create_bullet_list(items, bullet_style):
     return ListFlowable(
-        [ListItem(Paragraph(item, bullet_style)) for item in items],
+        [ListItem(CachedParagraph(item, bullet_style)) for item in items],
         bulletType="bullet",
         start="•",
         leftIndent=bullet_style.leftIndent,
@@ -210,16 +280,16 @@ def add_contact_info(story, contact_dict):
     middle_contact_details = f"{email_text} | {phone_text} | {address_text}"
 
     # Append the name with a special style
-    story.append(Paragraph(name_text, name_style))
+    story.append(CachedParagraph(name_text, name_style))
 
     # Append the address
-    story.append(Paragraph(middle_contact_details, contact_details_style))
+    story.append(CachedParagraph(middle_contact_details, contact_details_style))
 
     # Append the LinkedIn URL
     if "linkedIn" in contact_dict:
         # Use Paragraph to allow link styling
         linkedin = f'<link href="{linkedIn_url}" color="blue">{linkedIn_url}</link>'
-        story.append(Paragraph(linkedin, linkedin_style))
+        story.append(CachedParagraph(linkedin, linkedin_style))
 
 
 # Function to add contact information
@@ -227,7 +297,7 @@ def add_summary(doc=None, story=None, summary_text=None):
     add_header_with_line(doc=doc, story=story, header_text="SUMMARY")
 
     # Append the name with a special style
-    story.append(Paragraph(summary_text, summary_style))
+    story.append(CachedParagraph(summary_text, summary_style))
 
 
 # Function to add experiences
@@ -242,10 +312,10 @@ def add_experiences(doc, story, exp_dict):
         location_text = exp_value.get("location", "")
         job_description_list = exp_value.get("job_description", "")
 
-        company_name = Paragraph(company_name_text, company_name_style)
-        duration = Paragraph(start_date_text + " – " + end_date_text, duration_style)
-        job_role = Paragraph(job_role_text, job_role_style)
-        location = Paragraph(location_text, location_style)
+        company_name = CachedParagraph(company_name_text, company_name_style)
+        duration = CachedParagraph(start_date_text + " – " + end_date_text, duration_style)
+        job_role = CachedParagraph(job_role_text, job_role_style)
+        location = CachedParagraph(location_text, location_style)
 
         # Add a company table
         company_table_data = [[company_name, duration], [job_role, location]]
@@ -271,10 +341,10 @@ def add_education(doc, story, edu_list):
         location_text = edu.get("location", "")
         end_date_text = edu.get("end_date", "")
 
-        degree = Paragraph(degree_text, education_style_l)
-        institution = Paragraph(institution_text, education_style_l)
-        location = Paragraph(location_text, education_style_r)
-        end_date = Paragraph(end_date_text, education_style_r)
+        degree = CachedParagraph(degree_text, education_style_l)
+        institution = CachedParagraph(institution_text, education_style_l)
+        location = CachedParagraph(location_text, education_style_r)
+        end_date = CachedParagraph(end_date_text, education_style_r)
 
         # Add a education table
         education_table_data = [[institution, end_date], [degree, location]]
@@ -290,7 +360,7 @@ def add_skills(doc=None, story=None, skill_list=None):
     add_header_with_line(doc=doc, story=story, header_text="SKILLS")
 
     skills_string = ", ".join(skill_list)
-    story.append(Paragraph(skills_string, summary_style))
+    story.append(CachedParagraph(skills_string, summary_style))
 
 
 # Function to add certifications
@@ -305,10 +375,10 @@ def add_certifications(doc=None, story=None, cert_list=None):
         issuing_organization_text = cert.get("issuing_organization", "")
         date_obtained_text = cert.get("date_obtained", "")
 
-        certification_title = Paragraph(
+        certification_title = CachedParagraph(
             f"{title_text} - {issuing_organization_text}", doc_style_l
         )
-        date = Paragraph(f"{date_obtained_text}", doc_style_r)
+        date = CachedParagraph(f"{date_obtained_text}", doc_style_r)
 
         # Add a education table
         certification_table_data = [[certification_title, date]]
@@ -326,42 +396,69 @@ def add_certifications(doc=None, story=None, cert_list=None):
 #         story.append(Paragraph(proj["description"], job_desc_style))
 
 
-def generate_resume_pdf(improved_resume_dict, filename):
-    start_time = time.time()
+# Sections in document order, each added by a function of (doc, story, content)
+RESUME_SECTIONS = (
+    ("contact", lambda doc, story, contact_dict: add_contact_info(story, contact_dict)),
+    ("summary", add_summary),
+    ("experiences", add_experiences),
+    ("education", add_education),
+    ("skills", add_skills),
+    ("certifications", add_certifications),
+)
 
-    # Define the buffer for the PDF
-    pdf_buffer = BytesIO()
 
-    # Create a PDF document
-    doc = SimpleDocTemplate(pdf_buffer, pagesize=letter, topMargin=36)
-    story = []
+class ResumeTemplate:
+    """
+    Resume layout compiled once per process (see get_resume_template): the page geometry, the
+    frame width sections are laid out against and the fonts of the styles, resolved up front.
+    Paragraphs of the sections are served from the render cache.
+    """
 
-    # Add sections to the document
-    add_contact_info(story, improved_resume_dict.get("contact", ""))
-    story.append(Spacer(1, 8))  # Add some space before the next section
-    add_summary(
-        doc=doc,
-        story=story,
-        summary_text=improved_resume_dict.get("summary", ""),
-    )
-    story.append(Spacer(1, 8))
-    add_experiences(doc, story, improved_resume_dict.get("experiences", ""))
-    story.append(Spacer(1, 8))
-    add_education(doc, story, improved_resume_dict.get("education", ""))
-    story.append(Spacer(1, 8))
-    add_skills(doc, story, improved_resume_dict.get("skills", ""))
-    story.append(Spacer(1, 8))
-    add_certifications(doc, story, improved_resume_dict.get("certifications", ""))
-    # Optionally add projects if required
-    # story.append(Spacer(1, 8))
-    # add_projects(story, improved_resume_dict["projects"])
-
-    # Build the PDF
-    doc.build(story)
-
-    # Get the PDF data
-    pdf_value = pdf_buffer.getvalue()
-    pdf_buffer.close()
+    def __init__(self, pagesize=letter, top_margin=36):
+        self.pagesize = pagesize
+        self.top_margin = top_margin
+        # Frame width of SimpleDocTemplate with its default one-inch side margins
+        self.width = pagesize[0] - 2 * inch
+
+        styles = [value for value in globals().values() if isinstance(value, ParagraphStyle)]
+        for font_name in {style.fontName for style in styles} | {style.bulletFontName for style in styles}:
+            pdfmetrics.getFont(font_name)
+
+    def build_story(self, resume):
+        story = []
+        for name, add_section in RESUME_SECTIONS:
+            if story:
+                story.append(Spacer(1, 8))  # Add some space before the next section
+            add_section(self, story, resume.get(name, ""))
+        # Optionally add projects if required
+        # story.append(Spacer(1, 8))
+        # add_projects(story, improved_resume_dict["projects"])
+        return story
+
+    def render(self, resume):
+        """
+        Renders a resume dict to PDF bytes.
+
+        :param resume: Resume dict with contact, summary, experiences, education, skills and certifications.
+        :return: The PDF as bytes.
+        """
+        pdf_buffer = BytesIO()
+        doc = SimpleDocTemplate(pdf_buffer, pagesize=self.pagesize, topMargin=self.top_margin)
+        doc.build(self.build_story(resume))
+        pdf_value = pdf_buffer.getvalue()
+        pdf_buffer.close()
+        return pdf_value
+
+
+@lru_cache(maxsize=None)
+def get_resume_template():
+    return ResumeTemplate()
+
+
+def generate_resume_pdf(improved_resume_dict, filename):
+    start_time = time.time()
+
+    pdf_value = get_resume_template().render(improved_resume_dict)
 
     total = time.time() - start_time
     logger.info(f"PDF CREATION TIME: {total}")
@@ -469,25 +566,37 @@ FONT_NAME = "Helvetica"
 FONT_SIZE = 12
 
 
-def wrap_text(text, width):
+@lru_cache(maxsize=65536)
+def word_width_units(word, font_name):
+    # Width in 1/1000 em, the same for every font size. Glyph widths are whole units, so
+    # rounding makes sums of cached widths exact
+    return round(pdfmetrics.stringWidth(word, font_name, 1000))
+
+
+def wrap_text(text, width, font_name=FONT_NAME, font_size=FONT_SIZE):
     """
-    Wraps text to fit within a specified width.
+    Wraps text to fit within a specified width. Every word is measured once (from the word
+    width cache) and lines are broken greedily on the running width, in linear time.
     :param text: The text to be wrapped.
     :param width: The maximum width of a line.
     :return: A list of lines where each line fits within the specified width.
     """
-    words = text.split()
+    space_units = word_width_units(" ", font_name)
     lines = []
     current_line = ""
+    current_units = 0  # Width of current_line, trailing space included
 
-    for word in words:
-        # Check if adding the next word exceeds the line width
-        if pdfmetrics.stringWidth(current_line + word, FONT_NAME, FONT_SIZE) <= width:
+    for word in text.split():
+        word_units = word_width_units(word, font_name)
+        # Check if adding the next word exceeds the line width (scaled as stringWidth does)
+        if (current_units + word_units) * 0.001 * font_size <= width:
             current_line += word + " "
+            current_units += word_units + space_units
         else:
             # If the line is too long, start a new line
             lines.append(current_line)
             current_line = word + " "
+            current_units = word_units + space_units
 
     if current_line:  # Add the last line if it's not empty
         lines.append(current_line)
@@ -519,9 +628,12 @@ def format_paragraphs(canvas, text_blocks, width, height, y, is_paragraph=True):
     return y
 
 
-async def generate_formatted_pdf(response_text, filename, doc_type=None):
-    start_time = time.time()
+def render_formatted_pdf(response_text, doc_type=None):
+    """
+    Lays out a cover letter dict (doc_type "CL") or plain text on letter pages.
 
+    :return: The PDF as bytes.
+    """
     buffer = BytesIO()
     p = canvas.Canvas(buffer, pagesize=letter)
     width, height = letter
@@ -570,11 +682,27 @@ async def generate_formatted_pdf(response_text, filename, doc_type=None):
         paragraphs = response_text.split("\n\n")
         y = format_paragraphs(p, paragraphs, width, height, y, is_paragraph=True)
     p.save()
-    buffer.seek(0)
+    return buffer.getvalue()
+
+
+def render_formatted_pdfs(response_texts, doc_type=None):
+    """
+    Renders many letters in one go. The word width cache stays warm across them, so only
+    words not seen in earlier letters are measured.
+
+    :return: A list with the PDF bytes of each letter, in order.
+    """
+    return [render_formatted_pdf(response_text, doc_type=doc_type) for response_text in response_texts]
+
+
+def generate_formatted_pdf(response_text, filename, doc_type=None):
+    start_time = time.time()
+
+    pdf_value = render_formatted_pdf(response_text, doc_type=doc_type)
 
     total = time.time() - start_time
     logger.info(f"PDF CREATION TIME: {total}")
-    return ContentFile(buffer.getvalue(), name=filename)
+    return ContentFile(pdf_value, name=filename)
 
 
 async def run_main():
@@ -0,0 +1,149 @@
+# PDF rendering service: ReportLab layout is CPU-bound, so async callers (the optimization
+# WebSocket consumer, Celery tasks driving asyncio) hand it to a process pool and await the
+# result instead of freezing their event loop.
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from chatbackend.configs.logging_config import configure_logger
+from optimizers.pdf_gen import get_resume_template, render_formatted_pdf
+
+logger = configure_logger(__name__)
+
+
+class PdfRenderError(Exception):
+    pass
+
+
+class RenderQueueFull(PdfRenderError):
+    pass
+
+
+class RenderTimeout(PdfRenderError):
+    pass
+
+
+def init_worker():
+    # Compile the resume layout once when the worker starts rather than on its first render
+    get_resume_template()
+
+
+def render_resume(resume):
+    return get_resume_template().render(resume)
+
+
+def render_letter(response_text, doc_type):
+    return render_formatted_pdf(response_text, doc_type=doc_type)
+
+
+class PdfRenderer:
+    """
+    Process pool rendering PDFs for async callers, with a bounded queue.
+
+    At most max_workers + queue_size renders are accepted at once. A caller arriving when the
+    queue is full waits up to queue_timeout seconds for a slot (backpressure) before
+    RenderQueueFull is raised, and RenderTimeout is raised when a render takes longer than
+    timeout seconds. A render that timed out keeps its slot until its worker is done with it.
+    """
+
+    def __init__(self, max_workers, queue_size, queue_timeout, timeout):
+        self.max_workers = max_workers
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        # Not asyncio primitives: one renderer serves every event loop of the process
+        self._slots = threading.BoundedSemaphore(max_workers + queue_size)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                if multiprocessing.current_process().daemon:
+                    # Daemonic processes (e.g. Celery prefork children) cannot start processes of their own;
+                    # the optimizations queue is meant for a worker on the threads pool (see CELERY_TASK_ROUTES)
+                    logger.warning("Running in a daemonic process, PDFs are rendered on a single thread")
+                    self._pool = ThreadPoolExecutor(max_workers=1, initializer=init_worker)
+                else:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        initializer=init_worker,
+                        # Forking a process running an event loop is unsafe; start clean workers
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+            return self._pool
+
+    def _reset_pool(self, pool):
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    async def _acquire_slot(self):
+        # Polled rather than waited on in a thread, so a cancelled caller never leaks a slot
+        deadline = time.monotonic() + self.queue_timeout
+        while not self._slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise RenderQueueFull(f"PDF render queue still full after {self.queue_timeout} seconds")
+            await asyncio.sleep(0.05)
+
+    async def render(self, function, *args):
+        """
+        Runs function(*args) in the pool.
+
+        :return: Whatever the function returns (the PDF bytes).
+        """
+        await self._acquire_slot()
+        pool = self._get_pool()
+        try:
+            future = pool.submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise RenderTimeout(f"PDF render took longer than {self.timeout} seconds")
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a new pool for the next render
+            logger.error("PDF render worker died, restarting the pool")
+            self._reset_pool(pool)
+            raise
+
+
+@lru_cache(maxsize=None)
+def get_pdf_renderer():
+    return PdfRenderer(
+        max_workers=settings.PDF_RENDER_WORKERS,
+        queue_size=settings.PDF_RENDER_QUEUE_SIZE,
+        queue_timeout=settings.PDF_RENDER_QUEUE_TIMEOUT,
+        timeout=settings.PDF_RENDER_TIMEOUT,
+    )
+
+
+async def agenerate_resume_pdf(improved_resume_dict, filename):
+    start_time = time.time()
+
+    pdf_value = await get_pdf_renderer().render(render_resume, improved_resume_dict)
+
+    total = time.time() - start_time
+    logger.info(f"PDF CREATION TIME: {total}")
+    return ContentFile(pdf_value, name=filename)
+
+
+async def agenerate_formatted_pdf(response_text, filename, doc_type=None):
+    start_time = time.time()
+
+    pdf_value = await get_pdf_renderer().render(render_letter, response_text, doc_type)
+
+    total = time.time() - start_time
+    logger.info(f"PDF CREATION TIME: {total}")
+    return ContentFile(pdf_value, name=filename)
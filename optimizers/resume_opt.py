@@ -7,14 +7,18 @@ from django.conf import settings
 
 from chatbackend.configs.logging_config import configure_logger
 from helpers.optimizer_utils import get_job_post_instruction
-from optimizers.job_post import optimize_job
-from optimizers.mg_database import get_doc_content, get_job_post_content
+from optimizers.job_post import get_optimized_job_post
+from optimizers.mg_database import get_doc_content, get_doc_text_and_sections, get_job_post_content
 from optimizers.models import JobPost, OptimizedResumeContent, Resume
 from optimizers.pdf_gen import generate_resume_pdf
+from optimizers.pdf_rendering import agenerate_resume_pdf
 from optimizers.samples import default_job_post, default_resume
+from optimizers.task_status import aset_stage, set_stage, tracked_task
 from optimizers.utils import (
     Readablity,
+    aupload_directly_to_s3,
     customize_doc,
+    get_full_url,
     improve_doc,
     optimize_doc,
     resume_sections_feedback,
@@ -29,24 +33,29 @@ USER_ROLE = "user"
 
 
 @shared_task
+@tracked_task
 def improve_resume(candidate_id):
     try:
         start_time = time.time()
 
-        # get from the database, because the default is going to be created using some of the applicant details
-        # resume_content = await get_doc_content(candidate_id, doc_type="R")
-        resume_content = default_resume
-
         async def get_feedback_and_improve():
+            await aset_stage("fetch")
+            # The applicant's uploaded resume, parsed once per version of the file; the sample until there is one
+            resume_content, resume_sections = await get_doc_text_and_sections(candidate_id, doc_type="R")
+            if not resume_content:
+                resume_content, resume_sections = default_resume, None
+
+            await aset_stage("feedback")
             readability = Readablity(resume_content)
             readability_feedback = await readability.get_readability_text(
                 doc_type="resume"
             )
 
-            sections_feedback = await resume_sections_feedback(resume_content)
+            sections_feedback = await resume_sections_feedback(resume_content, resume_sections)
             feedbacks = [readability_feedback, sections_feedback]
             resume_feedback = "\n\n".join(feedbacks)
 
+            await aset_stage("improve")
             improved_content = await improve_doc(
                 doc_type="resume",
                 doc_content=resume_content,
@@ -56,14 +65,17 @@ def improve_resume(candidate_id):
 
         improved_content = async_to_sync(get_feedback_and_improve)()
 
+        set_stage("render")
         pdf = generate_resume_pdf(improved_content, filename="Improved Resume.pdf")
 
         # Generate a unique S3 key for the PDF
         s3_key = f"media/resume/general_improved/{uuid4()}.pdf"
 
         # Upload the PDF directly to S3
+        set_stage("upload")
         upload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
 
+        set_stage("persist")
         resume_instance, resume_created = Resume.objects.update_or_create(
             resume_id=candidate_id,
             defaults={
@@ -73,31 +85,33 @@ def improve_resume(candidate_id):
         )
     except Exception as e:
         logger.error(e)
+        raise
 
     total = time.time() - start_time
     logger.info(f"Total time taken: {total}")
 
     # Construct the URL to the PDF stored in S3
-    pdf_url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
+    pdf_url = get_full_url(s3_key)
     return pdf_url
 
 
-@shared_task
-async def customize_improved_resume(candidate_id, custom_instruction):
-    start_time = time.time()
+async def customize_improved_resume_func(candidate_id, custom_instruction):
+    await aset_stage("fetch")
     resume_update = sync_to_async(
         Resume.objects.update_or_create, thread_sensitive=True
     )
 
     resume_instance = await sync_to_async(Resume.objects.get)(resume_id=candidate_id)
     improved_content = resume_instance.general_improved_content
+    await aset_stage("improve")
     customized_content = await customize_doc(
         doc_type="resume",
         doc_content=improved_content,
         custom_instruction=custom_instruction,
     )
 
-    pdf = generate_resume_pdf(
+    await aset_stage("render")
+    pdf = await agenerate_resume_pdf(
         customized_content,
         filename="Customized Improved Resume.pdf",
     )
@@ -106,9 +120,11 @@ async def customize_improved_resume(candidate_id, custom_instruction):
     s3_key = f"media/resume/general_improved/{uuid4()}.pdf"
 
     # Upload the PDF directly to S3
-    upload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
+    await aset_stage("upload")
+    await aupload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
 
     # Run the synchronous database update_or_create functions concurrently
+    await aset_stage("persist")
     resume_instance, resume_created = await resume_update(
         resume_id=candidate_id,
         defaults={
@@ -117,63 +133,76 @@ async def customize_improved_resume(candidate_id, custom_instruction):
         },
     )
 
-    total = time.time() - start_time
-    logger.info(f"Total time taken: {total}")
-
     # Construct the URL to the PDF stored in S3
-    pdf_url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
+    pdf_url = get_full_url(s3_key)
     return pdf_url
 
 
+@shared_task
+@tracked_task
+def customize_improved_resume(candidate_id, custom_instruction):
+    start_time = time.time()
+
+    url = async_to_sync(customize_improved_resume_func)(candidate_id, custom_instruction)
+
+    total = time.time() - start_time
+    logger.info(f"Total time taken: {total}")
+    return url
+
+
 async def resume_optimize_func(applicant_id, job_post_id):
+    await aset_stage("fetch")
     resume_instance = await sync_to_async(Resume.objects.get)(resume_id=applicant_id)
-    try:
-        job_post_instance = await sync_to_async(JobPost.objects.get)(
-            job_post_id=job_post_id
-        )
+    # Optimized once per job post, however many applicants tailor to it at the same time
+    job_post_instance = await get_optimized_job_post(job_post_id)
+    return await tailor_resume(resume_instance, job_post_instance)
 
-        if job_post_instance.optimized_content:
-            logger.info(
-                f"JobPost {job_post_id} already optimized. Skipping optimization."
-            )
-            optimized_content_for_job_post = job_post_instance.optimized_content
 
-    except JobPost.DoesNotExist:
-        logger.info(f"JobPost {job_post_id} not optimized. Starting optimization.")
-        optimized_content_for_job_post = await optimize_job(job_post_id)
+async def tailor_resume(resume_instance, job_post_instance):
+    """
+    Tailors an applicant's improved resume to an optimized job post, renders and stores it.
+
+    :return: URL of the tailored resume PDF.
+    """
+    optimized_content_for_job_post = job_post_instance.optimized_content
 
+    await aset_stage("improve")
     optimized_content = await optimize_doc(
         doc_type="resume",
         doc_text=resume_instance.general_improved_content,
         job_description=optimized_content_for_job_post,
     )
 
-    pdf = generate_resume_pdf(optimized_content, filename="Optimized Resume.pdf")
+    await aset_stage("render")
+    pdf = await agenerate_resume_pdf(optimized_content, filename="Optimized Resume.pdf")
 
     # Generate a unique S3 key for the PDF
     s3_key = f"media/resume/optimized/{uuid4()}.pdf"
 
     # Upload the PDF directly to S3
-    upload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
+    await aset_stage("upload")
+    await aupload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
 
+    await aset_stage("persist")
     optimized_content_instance, created = await sync_to_async(
         OptimizedResumeContent.objects.update_or_create, thread_sensitive=True
     )(
         resume=resume_instance,
+        job_post=job_post_instance,
         defaults={
             "optimized_content": optimized_content,
             "optimized_pdf_s3_key": s3_key,
             "is_tailored": True,
-            "job_post": job_post_instance,
         },
     )
 
     # Construct the URL to the PDF stored in S3
-    pdf_url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
+    pdf_url = get_full_url(s3_key)
     return pdf_url
 
 
 @shared_task
+@tracked_task
 def optimize_resume(applicant_id, job_post_id):
     start_time = time.time()
 
@@ -185,22 +214,25 @@ def optimize_resume(applicant_id, job_post_id):
 
 
 async def customize_resume_optimize_func(applicant_id, job_post_id, custom_instruction):
+    await aset_stage("fetch")
     resume_instance = await sync_to_async(Resume.objects.get)(resume_id=applicant_id)
-    optimized_resume_instance = await sync_to_async(OptimizedResumeContent.objects.get)(
-        resume=resume_instance
-    )
     job_post_instance = await sync_to_async(JobPost.objects.get)(
         job_post_id=job_post_id
     )
+    optimized_resume_instance = await sync_to_async(OptimizedResumeContent.objects.get)(
+        resume=resume_instance, job_post=job_post_instance
+    )
 
     optimized_content = optimized_resume_instance.optimized_content
+    await aset_stage("improve")
     customized_content = await customize_doc(
         doc_type="resume",
         doc_content=optimized_content,
         custom_instruction=custom_instruction,
     )
 
-    pdf = generate_resume_pdf(
+    await aset_stage("render")
+    pdf = await agenerate_resume_pdf(
         customized_content, filename="Customized Optimized Resume.pdf"
     )
 
@@ -208,25 +240,28 @@ async def customize_resume_optimize_func(applicant_id, job_post_id, custom_instr
     s3_key = f"media/resume/optimized/{uuid4()}.pdf"
 
     # Upload the PDF directly to S3
-    upload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
+    await aset_stage("upload")
+    await aupload_directly_to_s3(pdf, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
 
+    await aset_stage("persist")
     optimized_content_instance, created = await sync_to_async(
         OptimizedResumeContent.objects.update_or_create, thread_sensitive=True
     )(
         resume=resume_instance,
+        job_post=job_post_instance,
         defaults={
             "optimized_content": customized_content,
             "optimized_pdf_s3_key": s3_key,
             "is_tailored": True,
-            "job_post": job_post_instance,
         },
     )
     # Construct the URL to the PDF stored in S3
-    pdf_url = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
+    pdf_url = get_full_url(s3_key)
     return pdf_url
 
 
 @shared_task
+@tracked_task
 def customize_optimized_resume(applicant_id, job_post_id, custom_instruction):
     start_time = time.time()
 
@@ -0,0 +1,365 @@
+# Status of optimization tasks: the stage a Celery task is in and when each stage started, kept
+# in the shared cache and pushed to the applicant's OptimizationConsumer sockets as it changes,
+# so clients follow a task without polling the optimized document endpoints.
+import json
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from uuid import uuid4
+
+from asgiref.sync import async_to_sync
+from celery import current_task
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from chatbackend.configs.logging_config import configure_logger
+from optimizers.idempotency import arequest_key
+
+logger = configure_logger(__name__)
+
+STAGES = ("fetch", "feedback", "improve", "render", "upload", "persist")
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+# Longer than any optimization, so the slots held by tasks whose worker died free up on their own
+ACTIVE_TASKS_TIMEOUT = 30 * 60  # seconds
+
+# Id of the tracked task the current code runs for; async_to_sync and sync_to_async carry it along
+current_task_id = ContextVar("current_task_id", default=None)
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class TooManyTasks(Exception):
+    pass
+
+
+def status_key(task_id):
+    return f"optimization_task:{task_id}"
+
+
+def cancel_key(task_id):
+    # Apart from the status, so a cancellation is never overwritten by an update of the task
+    return f"optimization_task_cancelled:{task_id}"
+
+
+def watchers_key(task_id):
+    # Number of requests (sockets and REST calls) waiting for the task
+    return f"optimization_task_watchers:{task_id}"
+
+
+def active_tasks_key(applicant_id):
+    return f"optimization_active_tasks:{applicant_id}"
+
+
+def request_cache_key(request_key, generation):
+    # Task answering a generation of a request; a new generation starts when that task is stale
+    return f"optimization_request:{request_key}:{generation}"
+
+
+def request_generation_key(request_key):
+    return f"optimization_request_generation:{request_key}"
+
+
+def now():
+    return timezone.now().isoformat()
+
+
+def new_task_status(task_id, operation, applicant_id, job_post_id=None, limited=False):
+    created_at = now()
+    return {
+        "type": "task_status",
+        "task_id": task_id,
+        "operation": operation,
+        "applicant_id": applicant_id,
+        "job_post_id": job_post_id,
+        "state": QUEUED,
+        "stage": None,
+        "stages": [],
+        "result": None,
+        "error": None,
+        "limited": limited,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def apply_update(task_status, state=None, stage=None, **fields):
+    if state:
+        task_status["state"] = state
+    if stage:
+        task_status["stage"] = stage
+        task_status["stages"].append({"stage": stage, "started_at": now()})
+    task_status.update(fields)
+    task_status["updated_at"] = now()
+    return task_status
+
+
+def group_message(task_status):
+    return {"type": "optimization.message", "message": json.dumps(task_status)}
+
+
+# ============================> SYNC <============================
+def get_task_status(task_id):
+    return cache.get(status_key(task_id))
+
+
+def update_task_status(task_id, state=None, stage=None, **fields):
+    """
+    Records a state and/or the start of a stage of a tracked task and pushes the new status to
+    the applicant's sockets. Does nothing for tasks that are not tracked.
+    """
+    task_status = get_task_status(task_id) if task_id else None
+    if task_status is None:
+        return None
+
+    apply_update(task_status, state, stage, **fields)
+    cache.set(status_key(task_id), task_status, settings.OPTIMIZATION_STATUS_TTL)
+    try:
+        async_to_sync(get_channel_layer().group_send)(
+            f"user_{task_status['applicant_id']}", group_message(task_status)
+        )
+    except Exception as e:
+        # Clients that missed the push still find the status in the cache
+        logger.error(f"Error pushing the status of task {task_id}: {e}")
+    return task_status
+
+
+def release_task_slot(applicant_id):
+    try:
+        cache.decr(active_tasks_key(applicant_id))
+    except ValueError:
+        # The counter expired
+        pass
+
+
+def check_cancelled(task_id):
+    if task_id and cache.get(cancel_key(task_id)):
+        raise TaskCancelled(f"Task {task_id} was cancelled")
+
+
+def set_stage(stage):
+    """
+    Records the start of a stage of the current task. Stages are also where a cancelled task stops.
+    """
+    task_id = current_task_id.get()
+    check_cancelled(task_id)
+    update_task_status(task_id, stage=stage)
+
+
+def tracked_task(func):
+    """
+    Tracks the task function wrapped: running while it runs, then succeeded with what it
+    returns (the PDF URL), failed with its error or cancelled. Apply below @shared_task.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        task_id = current_task.request.id if current_task else None
+        token = current_task_id.set(task_id)
+        task_status = None
+        try:
+            check_cancelled(task_id)
+            task_status = update_task_status(task_id, state=RUNNING)
+            result = func(*args, **kwargs)
+            update_task_status(task_id, state=SUCCEEDED, result=result)
+            return result
+        except TaskCancelled:
+            logger.info(f"Task {task_id} cancelled")
+            task_status = task_status or get_task_status(task_id)
+            update_task_status(task_id, state=CANCELLED)
+        except Exception as e:
+            update_task_status(task_id, state=FAILED, error=str(e))
+            raise
+        finally:
+            current_task_id.reset(token)
+            if task_status and task_status["limited"]:
+                release_task_slot(task_status["applicant_id"])
+
+    return wrapper
+
+
+# ============================> ASYNC <============================
+async def acreate_task_status(operation, applicant_id, job_post_id=None, limited=False):
+    """
+    Records a task as queued before it is sent to Celery.
+
+    :return: The id to send the task with (`task.apply_async(args, task_id=task_id)`).
+    """
+    task_id = str(uuid4())
+    task_status = new_task_status(task_id, operation, applicant_id, job_post_id, limited)
+    await cache.aset(status_key(task_id), task_status, settings.OPTIMIZATION_STATUS_TTL)
+    return task_id
+
+
+async def aacquire_task_slot(applicant_id):
+    """
+    Counts a task against the OPTIMIZATION_MAX_ACTIVE_TASKS of an applicant, shared by every
+    socket and server. The task gives its slot back when it finishes.
+    """
+    key = active_tasks_key(applicant_id)
+    await cache.aadd(key, 0, ACTIVE_TASKS_TIMEOUT)
+    if await cache.aincr(key) > settings.OPTIMIZATION_MAX_ACTIVE_TASKS:
+        await cache.adecr(key)
+        raise TooManyTasks(f"At most {settings.OPTIMIZATION_MAX_ACTIVE_TASKS} optimizations can run at a time")
+    await cache.atouch(key, ACTIVE_TASKS_TIMEOUT)
+
+
+async def ais_reusable(task_id):
+    # A queued or running task, even one cancelled since its watchers left, or one that
+    # succeeded within the freshness window
+    task_status = await aget_task_status(task_id)
+    if task_status is None:
+        return False
+    if task_status["state"] in (QUEUED, RUNNING):
+        return True
+    if task_status["state"] == SUCCEEDED:
+        age = timezone.now() - datetime.fromisoformat(task_status["updated_at"])
+        return age.total_seconds() <= settings.OPTIMIZATION_DEDUPE_WINDOW
+    return False
+
+
+async def aclaim_request(request_key, task_id):
+    """
+    Records task_id as the task answering an optimization request, unless a reusable task
+    already answers it.
+
+    Each generation of a request is claimed with an atomic add, so of concurrent identical
+    requests a single one sends a task. A request finding the task of the latest generation
+    stale (failed, cancelled or past the freshness window) claims the next one.
+
+    :return: The id of that reusable task, or None.
+    """
+    timeout = ACTIVE_TASKS_TIMEOUT + settings.OPTIMIZATION_DEDUPE_WINDOW
+    generation_key = request_generation_key(request_key)
+    generation = await cache.aget(generation_key, 0)
+    while True:
+        key = request_cache_key(request_key, generation)
+        if await cache.aadd(key, task_id, timeout):
+            # Outlives the generations, so a lapsed one is never claimed again
+            await cache.aset(generation_key, generation, 2 * timeout)
+            return None
+        existing_task_id = await cache.aget(key)
+        if existing_task_id and await ais_reusable(existing_task_id):
+            # A reconnecting client gets back the task its previous socket cancelled on leaving
+            await cache.adelete(cancel_key(existing_task_id))
+            return existing_task_id
+        generation += 1
+
+
+async def arelease_request(request_key, task_id):
+    # Withdraws the claim of a task that was not sent, so the next identical request sends one
+    generation = await cache.aget(request_generation_key(request_key), 0)
+    key = request_cache_key(request_key, generation)
+    if await cache.aget(key) == task_id:
+        await cache.adelete(key)
+
+
+async def aenqueue_tracked_task(task, args, applicant_id, job_post_id=None, limited=False, custom_instruction=None):
+    """
+    Sends a @tracked_task task to Celery with a status recorded as queued.
+
+    A request identical to one in flight, or to one completed within OPTIMIZATION_DEDUPE_WINDOW
+    (see optimizers.idempotency), gets the id of that task instead: its status is pushed to
+    the applicant again, and no new task is sent.
+
+    Every request counts as a watcher of the task it gets, until released (see arelease_task).
+
+    :param limited: Whether the task counts against the applicant's active task limit, raising
+        TooManyTasks when it is reached.
+    :param custom_instruction: Instruction of customization tasks, part of the request key.
+    :return: The task id, to look up the status with.
+    """
+    operation = task.name.rsplit(".", 1)[-1]
+    request_key = await arequest_key(operation, applicant_id, job_post_id, custom_instruction)
+    task_id = await acreate_task_status(operation, applicant_id, job_post_id, limited)
+
+    if request_key:
+        existing_task_id = await aclaim_request(request_key, task_id)
+        if existing_task_id:
+            logger.info(f"{operation} for {applicant_id} already answered by task {existing_task_id}")
+            await cache.adelete(status_key(task_id))
+            await awatch_task(existing_task_id)
+            await apush_task_status(await aget_task_status(existing_task_id))
+            return existing_task_id
+
+    try:
+        if limited:
+            await aacquire_task_slot(applicant_id)
+        try:
+            task.apply_async(args, task_id=task_id)
+        except Exception:
+            if limited:
+                await cache.adecr(active_tasks_key(applicant_id))
+            raise
+    except Exception:
+        await cache.adelete(status_key(task_id))
+        if request_key:
+            await arelease_request(request_key, task_id)
+        raise
+    await awatch_task(task_id)
+    return task_id
+
+
+async def awatch_task(task_id):
+    key = watchers_key(task_id)
+    await cache.aadd(key, 0, ACTIVE_TASKS_TIMEOUT)
+    await cache.aincr(key)
+    await cache.atouch(key, ACTIVE_TASKS_TIMEOUT)
+
+
+async def arelease_task(task_id, count=1):
+    """
+    Stops watching a task, count times. The task is cancelled once it has no watchers left,
+    so a task other sockets or REST callers wait for keeps running.
+
+    :return: Whether the task was cancelled.
+    """
+    try:
+        if await cache.adecr(watchers_key(task_id), count) > 0:
+            return False
+    except ValueError:
+        # The counter expired with the task
+        pass
+    await acancel_task(task_id)
+    return True
+
+
+async def acancel_task(task_id):
+    """
+    Cancels a tracked task: it stops when it starts or at its next stage, an LLM call or
+    render in progress being finished first.
+    """
+    await cache.aset(cancel_key(task_id), 1, settings.OPTIMIZATION_STATUS_TTL)
+
+
+async def aget_task_status(task_id):
+    return await cache.aget(status_key(task_id))
+
+
+async def aupdate_task_status(task_id, state=None, stage=None, **fields):
+    task_status = await aget_task_status(task_id) if task_id else None
+    if task_status is None:
+        return None
+
+    apply_update(task_status, state, stage, **fields)
+    await cache.aset(status_key(task_id), task_status, settings.OPTIMIZATION_STATUS_TTL)
+    await apush_task_status(task_status)
+    return task_status
+
+
+async def apush_task_status(task_status):
+    try:
+        await get_channel_layer().group_send(f"user_{task_status['applicant_id']}", group_message(task_status))
+    except Exception as e:
+        logger.error(f"Error pushing the status of task {task_status['task_id']}: {e}")
+
+
+async def aset_stage(stage):
+    task_id = current_task_id.get()
+    if task_id and await cache.aget(cancel_key(task_id)):
+        raise TaskCancelled(f"Task {task_id} was cancelled")
+    await aupdate_task_status(task_id, stage=stage)
@@ -1,3 +1,137 @@
-from django.test import TestCase
+import asyncio
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from celery import shared_task
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from optimizers.idempotency import arequest_key
+from optimizers.task_status import (
+    CANCELLED,
+    FAILED,
+    SUCCEEDED,
+    TooManyTasks,
+    active_tasks_key,
+    aenqueue_tracked_task,
+    aget_task_status,
+    arelease_task,
+    aupdate_task_status,
+    cancel_key,
+    request_cache_key,
+    request_generation_key,
+    status_key,
+    tracked_task,
+)
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class FakeTask:
+    # Records the tasks sent instead of sending them to Celery
+    def __init__(self, name="optimizers.resume_opt.optimize_resume"):
+        self.name = name
+        self.sent = []
+
+    def apply_async(self, args, task_id):
+        self.sent.append((args, task_id))
+
+
+@shared_task(name="optimizers.tests.fake_optimization")
+@tracked_task
+def fake_optimization(applicant_id, job_post_id):
+    return f"https://example.com/{applicant_id}/{job_post_id}.pdf"
+
+
+@override_settings(CACHES=LOCMEM_CACHES, OPTIMIZATION_MAX_ACTIVE_TASKS=3)
+class TrackedTaskTests(TestCase):
+    # Job post ids that are not Mongo ids have no job version, so no Mongo query is made
+    args = ("applicant-1", "job-1")
+
+    def setUp(self):
+        cache.clear()
+        self.task = FakeTask()
+
+    def enqueue(self, **kwargs):
+        return aenqueue_tracked_task(self.task, self.args, *self.args, **kwargs)
+
+    async def test_concurrent_identical_requests_send_one_task(self):
+        task_ids = await asyncio.gather(*(self.enqueue() for _ in range(5)))
+
+        self.assertEqual(len(self.task.sent), 1)
+        self.assertEqual(set(task_ids), {self.task.sent[0][1]})
+
+    async def test_stale_task_is_answered_by_the_next_generation(self):
+        key = await arequest_key("optimize_resume", *self.args)
+
+        def fail(task_id):
+            return aupdate_task_status(task_id, state=FAILED)
+
+        async def cancel(task_id):
+            await cache.aset(cancel_key(task_id), 1)
+            await aupdate_task_status(task_id, state=CANCELLED)
+
+        async def expire(task_id):
+            task_status = await aupdate_task_status(task_id, state=SUCCEEDED)
+            task_status["updated_at"] = (timezone.now() - timedelta(days=1)).isoformat()
+            await cache.aset(status_key(task_id), task_status)
+
+        task_id = await self.enqueue()
+        for generation, make_stale in enumerate((fail, cancel, expire), start=1):
+            await make_stale(task_id)
+            task_id = await self.enqueue()
+
+            self.assertEqual(len(self.task.sent), generation + 1)
+            self.assertEqual(await cache.aget(request_generation_key(key)), generation)
+            self.assertEqual(await cache.aget(request_cache_key(key, generation)), task_id)
+
+    async def test_completed_task_is_reused_within_the_window(self):
+        task_id = await self.enqueue()
+        await aupdate_task_status(task_id, state=SUCCEEDED, result="https://example.com/resume.pdf")
+
+        self.assertEqual(await self.enqueue(), task_id)
+        self.assertEqual(len(self.task.sent), 1)
+
+    async def test_too_many_tasks_leaves_no_claim(self):
+        key = await arequest_key("optimize_resume", *self.args)
+        with override_settings(OPTIMIZATION_MAX_ACTIVE_TASKS=0):
+            with self.assertRaises(TooManyTasks):
+                await self.enqueue(limited=True)
+
+        self.assertIsNone(await cache.aget(request_cache_key(key, 0)))
+        self.assertEqual(self.task.sent, [])
+
+        task_id = await self.enqueue(limited=True)
+        self.assertEqual(self.task.sent, [(self.args, task_id)])
+        self.assertEqual(await cache.aget(active_tasks_key("applicant-1")), 1)
+
+    async def test_last_release_cancels_the_task(self):
+        task_id = await self.enqueue()
+        self.assertEqual(await self.enqueue(), task_id)
+
+        self.assertFalse(await arelease_task(task_id))
+        self.assertIsNone(await cache.aget(cancel_key(task_id)))
+        self.assertTrue(await arelease_task(task_id))
+        self.assertTrue(await cache.aget(cancel_key(task_id)))
+
+    async def test_repeated_request_resumes_a_cancelled_task_still_queued(self):
+        task_id = await self.enqueue()
+        await arelease_task(task_id)
+
+        self.assertEqual(await self.enqueue(), task_id)
+        self.assertIsNone(await cache.aget(cancel_key(task_id)))
+        self.assertEqual(len(self.task.sent), 1)
+
+    def test_finished_task_releases_its_slot(self):
+        task = FakeTask(name=fake_optimization.name)
+        task_id = async_to_sync(aenqueue_tracked_task)(task, self.args, *self.args, limited=True)
+        self.assertEqual(cache.get(active_tasks_key("applicant-1")), 1)
+
+        fake_optimization.apply(self.args, task_id=task_id)
+
+        task_status = async_to_sync(aget_task_status)(task_id)
+        self.assertEqual(
+            (task_status["state"], task_status["result"]), (SUCCEEDED, "https://example.com/applicant-1/job-1.pdf")
+        )
+        self.assertEqual(cache.get(active_tasks_key("applicant-1")), 0)
@@ -75,6 +75,18 @@ urlpatterns = [
         views.CoverLetterOptimizationCustomizationView.as_view(),
         name="customize_cover_letter_optimization",
     ),  # ~ 50 secs
+    # =====================> Bulk Tailoring URLs <=====================
+    path(
+        "bulk-optimize/<str:applicant_id>/",
+        views.BulkTailoringView.as_view(),
+        name="bulk_tailoring",
+    ),
+    # =====================> Task Status URLs <=====================
+    path(
+        "optimization-status/<str:task_id>/",
+        views.OptimizationTaskStatusView.as_view(),
+        name="optimization_task_status",
+    ),
     # =====================> Job Post URLs <=====================
     path(
         "optimize-job-post/<str:job_id>/",
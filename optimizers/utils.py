@@ -1,7 +1,7 @@
+import asyncio
 import json
 import time
 
-import boto3
 import textstat as textstat_analysis
 from django.conf import settings
 from langchain_community.chat_models import ChatOpenAI
@@ -12,6 +12,7 @@ from textblob import TextBlob
 
 from chatbackend.configs.base_config import openai_client as client
 from chatbackend.configs.logging_config import configure_logger
+from helpers import storage_utils
 
 logger = configure_logger(__name__)
 
@@ -298,7 +299,11 @@ async def review_tone(doc_type, text):
     return final_feedback
 
 
-async def resume_sections_feedback(doc_text):
+async def resume_sections_feedback(doc_text, sections=None):
+    """
+    :param sections: Sections of the resume by name (see optimizers.documents.extract_sections);
+        when given, each section is presented to the reviewer under its own heading.
+    """
     start_time = time.time()
 
     logger.info(
@@ -309,6 +314,10 @@ async def resume_sections_feedback(doc_text):
     You are a professional recruiter. Review each resume section based on professionalism, assertiveness, compassion and impact where necessary and provide constructive feedback to help in improving the resume:
     """
 
+    if sections:
+        doc_text = "\n\n".join(
+            f"{name.upper()}:\n{section_text}" for name, section_text in sections.items()
+        )
     resume_feedback = await get_chat_response(
         instruction, doc_text, doc_type="R-sections-fb"
     )
@@ -530,27 +539,23 @@ async def optimize_doc(doc_type, doc_text, job_description):
 
 # =========================== DATABASE FUNCTIONS ===========================
 def upload_directly_to_s3(file, bucket_name, s3_key):
-    s3 = boto3.client(
-        "s3",
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        # region_name='your-region',  # Uncomment and set your region if necessary
-    )
-
-    # Include ExtraArgs to set content type and content disposition
-    s3.upload_fileobj(
+    # Set the content type and content disposition so the PDF opens in the browser
+    storage_utils.upload_fileobj(
         file,
-        bucket_name,
         s3_key,
-        ExtraArgs={
-            "ContentType": "application/pdf",
-            "ContentDisposition": "inline",
-        },
+        bucket=bucket_name,
+        content_type="application/pdf",
+        content_disposition="inline",
     )
 
 
+async def aupload_directly_to_s3(file, bucket_name, s3_key):
+    # Upload in a worker thread so the event loop keeps serving other requests meanwhile
+    await asyncio.to_thread(upload_directly_to_s3, file, bucket_name, s3_key)
+
+
 def get_full_url(s3_key):
-    return f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
+    return storage_utils.object_url(s3_key)
 
 
 # =========================== DATABASE FUNCTIONS ===========================
@@ -1,12 +1,13 @@
 import json
 
-import boto3
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.views import View
 from rest_framework import status
 
+from helpers import storage_utils
+from optimizers.bulk_opt import DOC_TYPES, bulk_tailor
 from optimizers.cl_opt import (
     customize_improved_cover_letter,
     customize_optimized_cover_letter,
@@ -35,6 +36,7 @@ from optimizers.serializers import (
     OptimizedResumeSerializer,
     ResumeSerializer,
 )
+from optimizers.task_status import aenqueue_tracked_task, aget_task_status
 
 
 class ResumeDetailView(View):
@@ -44,10 +46,21 @@ class ResumeDetailView(View):
         return JsonResponse(serializer.data, safe=False)
 
 
+def latest_optimized_content(request, queryset):
+    # Tailored once per job post: the one of ?job_post_id=, else the latest
+    job_post_id = request.GET.get("job_post_id")
+    if job_post_id:
+        queryset = queryset.filter(job_post__job_post_id=job_post_id)
+    optimized_content = queryset.order_by("-optimized_at", "-id").first()
+    if optimized_content is None:
+        raise Http404("No optimized content found")
+    return optimized_content
+
+
 class OptimizedResumeContentDetailView(View):
     def get(self, request, resume_id):
-        optimized_resume_content = get_object_or_404(
-            OptimizedResumeContent, resume__resume_id=resume_id
+        optimized_resume_content = latest_optimized_content(
+            request, OptimizedResumeContent.objects.filter(resume__resume_id=resume_id)
         )
         serializer = OptimizedResumeSerializer(optimized_resume_content)
         return JsonResponse(serializer.data, safe=False)
@@ -62,8 +75,9 @@ class CoverLetterDetailView(View):
 
 class OptimizedCoverLetterContentDetailView(View):
     def get(self, request, cover_letter_id):
-        optimized_cover_letter_content = get_object_or_404(
-            OptimizedCoverLetterContent, cover_letter__cover_letter_id=cover_letter_id
+        optimized_cover_letter_content = latest_optimized_content(
+            request,
+            OptimizedCoverLetterContent.objects.filter(cover_letter__cover_letter_id=cover_letter_id),
         )
         serializer = OptimizedCoverLetterContentSerializer(
             optimized_cover_letter_content
@@ -87,10 +101,11 @@ class ResumeImprovementView(View):
     async def get(self, request, applicant_id, format=None):
         try:
             # Get the optimized content
-            pdf_url = improve_resume.delay(applicant_id)
+            task_id = await aenqueue_tracked_task(improve_resume, (applicant_id,), applicant_id)
             # pdf_url = improve_resume(applicant_id)
             data = {
                 "success": "Resume Improvement Initiated",
+                "task_id": task_id,
                 # "improved_content": pdf_url,
             }
             return JsonResponse(data)
@@ -108,10 +123,13 @@ class ResumeOptimizationView(View):
     async def get(self, request, applicant_id, job_post_id, format=None):
         try:
             # Get the optimized content
-            return_data = optimize_resume.delay(applicant_id, job_post_id)
+            task_id = await aenqueue_tracked_task(
+                optimize_resume, (applicant_id, job_post_id), applicant_id, job_post_id
+            )
             # return_data = optimize_resume(applicant_id, job_post_id)
             data = {
                 "success": "Resume Optimization Initiated",
+                "task_id": task_id,
                 # "optimized_content": return_data,
             }
             return JsonResponse(data)
@@ -136,12 +154,16 @@ class ResumeImprovementCustomizationView(View):
             custom_instruction = body_data.get("custom_instruction")
 
             # Call the utility function with applicant_id and custom_instruction
-            return_data = customize_improved_resume.delay(
-                applicant_id, custom_instruction
+            task_id = await aenqueue_tracked_task(
+                customize_improved_resume,
+                (applicant_id, custom_instruction),
+                applicant_id,
+                custom_instruction=custom_instruction,
             )
             # return_data = customize_improved_resume(applicant_id, custom_instruction)
             data = {
                 "success": "Resume Improvement Customization Initiated",
+                "task_id": task_id,
                 # "optimized_content": return_data,
             }
             return JsonResponse(data)
@@ -166,14 +188,19 @@ class ResumeOptimizationCustomizationView(View):
             custom_instruction = body_data.get("custom_instruction")
 
             # Call the utility function with applicant_id, job_post_id, and custom_instruction
-            return_data = customize_optimized_resume.delay(
-                applicant_id, job_post_id, custom_instruction
+            task_id = await aenqueue_tracked_task(
+                customize_optimized_resume,
+                (applicant_id, job_post_id, custom_instruction),
+                applicant_id,
+                job_post_id,
+                custom_instruction=custom_instruction,
             )
             # return_data = customize_optimized_resume(
             #     applicant_id, job_post_id, custom_instruction
             # )
             data = {
                 "success": "Resume Optimization Customization Initiated",
+                "task_id": task_id,
                 # "optimized_content": return_data,
             }
             return JsonResponse(data)
@@ -196,10 +223,11 @@ class CoverLetterCreationView(View):
     async def get(self, request, applicant_id, format=None):
         try:
             # Get the optimized content
-            pdf_url = get_default_cover_letter.delay(applicant_id)
+            task_id = await aenqueue_tracked_task(get_default_cover_letter, (applicant_id,), applicant_id)
             # pdf_url = get_default_cover_letter(applicant_id)
             data = {
                 "success": "Cover Letter Creation Initiated",
+                "task_id": task_id,
                 # "improved_content": pdf_url,
             }
             return JsonResponse(data)
@@ -218,10 +246,11 @@ class CoverLetterImprovementView(View):
     async def get(self, request, applicant_id, format=None):
         try:
             # Get the optimized content
-            pdf_url = improve_cover_letter.delay(applicant_id)
+            task_id = await aenqueue_tracked_task(improve_cover_letter, (applicant_id,), applicant_id)
             # pdf_url = improve_cover_letter(applicant_id)
             data = {
                 "success": "Cover Letter Improvement Initiated",
+                "task_id": task_id,
                 # "improved_content": pdf_url,
             }
             return JsonResponse(data)
@@ -240,10 +269,13 @@ class CoverLetterOptimizationView(View):
     # def get(self, request, application_id, job_post_id, format=None):
     async def get(self, request, applicant_id, job_post_id, format=None):
         try:
-            return_data = optimize_cover_letter.delay(applicant_id, job_post_id)
+            task_id = await aenqueue_tracked_task(
+                optimize_cover_letter, (applicant_id, job_post_id), applicant_id, job_post_id
+            )
             # return_data = optimize_cover_letter(applicant_id, job_post_id)
             data = {
                 "success": "Cover Letter Optimization Initiated",
+                "task_id": task_id,
                 # "optimized_content": return_data,
             }
             return JsonResponse(data)
@@ -269,14 +301,18 @@ class CoverLetterImprovementCustomizationView(View):
             custom_instruction = body_data.get("custom_instruction")
 
             # Call the utility function with applicant_id and custom_instruction
-            return_data = customize_improved_cover_letter.delay(
-                applicant_id, custom_instruction
+            task_id = await aenqueue_tracked_task(
+                customize_improved_cover_letter,
+                (applicant_id, custom_instruction),
+                applicant_id,
+                custom_instruction=custom_instruction,
             )
             # return_data = customize_improved_cover_letter(
             #     applicant_id, custom_instruction
             # )
             data = {
                 "success": "Cover Letter Improvement Customization Initiated",
+                "task_id": task_id,
                 # "optimized_content": return_data,
             }
             return JsonResponse(data)
@@ -302,14 +338,19 @@ class CoverLetterOptimizationCustomizationView(View):
             custom_instruction = body_data.get("custom_instruction")
 
             # Call the utility function with applicant_id, job_post_id, and custom_instruction
-            return_data = customize_optimized_cover_letter.delay(
-                applicant_id, job_post_id, custom_instruction
+            task_id = await aenqueue_tracked_task(
+                customize_optimized_cover_letter,
+                (applicant_id, job_post_id, custom_instruction),
+                applicant_id,
+                job_post_id,
+                custom_instruction=custom_instruction,
             )
             # return_data = customize_optimized_cover_letter(
             #     applicant_id, job_post_id, custom_instruction
             # )
             data = {
                 "success": "Cover Letter Optimization Customization Initiated",
+                "task_id": task_id,
                 # "optimized_content": return_data,
             }
             return JsonResponse(data)
@@ -320,6 +361,67 @@ class CoverLetterOptimizationCustomizationView(View):
 # ============================> COVER LETTER <============================
 
 
+# ============================> TASK STATUS <============================
+class OptimizationTaskStatusView(View):
+    """
+    Status of an optimization task, for clients that do not follow it on the optimization
+    WebSocket: its state, the stages it went through and, once it succeeded, its result.
+    """
+
+    async def get(self, request, task_id, format=None):
+        task_status = await aget_task_status(task_id)
+        if task_status is None:
+            return JsonResponse({"error": "Task not found"}, status=404)
+        return JsonResponse(task_status)
+
+
+# ============================> TASK STATUS <============================
+
+
+# ============================> BULK TAILORING <============================
+class BulkTailoringView(View):
+    """
+    Tailors an applicant's resume and/or cover letter to many job posts in one task. The PDF
+    URL of every job is pushed over the optimization WebSocket as it completes.
+    """
+
+    serializer_class = None
+
+    async def post(self, request, applicant_id, format=None):
+        try:
+            body_data = json.loads(request.body.decode("utf-8"))
+            job_post_ids = body_data.get("job_post_ids")
+            doc_types = body_data.get("doc_types") or list(DOC_TYPES)
+
+            if not job_post_ids:
+                return JsonResponse({"error": "job_post_ids is required"}, status=400)
+            if not isinstance(job_post_ids, list) or not all(isinstance(i, str) for i in job_post_ids):
+                return JsonResponse({"error": "job_post_ids must be a list of strings"}, status=400)
+            job_post_ids = list(dict.fromkeys(job_post_ids))
+            if len(job_post_ids) > settings.BULK_TAILORING_MAX_JOBS:
+                return JsonResponse(
+                    {"error": f"At most {settings.BULK_TAILORING_MAX_JOBS} job posts per request"},
+                    status=400,
+                )
+            if not set(doc_types) <= set(DOC_TYPES):
+                return JsonResponse({"error": f"doc_types must be among {list(DOC_TYPES)}"}, status=400)
+
+            task_id = await aenqueue_tracked_task(bulk_tailor, (applicant_id, job_post_ids, doc_types), applicant_id)
+            data = {
+                "success": "Bulk Optimization Initiated",
+                "task_id": task_id,
+                "job_posts": len(job_post_ids),
+            }
+            return JsonResponse(data)
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON body"}, status=400)
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=500)
+
+
+# ============================> BULK TAILORING <============================
+
+
 # ============================> JOB POST <============================
 class JobOptimizationView(View):
     """
@@ -355,13 +457,6 @@ class Boto3UploadView(View):
         # The path to your file within your project directory
         file_path = "resume123.pdf"  # Replace with your file's path
 
-        # Create an S3 client
-        s3 = boto3.client(
-            "s3",
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        )
-
         # Define the bucket name and the key for the file in S3
         bucket_name = settings.AWS_STORAGE_BUCKET_NAME
         file_key = "resume123.pdf"  # The name you want the file to have in S3
@@ -369,12 +464,8 @@ class Boto3UploadView(View):
         # Try to upload the file
         try:
             with open(file_path, "rb") as data:
-                s3.upload_fileobj(
-                    data,
-                    bucket_name,
-                    file_key,
-                    # Removed the ExtraArgs with ACL since it's not supported with your bucket configuration
-                )
+                # ACLs are not set since they are not supported with the bucket configuration
+                storage_utils.upload_fileobj(data, file_key, bucket=bucket_name)
             return JsonResponse({"message": "File uploaded successfully!"}, status=200)
         except Exception as e:
             print(f"============ Error Details Start ============")